@@ -9,25 +9,26 @@ Description:
 """
 
 import requests
-import json
 import os
 
+from settings import load_config
+
 #Specify a URL that resolves to your workspace
 URL = "http://127.0.0.1:8000"
 
 # Load config.json and get environment variables
-with open('config.json', 'r') as f:
-    config = json.load(f)
+config = load_config()
 test_data_path = os.path.join(config['test_data_path'])
 model_path = os.path.join(config['output_model_path'])
 
 
 def api_calls():
     #Call each API endpoint and store the responses
-    response1 = requests.post(
-        f'{URL}/prediction',
-        json={
-            'filepath': os.path.join(test_data_path, 'testdata.csv')}).text
+    # upload the test data, the endpoint scores the rows it receives
+    with open(os.path.join(test_data_path, 'testdata.csv'), 'rb') as f:
+        response1 = requests.post(
+            f'{URL}/prediction',
+            files={'file': ('testdata.csv', f, 'text/csv')}).text
     response2 = requests.get(f'{URL}/scoring').text
     response3 = requests.get(f'{URL}/summarystats').text
     response4 = requests.get(f'{URL}/diagnostics').text
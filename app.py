@@ -1,34 +1,52 @@
 """
-Module: reporting.py
+Module: app.py
 Author: Amandeep Singh
 Date Written: 23-Jan-2023
-Date Modified: 23-Jan-2023
+Date Modified: 18-Oct-2026
 
 Description:
     - Flask based api with following endpoints
     -- 
         - /prediction
             - to get the model prediciton on given data
+            - accepts JSON records, columnar arrays or a csv upload
+            - optional micro-batching of concurrent requests
+        - /batchingstats
+            - to get the queue depth, batch size and latency of batching
         - /scoring
-            - to get the latest model scoring value
+            - to get the latest model scoring value, cached per model and
+              test data version
+        - /scoring/refresh
+            - admin call to recompute the score
         - /summarystats
             - to get the summary statistics of dataset
         - /diagnostics
             - to get the missing values, execution time, outdated packages
+        - /metrics
+            - stage timings, rows, bytes, model load time and request
+              latency of all workers in the Prometheus text format
+        - /profiles, /profiles/<id>, /profiles/<id>/collapsed
+            - recent profiles of requests and pipeline stages, only when
+              profiling is enabled (profiling.py)
 """
 
-from flask import Flask, session, jsonify, request
-import pandas as pd
-import numpy as np
-import pickle
+from flask import Flask, g, jsonify, request
 #import create_prediction_model
 #import diagnosis 
 #import predict_exited_from_saved_model
 import json
 import os
+import time
 from diagnostics import (model_predictions, dataframe_summary, 
                         dataframe_missing_values, execution_time, outdated_packages_list)
-from scoring import score_model
+from scoring import get_score, refresh_score
+from model_registry import get_registry
+from prediction_payload import PayloadError, parse_prediction_request
+from microbatch import BatchingError, MicroBatcher
+from linear_scorer import LINEAR_MODEL_FILE, LinearScorer
+from settings import load_config
+import instrumentation
+import profiling
 
 
 
@@ -36,46 +54,177 @@ from scoring import score_model
 app = Flask(__name__)
 app.secret_key = '1652d576-484a-49fd-913a-6879acfa6ba4'
 
-with open('config.json','r') as f:
-    config = json.load(f) 
+config = load_config()
 
 dataset_csv_path = os.path.join(config['output_folder_path']) 
+prod_deployment_path = os.path.join(config['prod_deployment_path'])
+max_prediction_batch_size = config.get('max_prediction_batch_size', 50000)
+admin_token = config.get('admin_token')
 
-prediction_model = None
+# request bodies are refused from their declared length, or while they
+# stream in, before anything is parsed
+app.config['MAX_CONTENT_LENGTH'] = int(
+    config.get('max_prediction_body_mb', 16) * (1 << 20)
+)
+
+
+@app.errorhandler(413)
+def body_too_large(err):
+    return jsonify({
+        'error': f"request body exceeds the maximum of "
+                 f"{app.config['MAX_CONTENT_LENGTH']} bytes"
+    }), 413
+
+# deployed model, loaded once per worker and reloaded on new deployments
+prediction_model = get_registry(
+    os.path.join(prod_deployment_path, 'trainedmodel.pkl')
+)
+
+
+# numpy only scorer of the deployed coefficients, skips pandas and sklearn
+fast_path_model = None
+if config.get('fast_path_scoring', False):
+    fast_path_model = get_registry(
+        os.path.join(prod_deployment_path, LINEAR_MODEL_FILE),
+        loader=LinearScorer.load
+    )
+
+
+def predict_features(features):
+    """
+    predict a feature matrix with the current deployed model
+    """
+
+    # keep the model for the whole batch, even if a reload happens
+    if fast_path_model is not None:
+        return fast_path_model.get().predict(features)
+    return model_predictions(features, prediction_model.get())
+
+
+# opt-in profiling, nothing is registered when it is disabled
+if profiling.enabled:
+    profiling.init_app(app, admin_token)
+
+
+REQUEST_SECONDS = instrumentation.histogram(
+    "http_request_duration_seconds", "Latency of the api requests"
+)
+
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def observe_request(response):
+    """
+    observe the latency of the request by endpoint, method and status
+    """
+
+    start = g.pop('request_start', None)
+    if start is not None:
+        # the route pattern, not the path, keeps the label set bounded
+        rule = request.url_rule
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            endpoint=rule.rule if rule is not None else "unmatched",
+            method=request.method,
+            status=str(response.status_code)
+        )
+    return response
+
+
+# opt-in coalescing of concurrent requests into one vectorized predict
+batching_config = config.get('microbatching', {})
+batcher = None
+if batching_config.get('enabled', False):
+    batcher = MicroBatcher(
+        predict_features,
+        max_batch_size=batching_config.get('max_batch_size', 256),
+        max_wait_us=batching_config.get('max_wait_us', 500),
+        timeout_seconds=batching_config.get('timeout_seconds', 5.0)
+    )
 
 
 #######################Prediction Endpoint
 @app.route("/prediction", methods=['POST','OPTIONS'])
 def predict():        
+    """
+    Prediction endpoint that scores the rows sent in the request body
 
-    #call the prediction function you created in Step 3
-    data = pd.read_csv(
-        os.path.join(dataset_csv_path, "finaldata.csv"),
-        dtype={
-            "corporation": str,
-            "lastmonth_activity": int,
-            "lastyear_activity": int,
-            "number_of_employees": int,
-            "exited": int
-        }
+    Returns:
+        json: list of predicted values, one per row
+    """
+
+    try:
+        features = parse_prediction_request(
+            request, max_prediction_batch_size
+        )
+    except PayloadError as err:
+        return jsonify({'error': str(err)}), err.status_code
+
+    try:
+        with instrumentation.timed("prediction"):
+            if batcher is not None:
+                preds = batcher.submit(features)
+            else:
+                preds = predict_features(features)
+    except BatchingError as err:
+        return jsonify({'error': str(err)}), 503
+    instrumentation.record_rows("prediction", len(preds))
+    instrumentation.record_bytes("prediction", request.content_length or 0)
+
+    return app.response_class(
+        json.dumps(preds.tolist(), separators=(',', ':')),
+        mimetype='application/json'
     )
-    preds = model_predictions(data)
 
-    return str(preds)
+#######################Batching Statistics Endpoint
+@app.route("/batchingstats", methods=['GET','OPTIONS'])
+def batching_stats():
+    """
+    Micro-batching metrics: queue depth, batch sizes and added latency
+
+    Returns:
+        json: batching metrics, empty when batching is disabled
+    """
+
+    if batcher is None:
+        return jsonify({'enabled': False})
+
+    return jsonify(dict(enabled=True, **batcher.stats()))
 
 #######################Scoring Endpoint
 @app.route("/scoring", methods=['GET','OPTIONS'])
 def score():  
     """
-    Scoring endpoint that runs the script scoring.py and
-    gets the score of the deployed model
+    Scoring endpoint that serves the cached score of the model, it is
+    only recomputed when the model or the test data have changed
 
     Returns:
-        str: model f1 score
+        json: model f1 score, model and test data versions, number of
+        test samples and scoring time
     """      
-    score = score_model()
+    score = get_score()
+
+    return jsonify(score)
+
+#######################Scoring Refresh Endpoint
+@app.route("/scoring/refresh", methods=['POST'])
+def refresh_scoring():
+    """
+    Admin endpoint that recomputes the score of the model, requires the
+    X-Admin-Token header when admin_token is set in config.json
 
-    return str(score)
+    Returns:
+        json: new score and its metadata
+    """
+
+    if admin_token and request.headers.get('X-Admin-Token') != admin_token:
+        return jsonify({'error': 'forbidden'}), 403
+
+    return jsonify(refresh_score())
 
 #######################Summary Statistics Endpoint
 @app.route("/summarystats", methods=['GET','OPTIONS'])
@@ -104,19 +253,9 @@ def diagnosis():
     """
 
     #check timing and percent NA values
-    data = pd.read_csv(
-        os.path.join(dataset_csv_path, "finaldata.csv"),
-        dtype={
-            "corporation": str,
-            "lastmonth_activity": int,
-            "lastyear_activity": int,
-            "number_of_employees": int,
-            "exited": int
-        }
-    )
     missing_values = str(dataframe_missing_values())
-    execution = str(execution_time())
-    outdated = str(outdated_packages_list())
+    execution = execution_time()
+    outdated = outdated_packages_list()
 
     return {
         'missing_percentage': missing_values,
@@ -125,6 +264,23 @@ def diagnosis():
     }
 
 
+#######################Metrics Endpoint
+@app.route("/metrics", methods=['GET'])
+def metrics():
+    """
+    Metrics endpoint for Prometheus, the values of all gunicorn workers
+    added up
+
+    Returns:
+        text: metrics in the Prometheus text exposition format
+    """
+
+    return app.response_class(
+        instrumentation.render(),
+        mimetype='text/plain; version=0.0.4'
+    )
+
+
 if __name__ == "__main__":    
     app.run(
         host='0.0.0.0', 
@@ -0,0 +1,161 @@
+"""
+Module: background.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Periodic jobs run in a background thread of the serving process
+    -- BackgroundJob:
+        - runs a function every interval seconds, or when triggered
+        - keeps the latest result with its timestamp and duration, in
+          memory and in a JSON file shared by all workers
+        - a file lock makes sure only one gunicorn worker runs the job at
+          a time, the others read the result file
+        - the thread is started lazily once per process, so it also
+          runs in workers forked after import
+"""
+
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundJob:
+    """
+    function run periodically in a daemon thread
+
+    Arguments:
+        name: name of the job, used for the thread and in logs
+        func: function without arguments returning a JSON serializable
+            result
+        result_file: JSON file with the latest result
+        interval: seconds between two runs, None to run only when
+            triggered
+    """
+
+    def __init__(self, name, func, result_file, interval=None):
+        self.name = name
+        self.func = func
+        self.result_file = result_file
+        self.interval = interval
+        self._latest = None
+        self._latest_mtime = None
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """
+        start the background thread of this process if not running
+        """
+
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._wakeup = threading.Event()
+            self._thread = threading.Thread(
+                target=self._loop, name=self.name, daemon=True
+            )
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def trigger(self):
+        """
+        ask the background thread to run the job now
+        """
+
+        self.start()
+        self._wakeup.set()
+
+    def _due(self):
+        """
+        whether the stored result is older than the interval
+        """
+
+        latest = self.latest()
+        if latest is None:
+            return True
+        if self.interval is None:
+            return False
+        return time.time() - latest["finished_at_epoch"] >= self.interval
+
+    def _loop(self):
+        while True:
+            if self._due() or self._wakeup.is_set():
+                self._wakeup.clear()
+                self.run_now()
+            self._wakeup.wait(timeout=self.interval or 60)
+
+    def run_now(self):
+        """
+        run the job in the calling thread, skipped if another worker is
+        running it
+
+        Returns:
+            latest result record
+        """
+
+        lock_file = open(self.result_file + ".lock", "w")
+        try:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return self.latest()
+
+            started = time.time()
+            record = {"status": "ok"}
+            try:
+                record["result"] = self.func()
+            except Exception as err:
+                logger.exception("Background job %s failed", self.name)
+                record = {"status": "error", "error": repr(err)}
+            finished = time.time()
+            record.update({
+                "finished_at": datetime.fromtimestamp(finished).isoformat(),
+                "finished_at_epoch": finished,
+                "duration_seconds": finished - started,
+            })
+
+            tmp_file = self.result_file + ".tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(record, f)
+            os.replace(tmp_file, self.result_file)
+            self._latest = record
+            self._latest_mtime = os.stat(self.result_file).st_mtime_ns
+            return record
+        finally:
+            lock_file.close()
+
+    def latest(self):
+        """
+        latest result record, None if the job never ran
+
+        Returns:
+            dict with status, result or error, finished_at and
+            duration_seconds
+        """
+
+        try:
+            mtime = os.stat(self.result_file).st_mtime_ns
+        except OSError:
+            return self._latest
+        if mtime != self._latest_mtime:
+            # written by another worker
+            try:
+                with open(self.result_file, "r") as f:
+                    self._latest = json.load(f)
+                self._latest_mtime = mtime
+            except ValueError:
+                pass
+        return self._latest
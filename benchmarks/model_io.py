@@ -0,0 +1,154 @@
+"""
+Module: benchmarks/model_io.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Save time, load time and file size of the model formats of
+      model_io.py, pickle being the standard pickle.dump reference
+    - models are logistic regressions with random coefficients, from the
+      three features of the deployed model up to millions of coefficients
+    - load time is measured twice: the load alone (memory mapped arrays
+      are not read yet) and the load followed by a prediction, which
+      touches every coefficient
+    - the predictions of every loaded model are checked against the
+      original model
+
+    Usage:
+        python benchmarks/model_io.py
+        python benchmarks/model_io.py --sizes 3 100000 --classes 10
+        python benchmarks/model_io.py --output results.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# model_io reads config.json of the working directory
+os.chdir(REPO_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from model_io import load_model, save_model  # noqa: E402
+
+FORMATS = ["pickle", "pickle5_mmap", "joblib", "coefficients"]
+
+
+def synthetic_model(n_features, n_classes, seed=0):
+    """
+    logistic regression with random coefficients, no fit needed
+
+    Arguments:
+        n_features: number of features
+        n_classes: number of classes, 2 for a binary model
+        seed: random seed
+
+    Returns:
+        LogisticRegression
+    """
+
+    from sklearn.linear_model import LogisticRegression
+
+    rng = np.random.default_rng(seed)
+    rows = 1 if n_classes == 2 else n_classes
+    model = LogisticRegression()
+    model.classes_ = np.arange(n_classes)
+    model.coef_ = rng.standard_normal((rows, n_features))
+    model.intercept_ = rng.standard_normal(rows)
+    model.n_features_in_ = n_features
+    model.n_iter_ = np.array([100], dtype=np.int32)
+    return model
+
+
+def best_time(func, repeat):
+    """
+    best wall time of repeat calls, and the result of the last call
+    """
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def measure(n_features, n_classes, repeat, folder):
+    """
+    save and load every format for one model size
+
+    Returns:
+        list of dicts with the timings and file size of each format
+    """
+
+    model = synthetic_model(n_features, n_classes)
+    X = np.random.default_rng(1).standard_normal((32, n_features))
+    expected = model.predict(X)
+
+    results = []
+    for fmt in FORMATS:
+        path = os.path.join(folder, f"model-{fmt}.bin")
+        save_seconds, _ = best_time(lambda: save_model(model, path, fmt), repeat)
+        load_seconds, _ = best_time(lambda: load_model(path), repeat)
+        predict_seconds, predictions = best_time(
+            lambda: load_model(path).predict(X), repeat
+        )
+        if not np.array_equal(predictions, expected):
+            raise AssertionError(f"{fmt} predictions differ from the model")
+        results.append({
+            "features": n_features,
+            "classes": n_classes,
+            "format": fmt,
+            "bytes": os.path.getsize(path),
+            "save_seconds": save_seconds,
+            "load_seconds": load_seconds,
+            "load_predict_seconds": predict_seconds,
+        })
+        os.remove(path)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[3, 10000, 1000000],
+                        help="numbers of features of the models")
+    parser.add_argument("--classes", type=int, default=2,
+                        help="number of classes of the models")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="runs per measurement, the best is kept")
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        for n_features in args.sizes:
+            results.extend(
+                measure(n_features, args.classes, args.repeat, folder)
+            )
+
+    print(f"{'features':>9s} {'format':>13s} {'size':>12s} {'save':>10s} "
+          f"{'load':>10s} {'load+pred':>10s}")
+    for result in results:
+        print(f"{result['features']:9d} {result['format']:>13s} "
+              f"{result['bytes']:12d} "
+              f"{result['save_seconds'] * 1e3:8.2f}ms "
+              f"{result['load_seconds'] * 1e3:8.2f}ms "
+              f"{result['load_predict_seconds'] * 1e3:8.2f}ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
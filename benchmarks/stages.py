@@ -0,0 +1,451 @@
+"""
+Module: benchmarks/stages.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Benchmark of the process stages on synthetic data at scale
+    - for each scale tier a workspace is generated with seeded synthetic
+      source files and test data (synthetic.py), then every stage runs in
+      its own interpreter inside the workspace:
+        - ingestion: merge_multiple_dataframe
+        - training: train_model
+        - scoring: refresh_score
+        - deployment: deploy_release
+        - predictions: model_predictions on batches of several sizes
+        - serving: the flask endpoints through the test client
+    - each stage reports its wall time, rows per second, latency
+      percentiles of the repeated calls and the peak RSS of its process
+    - results are written as JSON with the commit they were measured on,
+      --compare checks them against an earlier result file and exits with
+      status 1 on a regression beyond the tolerance
+
+    Usage:
+        python benchmarks/stages.py --tiers 1e5
+        python benchmarks/stages.py --tiers 1e5 1e6 --output new.json
+        python benchmarks/stages.py --tiers 1e5 --compare old.json
+        python benchmarks/stages.py --tiers 1e5 --set training_mode=streaming
+"""
+
+import argparse
+from datetime import datetime
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+
+TIERS = {
+    "1e3": 10 ** 3,
+    "1e5": 10 ** 5,
+    "1e6": 10 ** 6,
+    "1e7": 10 ** 7,
+    "1e8": 10 ** 8,
+}
+STAGES = [
+    "ingestion", "training", "scoring", "deployment", "predictions",
+    "serving",
+]
+# batch sizes of the prediction and serving stages
+BATCH_SIZES = [1, 100, 10000, 100000]
+SERVING_BATCH_SIZES = [1, 100, 10000]
+# rows scored per batch size, the number of calls follows from it
+ROWS_PER_BATCH_SIZE = 1000000
+
+
+def peak_rss_mb():
+    """
+    peak resident set size of this process in MiB
+    """
+
+    # kilobytes on linux, bytes on macos
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+
+
+def latency_summary(seconds):
+    """
+    latency percentiles in milliseconds of a list of call durations
+    """
+
+    ms = np.asarray(seconds) * 1e3
+    return {
+        "calls": int(ms.size),
+        "mean": float(ms.mean()),
+        "p50": float(np.percentile(ms, 50)),
+        "p90": float(np.percentile(ms, 90)),
+        "p99": float(np.percentile(ms, 99)),
+        "max": float(ms.max()),
+    }
+
+
+def timed_calls(func, batch_size, max_calls=1000):
+    """
+    call func repeatedly and summarize the latencies
+
+    Returns:
+        dict with the latency percentiles and rows per second
+    """
+
+    calls = max(5, min(max_calls, ROWS_PER_BATCH_SIZE // batch_size))
+    seconds = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+    return {
+        "latency_ms": latency_summary(seconds),
+        "rows_per_second": batch_size * calls / sum(seconds),
+    }
+
+
+def feature_batch(size):
+    """
+    feature matrix of the test data, repeated up to the batch size
+    """
+
+    from dataset import FEATURE_COLUMNS, load_test_data
+
+    features = load_test_data(FEATURE_COLUMNS).to_numpy(dtype=np.float64)
+    repeats = -(-size // len(features))
+    return np.tile(features, (repeats, 1))[:size]
+
+
+def stage_ingestion():
+    import ingestion
+
+    start = time.perf_counter()
+    added = ingestion.merge_multiple_dataframe()
+    seconds = time.perf_counter() - start
+    rows = added if isinstance(added, int) else len(added.index)
+    return {"seconds": seconds, "rows": rows, "rows_per_second": rows / seconds}
+
+
+def stage_training():
+    import training
+    from dataset import TARGET_COLUMN, load_final_data
+
+    rows = len(load_final_data([TARGET_COLUMN]).index)
+    start = time.perf_counter()
+    training.train_model()
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "rows": rows, "rows_per_second": rows / seconds}
+
+
+def stage_scoring():
+    import scoring
+
+    start = time.perf_counter()
+    score = scoring.refresh_score()
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "rows": score["samples"],
+        "rows_per_second": score["samples"] / seconds,
+        "f1_score": score["f1_score"],
+    }
+
+
+def stage_deployment():
+    import deployment
+
+    start = time.perf_counter()
+    deployment.deploy_release()
+    return {"seconds": time.perf_counter() - start}
+
+
+def stage_predictions():
+    from diagnostics import model_predictions
+
+    model_predictions(feature_batch(1))
+    batches = {}
+    for size in BATCH_SIZES:
+        features = feature_batch(size)
+        batches[str(size)] = timed_calls(
+            lambda: model_predictions(features), size
+        )
+    return {"batches": batches}
+
+
+def stage_serving():
+    from app import app
+
+    client = app.test_client()
+    endpoints = {}
+    for size in SERVING_BATCH_SIZES:
+        features = feature_batch(size)
+        body = json.dumps({
+            "columns": {
+                name: features[:, i].tolist()
+                for i, name in enumerate(
+                    ["lastmonth_activity", "lastyear_activity",
+                     "number_of_employees"]
+                )
+            }
+        })
+
+        def post():
+            response = client.post(
+                "/prediction", data=body, content_type="application/json"
+            )
+            assert response.status_code == 200, response.get_data(as_text=True)
+
+        endpoints[f"prediction-{size}"] = timed_calls(post, size, 500)
+
+    for path in ("/scoring", "/summarystats"):
+        def get():
+            response = client.get(path)
+            assert response.status_code == 200, response.get_data(as_text=True)
+
+        endpoints[path.strip("/")] = timed_calls(get, 1, 200)
+    return {"batches": endpoints}
+
+
+def run_stage(name):
+    """
+    run one stage in the current workspace and print its result as JSON
+    """
+
+    sys.path.insert(0, REPO_DIR)
+    start = time.perf_counter()
+    result = globals()[f"stage_{name}"]()
+    result["total_seconds"] = time.perf_counter() - start
+    result["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(result))
+
+
+def set_option(config, option):
+    """
+    apply a key.subkey=json_value override to a config dict
+    """
+
+    key, _, value = option.partition("=")
+    try:
+        value = json.loads(value)
+    except ValueError:
+        pass
+    *parents, last = key.split(".")
+    for parent in parents:
+        config = config.setdefault(parent, {})
+    config[last] = value
+
+
+def make_workspace(folder, rows, options, seed):
+    """
+    workspace with the repo config and synthetic data of the given size
+    """
+
+    # imported here, the stage processes do not need it
+    from synthetic import write_source_files, write_test_data
+
+    with open(os.path.join(REPO_DIR, "config.json"), "r") as f:
+        config = json.load(f)
+    for option in options:
+        set_option(config, option)
+    with open(os.path.join(folder, "config.json"), "w") as f:
+        json.dump(config, f, indent=4)
+
+    for key in ("output_folder_path", "output_model_path",
+                "prod_deployment_path"):
+        os.makedirs(os.path.join(folder, config[key]), exist_ok=True)
+    os.makedirs(os.path.join(folder, "logs"), exist_ok=True)
+    shutil.copy(
+        os.path.join(REPO_DIR, "requirements.txt"),
+        os.path.join(folder, "requirements.txt")
+    )
+
+    write_source_files(
+        os.path.join(folder, config["input_folder_path"]), rows, seed=seed
+    )
+    write_test_data(
+        os.path.join(folder, config["test_data_path"], "testdata.csv"),
+        max(1000, min(rows // 10, 1000000)), seed=seed + 1
+    )
+
+
+def run_tier(rows, options, seed, stages, keep):
+    """
+    generate a workspace and run the stages in it
+
+    Returns:
+        dict of stage name to its result
+    """
+
+    folder = tempfile.mkdtemp(prefix="stages-bench-")
+    try:
+        start = time.perf_counter()
+        make_workspace(folder, rows, options, seed)
+        print(f"  {'generate':12s} {time.perf_counter() - start:9.2f}s",
+              file=sys.stderr)
+        results = {}
+        for stage in stages:
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--stage", stage],
+                cwd=folder, capture_output=True, text=True
+            )
+            if output.returncode != 0:
+                raise RuntimeError(f"stage {stage} failed:\n{output.stderr}")
+            results[stage] = json.loads(output.stdout.strip().splitlines()[-1])
+            print(f"  {stage:12s} {results[stage]['total_seconds']:9.2f}s "
+                  f"peak {results[stage]['peak_rss_mb']:8.1f} MiB",
+                  file=sys.stderr)
+        return results
+    finally:
+        if keep:
+            print(f"  workspace kept in {folder}", file=sys.stderr)
+        else:
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+def git_commit():
+    """
+    commit of the repo and whether the tree has uncommitted changes
+    """
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def flatten(results, prefix=""):
+    """
+    numeric metrics of a result as a dict of dotted name to value
+    """
+
+    metrics = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[name] = value
+    return metrics
+
+
+def regressions(baseline, current, tolerance, slack_seconds, slack_ms):
+    """
+    metrics of current that are worse than baseline by more than the
+    tolerance and the absolute slack
+
+    - stage times, peak RSS and the rows per second of the one shot
+      stages are compared
+    - of the repeated calls the p50 and p90 latencies are compared, the
+      p99 of a few hundred sub millisecond calls is too noisy to gate on
+
+    Returns:
+        list of (metric, baseline value, current value)
+    """
+
+    old = flatten(baseline["tiers"])
+    new = flatten(current["tiers"])
+    worse = []
+    for name, value in sorted(new.items()):
+        if name not in old or not old[name]:
+            continue
+        limit = None
+        if name.endswith(".rows_per_second") and ".batches." not in name:
+            if value < old[name] * (1 - tolerance):
+                worse.append((name, old[name], value))
+        elif name.endswith("seconds"):
+            limit = old[name] * (1 + tolerance) + slack_seconds
+        elif name.endswith(("latency_ms.p50", "latency_ms.p90")):
+            limit = old[name] * (1 + tolerance) + slack_ms
+        elif name.endswith("peak_rss_mb"):
+            limit = old[name] * (1 + tolerance)
+        if limit is not None and value > limit:
+            worse.append((name, old[name], value))
+    return worse
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tiers", nargs="+", default=["1e5"],
+                        choices=sorted(TIERS, key=TIERS.get),
+                        help="numbers of rows of the synthetic datasets")
+    parser.add_argument("--stages", nargs="+", default=STAGES,
+                        choices=STAGES, help="stages to run, in order")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the synthetic data")
+    parser.add_argument("--set", dest="options", action="append", default=[],
+                        help="config.json override, key.subkey=json_value")
+    parser.add_argument("--output", help="result file, benchmarks/results/"
+                        "<commit>.json by default")
+    parser.add_argument("--compare", help="earlier result file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative regression of a metric")
+    parser.add_argument("--slack-seconds", type=float, default=0.05,
+                        help="allowed slowdown of a stage on top of it")
+    parser.add_argument("--slack-ms", type=float, default=1.0,
+                        help="allowed latency increase on top of it")
+    parser.add_argument("--keep", action="store_true",
+                        help="keep the generated workspaces")
+    parser.add_argument("--stage", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stage:
+        run_stage(args.stage)
+        return 0
+
+    commit, dirty = git_commit()
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": args.seed,
+        "options": args.options,
+        "tiers": {},
+    }
+    for tier in args.tiers:
+        print(f"tier {tier} ({TIERS[tier]} rows)", file=sys.stderr)
+        report["tiers"][tier] = run_tier(
+            TIERS[tier], args.options, args.seed, args.stages, args.keep
+        )
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{(commit or 'unknown')[:12]}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    print(f"results written to {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        worse = regressions(
+            baseline, report, args.tolerance, args.slack_seconds, args.slack_ms
+        )
+        for name, old, new in worse:
+            print(f"REGRESSION {name}: {old:.4g} -> {new:.4g}", file=sys.stderr)
+        if worse:
+            return 1
+        print(f"no regression against {args.compare}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Module: benchmarks/startup.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Cold start benchmark of the entry points
+    - each module is imported in a fresh interpreter with
+      python -X importtime, after a warm up import that fills the file
+      cache, the best cumulative import time of a few runs is compared
+      with startup_baseline.json
+    - also checks that heavy packages stay out of the entry points that
+      do not need them at start
+    - exits with status 1 when an entry point is slower than its baseline
+      by more than the tolerance or imports a package it should not, a
+      slow entry point is measured again and only reported when it is
+      still slow, so a noisy run alone does not fail the check
+
+    Usage:
+        python benchmarks/startup.py             compare with the baseline
+        python benchmarks/startup.py --update    write a new baseline
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(REPO_DIR, "benchmarks", "startup_baseline.json")
+
+ENTRY_POINTS = [
+    "app", "fullprocess", "watcher", "ingestion", "training", "scoring",
+    "deployment", "diagnostics", "reporting",
+]
+
+# packages an entry point must not import at start
+FORBIDDEN_IMPORTS = {
+    "app": ["matplotlib", "seaborn", "requests"],
+    "fullprocess": [
+        "pandas", "pyarrow", "sklearn", "matplotlib", "seaborn", "requests"
+    ],
+    "watcher": ["pandas", "sklearn", "matplotlib", "seaborn", "requests"],
+    "scoring": ["sklearn", "matplotlib"],
+    "deployment": ["pandas", "pyarrow", "sklearn", "matplotlib"],
+}
+
+
+def import_profile(module):
+    """
+    import a module in a fresh interpreter
+
+    Returns:
+        cumulative import time of the module in seconds and the set of
+        top level packages imported
+    """
+
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True
+    ).stderr
+
+    cumulative = None
+    packages = set()
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        if not cumulative_us.strip().isdigit():
+            continue
+        packages.add(name.strip().split(".")[0])
+        if name.strip() == module:
+            cumulative = int(cumulative_us) / 1e6
+    return cumulative, packages
+
+
+def measure(repeat, modules=ENTRY_POINTS):
+    """
+    best cumulative import time and imported packages of each entry point
+    """
+
+    results = {}
+    for module in modules:
+        # warm up, the first import also reads the files from disk
+        import_profile(module)
+        runs = [import_profile(module) for _ in range(repeat)]
+        results[module] = {
+            "seconds": min(seconds for seconds, _ in runs),
+            "packages": runs[0][1],
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--update", action="store_true",
+                        help="write the measured times as the new baseline")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="imports per entry point, the best is kept")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed slowdown relative to the baseline")
+    parser.add_argument("--slack", type=float, default=0.1,
+                        help="allowed slowdown in seconds on top of it")
+    args = parser.parse_args()
+
+    results = measure(args.repeat)
+    failures = []
+    for module, result in results.items():
+        forbidden = sorted(
+            set(FORBIDDEN_IMPORTS.get(module, [])) & result["packages"]
+        )
+        if forbidden:
+            failures.append(f"{module} imports {', '.join(forbidden)} at start")
+
+    if args.update:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(
+                {module: result["seconds"] for module, result in results.items()},
+                f, indent=2
+            )
+            f.write("\n")
+    else:
+        with open(BASELINE_FILE, "r") as f:
+            baseline = json.load(f)
+        limits = {
+            module: baseline[module] * (1 + args.tolerance) + args.slack
+            for module in results if module in baseline
+        }
+        slow = [
+            module for module, limit in limits.items()
+            if results[module]["seconds"] > limit
+        ]
+        # confirm with a second measurement, best of both is kept
+        for module, result in measure(args.repeat, slow).items():
+            results[module]["seconds"] = min(
+                results[module]["seconds"], result["seconds"]
+            )
+        for module, result in results.items():
+            if module not in limits:
+                continue
+            limit = limits[module]
+            status = "ok" if result["seconds"] <= limit else "REGRESSION"
+            print(f"{module:12s} {result['seconds']:8.3f}s "
+                  f"baseline {baseline[module]:8.3f}s  {status}")
+            if status != "ok":
+                failures.append(
+                    f"{module} starts in {result['seconds']:.3f}s, "
+                    f"limit {limit:.3f}s"
+                )
+
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Module: benchmarks/streaming_training.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Streaming (SGDClassifier partial_fit over chunks) against batch
+      (LogisticRegression on the whole dataframe) training
+    - on the ingested dataset, both models are scored with the f1 score
+      on testdata.csv
+    - on synthetic datasets of growing size, generated chunk by chunk from
+      a seeded logistic model so the streaming run never holds the whole
+      dataset, both models are scored on a synthetic holdout and the peak
+      traced memory (tracemalloc) of each fit is reported
+    - the f1 score of the streaming model should stay close to the batch
+      model while its peak memory stays flat with the number of rows
+
+    Usage:
+        python benchmarks/streaming_training.py
+        python benchmarks/streaming_training.py --rows 100000 1000000
+        python benchmarks/streaming_training.py --output results.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the repo modules read config.json of the working directory
+os.chdir(REPO_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from dataset import (FEATURE_COLUMNS, MODEL_COLUMNS, TARGET_COLUMN,  # noqa: E402
+                     iter_final_data, load_final_data, load_test_data)
+from sketches import DatasetSketch  # noqa: E402
+from streaming_training import feature_scaling, fit_streaming  # noqa: E402
+from synthetic import synthetic_chunk, synthetic_chunks  # noqa: E402
+from training import default_model  # noqa: E402
+
+
+def traced(func):
+    """
+    run func with tracemalloc
+
+    Returns:
+        result of func, seconds and peak traced bytes
+    """
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def train_streaming(chunks, epochs):
+    sketch = DatasetSketch({col: True for col in MODEL_COLUMNS})
+    for chunk in chunks():
+        sketch.update(chunk)
+    mean, scale = feature_scaling(sketch)
+    model, _, _ = fit_streaming(chunks, mean, scale, epochs=epochs)
+    return model
+
+
+def train_batch(chunks):
+    data = pd.concat(chunks(), ignore_index=True)
+    return default_model().fit(data.loc[:, FEATURE_COLUMNS], data[TARGET_COLUMN])
+
+
+def f1(model, data):
+    from sklearn import metrics
+
+    return float(metrics.f1_score(
+        data[TARGET_COLUMN], model.predict(data.loc[:, FEATURE_COLUMNS])
+    ))
+
+
+def compare(name, rows, chunks, holdout, epochs):
+    """
+    train both ways on the same chunks and score them on the holdout
+    """
+
+    results = []
+    for mode, train in (
+            ("streaming", lambda: train_streaming(chunks, epochs)),
+            ("batch", lambda: train_batch(chunks))):
+        model, seconds, peak = traced(train)
+        results.append({
+            "dataset": name,
+            "rows": rows,
+            "mode": mode,
+            "f1_score": f1(model, holdout),
+            "seconds": seconds,
+            "peak_bytes": peak,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+",
+                        default=[100000, 1000000, 4000000],
+                        help="numbers of rows of the synthetic datasets")
+    parser.add_argument("--chunksize", type=int, default=100000,
+                        help="rows per chunk of the streaming training")
+    parser.add_argument("--epochs", type=int, default=5,
+                        help="passes of the streaming training")
+    parser.add_argument("--output", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    if os.path.exists(os.path.join("ingesteddata", "finaldata.csv")):
+        results.extend(compare(
+            "ingested",
+            len(load_final_data([TARGET_COLUMN]).index),
+            lambda: iter_final_data(MODEL_COLUMNS, args.chunksize),
+            load_test_data(MODEL_COLUMNS),
+            args.epochs
+        ))
+
+    holdout = synthetic_chunk(0, 100000, seed=1, corporations=False)
+    for rows in args.rows:
+        results.extend(compare(
+            "synthetic", rows,
+            synthetic_chunks(rows, args.chunksize, corporations=False),
+            holdout, args.epochs
+        ))
+
+    print(f"{'dataset':>10s} {'rows':>9s} {'mode':>10s} {'f1':>7s} "
+          f"{'time':>9s} {'peak MiB':>9s}")
+    for result in results:
+        print(f"{result['dataset']:>10s} {result['rows']:9d} "
+              f"{result['mode']:>10s} {result['f1_score']:7.4f} "
+              f"{result['seconds']:8.2f}s "
+              f"{result['peak_bytes'] / 2 ** 20:9.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Module: benchmarks/synthetic.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Seeded synthetic data of the dataset schema (corporation,
+      lastmonth_activity, lastyear_activity, number_of_employees, exited)
+    -- synthetic_chunk:
+        one chunk of rows, the same for the same seed and chunk index, the
+        label follows a logistic model of the standardized features
+    -- synthetic_chunks:
+        function returning a fresh iterator over the chunks of a dataset of
+        any size, nothing is held beyond one chunk
+    -- write_source_files:
+        writes a dataset as source csv files, with a fraction of rows
+        repeated across files for the deduplication of ingestion
+    -- write_test_data:
+        writes testdata.csv from a separate seed
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+COLUMNS = [
+    "corporation",
+    "lastmonth_activity",
+    "lastyear_activity",
+    "number_of_employees",
+    "exited",
+]
+FEATURE_COLUMNS = COLUMNS[1:4]
+TARGET_COLUMN = "exited"
+
+# coefficients of the logistic model, on standardized features
+TRUE_COEF = np.array([1.5, -1.0, 0.5])
+TRUE_INTERCEPT = -0.2
+# population mean and standard deviation of the features
+FEATURE_MEAN = np.array([100.0, 1000.0, np.exp(3.5)])
+FEATURE_STD = np.array([
+    np.sqrt(2) * 50.0, np.sqrt(2) * 500.0, np.sqrt((np.e - 1) * np.exp(7))
+])
+
+
+def synthetic_chunk(index, rows, seed=0, corporations=True):
+    """
+    one chunk of synthetic rows
+
+    Arguments:
+        index: index of the chunk, part of the seed and of the
+            corporation names
+        rows: number of rows
+        seed: seed of the dataset
+        corporations: whether the corporation column is generated, model
+            benchmarks skip it
+
+    Returns:
+        dataframe of the dataset schema
+    """
+
+    rng = np.random.default_rng([seed, index])
+    features = np.column_stack([
+        rng.gamma(2.0, 50.0, rows),
+        rng.gamma(2.0, 500.0, rows),
+        rng.lognormal(3.0, 1.0, rows),
+    ]).round()
+    standardized = (features - FEATURE_MEAN) / FEATURE_STD
+    probability = 1 / (1 + np.exp(-(standardized @ TRUE_COEF + TRUE_INTERCEPT)))
+
+    data = pd.DataFrame(features.astype(np.int64), columns=FEATURE_COLUMNS)
+    if corporations:
+        data.insert(
+            0, "corporation",
+            [f"c{seed}-{index}-{row}" for row in range(rows)]
+        )
+    data[TARGET_COLUMN] = (rng.random(rows) < probability).astype(np.int64)
+    return data
+
+
+def synthetic_chunks(rows, chunksize, seed=0, corporations=True):
+    """
+    function returning a fresh iterator over the chunks of a dataset
+
+    Arguments:
+        rows: number of rows of the dataset
+        chunksize: maximum rows per chunk
+        seed: seed of the dataset
+        corporations: whether the corporation column is generated
+    """
+
+    def chunks():
+        for index, start in enumerate(range(0, rows, chunksize)):
+            yield synthetic_chunk(
+                index, min(chunksize, rows - start), seed, corporations
+            )
+    return chunks
+
+
+def write_source_files(folder, rows, files=4, duplicates=0.01, seed=0,
+                       chunksize=1000000):
+    """
+    write a synthetic dataset as source csv files
+
+    Arguments:
+        folder: directory of the source files
+        rows: number of distinct rows
+        files: number of files the rows are spread over
+        duplicates: fraction of the rows of a file written again to the
+            next file
+        seed: seed of the dataset
+        chunksize: rows generated at a time
+
+    Returns:
+        list of the written file paths
+    """
+
+    os.makedirs(folder, exist_ok=True)
+    per_file = -(-rows // files)
+    paths = []
+    index = 0
+    repeated = None
+    for number in range(files):
+        path = os.path.join(folder, f"synthetic{number:03d}.csv")
+        file_rows = min(per_file, rows - number * per_file)
+        with open(path, "w", newline="") as f:
+            f.write(",".join(COLUMNS) + "\n")
+            if repeated is not None:
+                repeated.to_csv(f, header=False, index=False)
+            last = None
+            for start in range(0, file_rows, chunksize):
+                last = synthetic_chunk(
+                    index, min(chunksize, file_rows - start), seed
+                )
+                index += 1
+                last.to_csv(f, header=False, index=False)
+        repeated = None if last is None else last.head(
+            int(len(last.index) * duplicates)
+        )
+        paths.append(path)
+    return paths
+
+
+def write_test_data(path, rows, seed=1):
+    """
+    write a synthetic testdata.csv
+
+    Arguments:
+        path: path of the csv file
+        rows: number of rows
+        seed: seed of the test data, distinct from the training seed
+    """
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="") as f:
+        f.write(",".join(COLUMNS) + "\n")
+        for chunk in synthetic_chunks(rows, 1000000, seed)():
+            chunk.to_csv(f, header=False, index=False)
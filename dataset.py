@@ -0,0 +1,419 @@
+"""
+Module: dataset.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Shared loader and writer of the ingested dataset
+    -- load_final_data:
+        reads only the requested columns of the final dataset, from the
+        parquet copy (typed, memory mapped) when it exists, otherwise
+        from finaldata.csv with explicit dtypes
+    -- load_test_data:
+        reads the requested columns of testdata.csv
+    -- iter_final_data:
+        reads the final dataset in bounded chunks
+    -- read_final_data_from:
+        reads the rows of finaldata.csv from a byte offset, the rows
+        appended by an ingestion run without reading the ones before
+    -- FinalDataWriter:
+        writes or appends finaldata.csv and, with dataset_format
+        "parquet", a directory of parquet parts next to it, chunk by chunk
+        - an append goes to a copy of finaldata.csv that replaces it in
+          one step, the new parquet part is published just before
+        - the parquet directory records the size of the csv it matches,
+          readers only use it when it matches the csv on disk and the
+          next writer rebuilds it otherwise (a crash in between)
+    -- write_final_data / append_final_data:
+        write a whole dataframe with FinalDataWriter
+    - pyarrow is optional, without it only the csv is used
+"""
+
+import os
+import glob
+import shutil
+import pandas as pd
+
+from settings import load_config
+
+
+# Load config.json and get path variables
+config = load_config()
+
+output_folder_path = os.path.join(config['output_folder_path'])
+test_data_path = os.path.join(config['test_data_path'])
+dataset_format = config.get('dataset_format', 'parquet')
+
+FINAL_DATA_FILE = "finaldata.csv"
+FINAL_DATA_PARQUET = "finaldata.parquet"
+# size of the csv the parquet parts match, parquet readers skip names
+# starting with an underscore
+PARQUET_CSV_SIZE_FILE = "_csv_size"
+TEST_DATA_FILE = "testdata.csv"
+
+DTYPES = {
+    "corporation": str,
+    "lastmonth_activity": int,
+    "lastyear_activity": int,
+    "number_of_employees": int,
+    "exited": int
+}
+
+FEATURE_COLUMNS = [
+    "lastmonth_activity",
+    "lastyear_activity",
+    "number_of_employees"
+]
+TARGET_COLUMN = "exited"
+MODEL_COLUMNS = FEATURE_COLUMNS + [TARGET_COLUMN]
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    PARQUET_SCHEMA = pa.schema([
+        ("corporation", pa.string()),
+        ("lastmonth_activity", pa.int64()),
+        ("lastyear_activity", pa.int64()),
+        ("number_of_employees", pa.int64()),
+        ("exited", pa.int64()),
+    ])
+except ImportError:
+    pa = None
+    pq = None
+
+
+def parquet_enabled():
+    """
+    whether the parquet copy of the final dataset is written
+    """
+
+    return dataset_format == "parquet" and pq is not None
+
+
+def final_data_path():
+    """
+    path of finaldata.csv
+    """
+
+    return os.path.join(output_folder_path, FINAL_DATA_FILE)
+
+
+def parquet_path():
+    """
+    directory of the parquet parts of the final dataset
+    """
+
+    return os.path.join(output_folder_path, FINAL_DATA_PARQUET)
+
+
+def parquet_current():
+    """
+    whether the parquet copy holds the rows of finaldata.csv as it is on
+    disk, it does not while an append is published or after a writer
+    died in between
+    """
+
+    if pq is None:
+        return False
+    try:
+        with open(os.path.join(parquet_path(), PARQUET_CSV_SIZE_FILE)) as f:
+            return int(f.read()) == os.path.getsize(final_data_path())
+    except (OSError, ValueError):
+        return False
+
+
+def _write_parquet_csv_size(parquet_dir, size):
+    """
+    record the size of the csv the parts of parquet_dir match
+    """
+
+    size_path = os.path.join(parquet_dir, PARQUET_CSV_SIZE_FILE)
+    with open(size_path + ".tmp", "w") as f:
+        f.write(str(size))
+    os.replace(size_path + ".tmp", size_path)
+
+
+def read_csv(path, columns=None):
+    """
+    read a csv of the dataset schema with explicit dtypes
+
+    Arguments:
+        path: path of the csv file
+        columns: columns to read, all columns when None
+
+    Returns:
+        dataframe
+    """
+
+    return pd.read_csv(path, dtype=DTYPES, usecols=columns)
+
+
+def load_final_data(columns=None):
+    """
+    read the final dataset, only the given columns are loaded
+
+    Arguments:
+        columns: columns to read, all columns when None
+
+    Returns:
+        dataframe
+    """
+
+    if parquet_current():
+        table = pq.read_table(
+            parquet_path(), columns=columns, memory_map=True
+        )
+        return table.to_pandas()
+    return read_csv(final_data_path(), columns)
+
+
+def load_test_data(columns=None):
+    """
+    read the test dataset, only the given columns are loaded
+
+    Arguments:
+        columns: columns to read, all columns when None
+
+    Returns:
+        dataframe
+    """
+
+    return read_csv(os.path.join(test_data_path, TEST_DATA_FILE), columns)
+
+
+def iter_final_data(columns=None, chunksize=100000):
+    """
+    read the final dataset chunk by chunk
+
+    Arguments:
+        columns: columns to read, all columns when None
+        chunksize: maximum rows per chunk
+
+    Yields:
+        dataframes of at most chunksize rows
+    """
+
+    if parquet_current():
+        for part in sorted(glob.glob(os.path.join(parquet_path(), "*.parquet"))):
+            parquet_file = pq.ParquetFile(part, memory_map=True)
+            for batch in parquet_file.iter_batches(
+                    batch_size=chunksize, columns=columns):
+                yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(
+            final_data_path(), dtype=DTYPES, usecols=columns,
+            chunksize=chunksize
+        )
+
+
+def read_final_data_from(offset, columns=None):
+    """
+    read the rows of finaldata.csv that start at a byte offset
+
+    Arguments:
+        offset: size of finaldata.csv before the rows were appended, 0
+            reads the whole file
+        columns: columns to read, all columns when None
+
+    Returns:
+        dataframe
+    """
+
+    with open(final_data_path(), "rb") as f:
+        if not offset:
+            return pd.read_csv(f, dtype=DTYPES, usecols=columns)
+        f.seek(offset)
+        return pd.read_csv(
+            f, header=None, names=list(DTYPES), dtype=DTYPES, usecols=columns
+        )
+
+
+def _remove_parquet(path):
+    """
+    remove a parquet directory so readers fall back to the csv
+    """
+
+    for part in glob.glob(os.path.join(path, "*.parquet")):
+        os.remove(part)
+    for tmp_file in glob.glob(os.path.join(path, ".*.tmp")):
+        os.remove(tmp_file)
+    for size_file in glob.glob(os.path.join(path, PARQUET_CSV_SIZE_FILE + "*")):
+        os.remove(size_file)
+    if os.path.isdir(path):
+        os.rmdir(path)
+
+
+class FinalDataWriter:
+    """
+    write the final dataset chunk by chunk, the files are swapped in when
+    the writer is closed so readers never see a partial dataset, an
+    append copies finaldata.csv first
+
+    Arguments:
+        append: add the rows to the existing dataset instead of
+            replacing it
+    """
+
+    def __init__(self, append=False):
+        self.append = append and os.path.exists(final_data_path())
+        self.rows = 0
+        self._parquet_writer = None
+
+        if self.append:
+            # rows are appended to a copy, readers keep the published
+            # file until close replaces it
+            shutil.copyfile(final_data_path(), final_data_path() + ".tmp")
+            self._csv_file = open(final_data_path() + ".tmp", "a", newline="")
+            self._parquet_dir = parquet_path()
+            if parquet_enabled() and not parquet_current():
+                self._copy_csv_to_parquet()
+        else:
+            self._csv_file = open(final_data_path() + ".tmp", "w", newline="")
+            self._csv_file.write(",".join(DTYPES) + "\n")
+            self._parquet_dir = os.path.join(
+                output_folder_path, "." + FINAL_DATA_PARQUET + ".tmp"
+            )
+            _remove_parquet(self._parquet_dir)
+            if parquet_enabled():
+                os.makedirs(self._parquet_dir)
+
+        if parquet_enabled():
+            parts = glob.glob(os.path.join(self._parquet_dir, "part-*.parquet"))
+            self._part_file = os.path.join(
+                self._parquet_dir, f"part-{len(parts):05d}.parquet"
+            )
+            # hidden name, parquet readers skip it until it is renamed
+            self._tmp_part_file = os.path.join(
+                self._parquet_dir, f".part-{len(parts):05d}.parquet.tmp"
+            )
+
+    def _copy_csv_to_parquet(self):
+        """
+        first parquet copy of a dataset that only exists as csv
+        """
+
+        tmp_dir = os.path.join(
+            output_folder_path, "." + FINAL_DATA_PARQUET + ".tmp"
+        )
+        _remove_parquet(tmp_dir)
+        os.makedirs(tmp_dir)
+        writer = pq.ParquetWriter(
+            os.path.join(tmp_dir, "part-00000.parquet"), PARQUET_SCHEMA
+        )
+        for chunk in pd.read_csv(
+                final_data_path(), dtype=DTYPES, chunksize=100000):
+            writer.write_table(
+                pa.Table.from_pandas(
+                    chunk, schema=PARQUET_SCHEMA, preserve_index=False
+                )
+            )
+        writer.close()
+        _write_parquet_csv_size(tmp_dir, os.path.getsize(final_data_path()))
+        _remove_parquet(self._parquet_dir)
+        os.replace(tmp_dir, self._parquet_dir)
+
+    def write(self, data):
+        """
+        write a chunk of rows
+
+        Arguments:
+            data: dataframe of the dataset schema
+        """
+
+        if not len(data.index):
+            return
+        data = data.loc[:, list(DTYPES)]
+        data.to_csv(self._csv_file, header=False, index=False)
+        self.rows += len(data.index)
+
+        if parquet_enabled():
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(
+                    self._tmp_part_file, PARQUET_SCHEMA
+                )
+            self._parquet_writer.write_table(
+                pa.Table.from_pandas(
+                    data, schema=PARQUET_SCHEMA, preserve_index=False
+                )
+            )
+
+    def close(self):
+        """
+        publish the written rows
+        """
+
+        self._csv_file.close()
+        if parquet_enabled():
+            # recorded before the part is published, the parts do not
+            # match the csv on disk until the csv is replaced below
+            _write_parquet_csv_size(
+                self._parquet_dir,
+                os.path.getsize(final_data_path() + ".tmp")
+            )
+        if self._parquet_writer is None and parquet_enabled() \
+                and not self.append:
+            # an empty dataset still gets a part with the schema
+            pq.write_table(PARQUET_SCHEMA.empty_table(), self._tmp_part_file)
+            os.replace(self._tmp_part_file, self._part_file)
+        elif self._parquet_writer is not None:
+            self._parquet_writer.close()
+            os.replace(self._tmp_part_file, self._part_file)
+
+        if self.append:
+            os.replace(final_data_path() + ".tmp", final_data_path())
+            if not parquet_enabled():
+                _remove_parquet(self._parquet_dir)
+            return
+
+        _remove_parquet(parquet_path())
+        os.replace(final_data_path() + ".tmp", final_data_path())
+        if parquet_enabled():
+            os.replace(self._parquet_dir, parquet_path())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._abort()
+
+    def _abort(self):
+        """
+        drop the partial output, the published dataset is unchanged
+        """
+
+        self._csv_file.close()
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            os.remove(self._tmp_part_file)
+        os.remove(final_data_path() + ".tmp")
+        if not self.append:
+            _remove_parquet(self._parquet_dir)
+
+
+def write_final_data(data):
+    """
+    write the final dataset, replacing the existing one
+
+    Arguments:
+        data: dataframe of the dataset schema
+    """
+
+    with FinalDataWriter() as writer:
+        writer.write(data)
+
+
+def append_final_data(data):
+    """
+    append rows to the final dataset, as a new parquet part
+
+    Arguments:
+        data: dataframe of the dataset schema
+    """
+
+    with FinalDataWriter(append=True) as writer:
+        writer.write(data)
@@ -0,0 +1,233 @@
+"""
+Module: dependency_audit.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Offline check of the installed packages, replaces pip list --outdated
+      which needs the network
+    -- read_requirements:
+        pinned versions of requirements.txt
+    -- installed_versions:
+        versions of the installed distributions from importlib.metadata
+    -- index_versions:
+        latest version of each package in a locally mirrored package
+        index (a directory with one folder of wheels and sdists per
+        package), optional
+    -- audit_dependencies:
+        status of every pinned package: ok, missing, mismatch (installed
+        version differs from the pin) or outdated (newer version in the
+        local index)
+    -- latest_audit:
+        latest result of the background audit job, refreshed when older
+        than the configured time to live
+"""
+
+from importlib import metadata
+import json
+import os
+import re
+import time
+
+from background import BackgroundJob
+from settings import load_config
+
+
+# Load config.json and get path variables
+config = load_config()
+
+output_model_path = config['output_model_path']
+audit_config = config.get('dependency_audit', {})
+requirements_file = audit_config.get('requirements_file', 'requirements.txt')
+local_index_path = audit_config.get('local_index')
+audit_ttl = audit_config.get('ttl_seconds', 86400)
+AUDIT_FILE = "dependencyaudit.json"
+
+ARCHIVE_SUFFIXES = (".whl", ".tar.gz", ".tar.bz2", ".zip")
+
+
+def normalize_name(name):
+    """
+    canonical form of a package name (PEP 503)
+    """
+
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def version_key(version):
+    """
+    sort key of a version string, numeric parts compare as numbers
+    """
+
+    return [
+        (0, int(part)) if part.isdigit() else (1, part)
+        for part in re.split(r"[.+-]", version)
+    ]
+
+
+def read_requirements(path):
+    """
+    pinned packages of a requirements file
+
+    Arguments:
+        path: requirements file with name==version lines
+
+    Returns:
+        dict of normalized package name to pinned version, None for
+        packages without a pin
+    """
+
+    pins = {}
+    with open(path, "r") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line or line.startswith("-"):
+                continue
+            match = re.match(r"([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:==\s*(\S+))?", line)
+            if match:
+                pins[normalize_name(match.group(1))] = match.group(2)
+    return pins
+
+
+def installed_versions():
+    """
+    installed distributions of the running interpreter
+
+    Returns:
+        dict of normalized package name to installed version
+    """
+
+    return {
+        normalize_name(dist.metadata["Name"]): dist.version
+        for dist in metadata.distributions()
+        if dist.metadata["Name"]
+    }
+
+
+def _archive_version(package, filename):
+    """
+    version in the file name of a wheel or sdist, None if it is not an
+    archive of the package
+    """
+
+    if not filename.endswith(ARCHIVE_SUFFIXES):
+        return None
+    if filename.endswith(".whl"):
+        parts = filename.split("-")
+        name, version = parts[0], parts[1] if len(parts) > 1 else None
+    else:
+        stem = next(
+            filename[:-len(suffix)]
+            for suffix in ARCHIVE_SUFFIXES if filename.endswith(suffix)
+        )
+        name, _, version = stem.rpartition("-")
+    if not version or normalize_name(name) != package:
+        return None
+    return version
+
+
+def index_versions(index_path):
+    """
+    latest version of each package of a local package index
+
+    Arguments:
+        index_path: directory with one folder per package, as written by
+            pip download or a simple index mirror
+
+    Returns:
+        dict of normalized package name to latest version
+    """
+
+    latest = {}
+    for folder in os.listdir(index_path):
+        package_dir = os.path.join(index_path, folder)
+        if not os.path.isdir(package_dir):
+            continue
+        package = normalize_name(folder)
+        versions = [
+            version for version in (
+                _archive_version(package, filename)
+                for filename in os.listdir(package_dir)
+            )
+            if version
+        ]
+        if versions:
+            latest[package] = max(versions, key=version_key)
+    return latest
+
+
+def audit_dependencies():
+    """
+    compare the installed packages with the pinned versions and the
+    local index
+
+    Returns:
+        dict with a list of {name, installed, pinned, latest, status} per
+        pinned package and the names of the packages that are not ok
+    """
+
+    pins = read_requirements(requirements_file)
+    installed = installed_versions()
+    latest = index_versions(local_index_path) if local_index_path else {}
+
+    packages = []
+    for name, pinned in sorted(pins.items()):
+        current = installed.get(name)
+        newest = latest.get(name)
+        if current is None:
+            status = "missing"
+        elif pinned is not None and current != pinned:
+            status = "mismatch"
+        elif newest is not None and version_key(newest) > version_key(current):
+            status = "outdated"
+        else:
+            status = "ok"
+        packages.append({
+            "name": name,
+            "installed": current,
+            "pinned": pinned,
+            "latest": newest,
+            "status": status,
+        })
+
+    return {
+        "requirements_file": requirements_file,
+        "local_index": local_index_path,
+        "packages": packages,
+        "attention": [p["name"] for p in packages if p["status"] != "ok"],
+    }
+
+
+# refreshed in the background, never on a request thread
+audit_job = BackgroundJob(
+    "dependency-audit",
+    audit_dependencies,
+    os.path.join(output_model_path, AUDIT_FILE),
+    interval=audit_config.get('interval_seconds', 3600)
+)
+
+
+def latest_audit():
+    """
+    latest result of the audit job, a refresh is requested when it is
+    older than the time to live
+
+    Returns:
+        dict with status, finished_at, the audit result and whether it
+        is stale, status is pending until the first audit has finished
+    """
+
+    audit_job.start()
+    latest = audit_job.latest()
+    if latest is None:
+        return {"status": "pending"}
+
+    stale = time.time() - latest["finished_at_epoch"] > audit_ttl
+    if stale:
+        audit_job.trigger()
+    return dict(latest, stale=stale)
+
+
+if __name__ == '__main__':
+    print(json.dumps(audit_dependencies(), indent=2))
@@ -2,72 +2,305 @@
 Module: deployment.py
 Author: Amandeep Singh
 Date Written: 22-Jan-2023
-Date Modified: 22-Jan-2023
+Date Modified: 18-Oct-2026
 
 Description:
     Module is for deploying the model to production enviornment
     - moves the model, score and data to production enviornment
+    - every deployment is a release, a directory named after the content
+      hash of its artifacts: releases/<hash>/ with the model, the linear
+      fast path artifact, the drift reference, the model selection
+      leaderboard, the score and the ingested files record
+    - artifacts are copied as raw bytes, or hard linked when
+      deployment.hardlink_artifacts is set (all writers of the artifacts
+      replace files instead of rewriting them), the model is never
+      pickled again
+    - the current symlink is swapped atomically to the new release, the
+      artifact names of the deployment directory point through it, so
+      serving workers never read a half written release
+    - the model registry of the serving workers checks the inode of the
+      model file, which changes with every release, and reloads the model
+      without a restart
+    - rollback points current back to an earlier release
+    - the files of a deployment made before releases are kept as a
+      release of their own by the first deploy_release, so the first
+      release can be rolled back to them
 """
 
-import pickle
-import os
+from datetime import datetime
+import hashlib
 import json
-from flask import Flask, session, jsonify, request
-import pandas as pd
-import numpy as np
-from sklearn import metrics
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
+import logging
+import os
+import shutil
+
+from filehash import file_content_hash
+import instrumentation
+from linear_scorer import LINEAR_MODEL_FILE
+from model_selection import LEADERBOARD_FILE
+from settings import load_config
 
 
 # Load config.json and correct path variable
-with open('config.json', 'r') as f:
-    config = json.load(f)
+config = load_config()
 
 output_folder_path = os.path.join(config['output_folder_path'])
 model_path = os.path.join(config['output_model_path'])
 prod_deployment_path = os.path.join(config['prod_deployment_path'])
+deployment_config = config.get('deployment', {})
+keep_releases = deployment_config.get('keep_releases', 5)
+hardlink_artifacts = deployment_config.get('hardlink_artifacts', False)
+RELEASES_DIR = "releases"
+CURRENT_LINK = "current"
+RELEASE_FILE = "release.json"
+HISTORY_FILE = "history.json"
 
 
-# function for deployment
-def store_model_into_pickle(model):
+def release_artifacts():
     """
-    copy the latest pickle file, the latestscore.txt value, and the ingestfiles.txt
-    file into the deployment directory
+    files of a release and where they are taken from
+
+    Returns:
+        dict of artifact name to its source path
     """
 
-    # save the model to deployment path
-    pickle.dump(
-        model,
-        open(
-            os.path.join(prod_deployment_path, 'trainedmodel.pkl'),
-            'wb'
-        )
+    # drift imports pandas, deployment itself does not need it
+    from drift import DRIFT_REFERENCE_FILE
+
+    return {
+        'trainedmodel.pkl': os.path.join(model_path, 'trainedmodel.pkl'),
+        LINEAR_MODEL_FILE: os.path.join(model_path, LINEAR_MODEL_FILE),
+        DRIFT_REFERENCE_FILE: os.path.join(model_path, DRIFT_REFERENCE_FILE),
+        LEADERBOARD_FILE: os.path.join(model_path, LEADERBOARD_FILE),
+        'latestscore.txt': os.path.join(model_path, "latestscore.txt"),
+        'ingestedfiles.txt': os.path.join(
+            output_folder_path, "ingestedfiles.txt"
+        ),
+    }
+
+
+def _releases_path(*names):
+    return os.path.join(prod_deployment_path, RELEASES_DIR, *names)
+
+
+def _link_or_copy(source, target):
+    """
+    hard link source to target if enabled, otherwise or when linking
+    fails copy the bytes to a read only file
+    """
+
+    if hardlink_artifacts:
+        try:
+            os.link(source, target)
+            return
+        except OSError:
+            pass
+    shutil.copyfile(source, target)
+    os.chmod(target, 0o444)
+
+
+def _symlink_atomic(target, link_path):
+    """
+    point link_path to target, replacing any existing file in one step
+    """
+
+    tmp_link = link_path + '.tmp'
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+    os.symlink(target, tmp_link)
+    os.replace(tmp_link, link_path)
+
+
+def _read_history():
+    try:
+        with open(_releases_path(HISTORY_FILE), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def _write_history(history):
+    tmp_file = _releases_path(HISTORY_FILE + '.tmp')
+    with open(tmp_file, "w") as f:
+        json.dump(history, f, indent=2)
+    os.replace(tmp_file, _releases_path(HISTORY_FILE))
+
+
+def current_release():
+    """
+    id of the release serving traffic, None before the first release
+    """
+
+    link = os.path.join(prod_deployment_path, CURRENT_LINK)
+    if not os.path.islink(link):
+        return None
+    return os.path.basename(os.readlink(link))
+
+
+def create_release(artifacts):
+    """
+    store artifacts as a release directory named after their content
+
+    Arguments:
+        artifacts: dict of artifact name to source path
+
+    Returns:
+        id of the release
+    """
+
+    hashes = {
+        name: file_content_hash(path) for name, path in sorted(artifacts.items())
+    }
+    release_id = hashlib.sha256(
+        json.dumps(hashes, sort_keys=True).encode()
+    ).hexdigest()[:16]
+
+    release_dir = _releases_path(release_id)
+    if os.path.isdir(release_dir):
+        return release_id
+
+    # build the release next to its final place and move it in one step
+    tmp_dir = _releases_path(f".{release_id}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, path in artifacts.items():
+        _link_or_copy(path, os.path.join(tmp_dir, name))
+    with open(os.path.join(tmp_dir, RELEASE_FILE), "w") as f:
+        json.dump({
+            "release": release_id,
+            "created_at": datetime.now().isoformat(),
+            "artifacts": hashes,
+        }, f, indent=2)
+    os.replace(tmp_dir, release_dir)
+    return release_id
+
+
+def activate_release(release_id, record=True):
+    """
+    make a release the current one
+
+    Arguments:
+        release_id: id of the release
+        record: append the release to the deployment history, rollbacks
+            move along the history without changing it
+
+    the artifact names of the deployment directory are symlinks through
+    current, they are created once, files of older deployments are
+    replaced by them
+    """
+
+    release_dir = _releases_path(release_id)
+    if not os.path.isdir(release_dir):
+        raise ValueError(f"unknown release {release_id}")
+
+    _symlink_atomic(
+        os.path.join(RELEASES_DIR, release_id),
+        os.path.join(prod_deployment_path, CURRENT_LINK)
     )
+    for name in os.listdir(release_dir):
+        if name == RELEASE_FILE:
+            continue
+        link_path = os.path.join(prod_deployment_path, name)
+        target = os.path.join(CURRENT_LINK, name)
+        if not (os.path.islink(link_path)
+                and os.readlink(link_path) == target):
+            _symlink_atomic(target, link_path)
+
+    if record:
+        history = [entry for entry in _read_history() if entry != release_id]
+        history.append(release_id)
+        _write_history(history)
+
+
+def adopt_flat_deployment():
+    """
+    keep the artifact files of a deployment made before releases as a
+    release and record it in the deployment history, without activating
+    it
+
+    Returns:
+        id of the release, None when there are no such files
+    """
+
+    artifacts = {}
+    for name in release_artifacts():
+        path = os.path.join(prod_deployment_path, name)
+        if os.path.isfile(path) and not os.path.islink(path):
+            artifacts[name] = path
+    if not artifacts:
+        return None
+
+    release_id = create_release(artifacts)
+    history = [entry for entry in _read_history() if entry != release_id]
+    _write_history([release_id] + history)
+    return release_id
+
+
+def prune_releases():
+    """
+    remove the oldest releases beyond keep_releases, never the current
+    one
+    """
+
+    history = _read_history()
+    current = current_release()
+    for release_id in history[:-keep_releases]:
+        if release_id != current:
+            shutil.rmtree(_releases_path(release_id), ignore_errors=True)
+    _write_history([
+        release_id for release_id in history
+        if os.path.isdir(_releases_path(release_id))
+    ])
+
+
+# function for deployment
+@instrumentation.timed("deployment")
+def deploy_release():
+    """
+    store the trained model, its artifacts, the latestscore.txt value and
+    the ingestedfiles.txt record as a release and make it the current one
+
+    Returns:
+        id of the deployed release
+    """
+
+    os.makedirs(_releases_path(), exist_ok=True)
+    if current_release() is None:
+        adopt_flat_deployment()
+    release_id = create_release(release_artifacts())
+    activate_release(release_id)
+    prune_releases()
+    return release_id
 
-    # save the scores
-    with open(os.path.join(model_path, "latestscore.txt"), "r") as f:
-        contents = f.read()
-    with open(
-        os.path.join(prod_deployment_path, "latestscore.txt"), "w"
-    ) as scoring_file:
-        scoring_file.write(contents)
 
-    # save the data file
-    with open(os.path.join(output_folder_path, "ingestedfiles.txt"), "r") as f:
-        contents = f.read()
-    with open(
-        os.path.join(prod_deployment_path, "ingestedfiles.txt"), "w"
-    ) as scoring_file:
-        scoring_file.write(contents)
+# name of deploy_release before deployments were releases
+store_model_into_pickle = deploy_release
+
+
+def rollback(release_id=None):
+    """
+    point current back to an earlier release
+
+    Arguments:
+        release_id: release to activate, the one deployed before the
+            current release by default
+
+    Returns:
+        id of the activated release
+    """
+
+    if release_id is None:
+        history = _read_history()
+        current = current_release()
+        earlier = history[:history.index(current)] if current in history else []
+        if not earlier:
+            raise ValueError("no earlier release to roll back to")
+        release_id = earlier[-1]
+
+    activate_release(release_id, record=False)
+    return release_id
 
 
 if __name__ == "__main__":
-    # load model
-    model = pickle.load(
-        open(
-            os.path.join(model_path, 'trainedmodel.pkl'),
-            'rb'
-        )
-    )
-    store_model_into_pickle(model)
+    logging.basicConfig(level=logging.INFO)
+    logging.info(f"Deployed release {deploy_release()}")
@@ -2,12 +2,13 @@
 Module: diagnostics.py
 Author: Amandeep Singh
 Date Written: 23-Jan-2023
-Date Modified: 23-Jan-2023
+Date Modified: 18-Oct-2026
 
 Description:
     - Module performs following diagnostics
     -- model_predictions:
         returns the predicitons on given dataset using saved model
+        - deployed model is kept in memory by the model registry
 
     -- dataframe_summary:
         returns the summary statistics of each numeric column
@@ -15,25 +16,32 @@ Description:
     -- dataframe_missing_values:
         returns pct of missing values of each columns as list
 
+    - summary statistics and missing values are served from the stats
+      cache, they are only recomputed when the dataset changes
+
     -- execution_time:
-        returns a list of execution time of training.py and ingestion.py
+        returns the latest timing of training and ingestion, measured by
+        a background job on a snapshot of the data, with import time and
+        compute time reported separately
 
     -- outdated_packages_list:
-        returns the list of outdated packages
+        returns the latest dependency audit, installed packages compared
+        with requirements.txt and an optional local index by a
+        background job
 """
 
 import os
-import json
-import subprocess
-import pickle
 import pandas as pd
-import numpy as np
-import timeit
 
+from dependency_audit import latest_audit
+from execution_timing import timing_enabled, timing_job
+from model_registry import get_registry
+from stats_cache import get_stats
+from dataset import FEATURE_COLUMNS, MODEL_COLUMNS, load_final_data
+from settings import load_config
 
 # Load config.json and get environment variables
-with open('config.json', 'r') as f:
-    config = json.load(f)
+config = load_config()
 
 output_folder_path = os.path.join(config['output_folder_path'])
 test_data_path = os.path.join(config['test_data_path'])
@@ -42,33 +50,31 @@ prod_deployment_path = os.path.join(config['prod_deployment_path'])
 # Function to get model predictions
 
 
-def model_predictions(data):
+def model_predictions(data, model=None):
     """
     read the deployed model and a test dataset, calculate predictions
 
     Arguments:
-        data: dataset on which predictions need to be made
+        data: dataset on which predictions need to be made, either a
+            dataframe or a matrix of the feature columns
+        model: model to predict with, defaults to the deployed model
 
     Returns:
         list of predicted values
     """
 
-    # load model
-    model = pickle.load(
-        open(
-            os.path.join(prod_deployment_path, 'trainedmodel.pkl'),
-            'rb'
-        )
-    )
+    # deployed model is loaded once and reloaded only on a new deployment
+    if model is None:
+        model = get_registry(
+            os.path.join(prod_deployment_path, 'trainedmodel.pkl')
+        ).get()
+
+    # feature matrices are labelled with the columns the model was fit on
+    if not isinstance(data, pd.DataFrame):
+        data = pd.DataFrame(data, columns=FEATURE_COLUMNS)
 
     # predict the values
-    preds = model.predict(
-        data.loc[:,
-                      ["lastmonth_activity",
-                       "lastyear_activity",
-                       "number_of_employees"]
-                      ]
-    )
+    preds = model.predict(data.loc[:, FEATURE_COLUMNS])
 
     return preds
 
@@ -83,31 +89,9 @@ def dataframe_summary():
         list of summary stats
     """
 
-    # read test data
-    data = pd.read_csv(
-        os.path.join(output_folder_path, "finaldata.csv"),
-        dtype={
-            "corporation": str,
-            "lastmonth_activity": int,
-            "lastyear_activity": int,
-            "number_of_employees": int,
-            "exited": int
-        },
-        usecols=[
-            "lastmonth_activity",
-            "lastyear_activity",
-            "number_of_employees",
-        ]
-    )
-    summary_statistics_list = []
-    for col in ["lastmonth_activity",
-                "lastyear_activity",
-                "number_of_employees"]:
-        stats = []
-        stats.append(data[col].mean())
-        stats.append(data[col].median())
-        stats.append(data[col].std())
-        summary_statistics_list.append(stats)
+    # mean, median and std of each feature column, cached per dataset
+    # version
+    summary_statistics_list = get_stats()["summary"]
 
     # return value should be a list containing all summary statistics
     return summary_statistics_list
@@ -121,22 +105,9 @@ def dataframe_missing_values():
         list of missing value percentage
     """
 
-    # read test data
-    data = pd.read_csv(
-        os.path.join(output_folder_path, "finaldata.csv"),
-        dtype={
-            "corporation": str,
-            "lastmonth_activity": int,
-            "lastyear_activity": int,
-            "number_of_employees": int,
-            "exited": int
-        }
-    )
-    # list with missing pct value for each column
-    missing_pct_list = [
-        missing / data.shape[0] for missing in data.isna().sum().tolist()
-    ]
-
+    # list with missing pct value for each column, cached per dataset
+    # version
+    missing_pct_list = get_stats()["missing"]
 
     return missing_pct_list
 
@@ -145,56 +116,49 @@ def dataframe_missing_values():
 
 def execution_time():
     """
-    calculate timing of training.py and ingestion.py
-    """
+    latest timing of train_model and merge_multiple_dataframe
 
-    execution_times_list = []
+    the steps are not run on the calling thread, the background job
+    times them on a snapshot of the data and this returns its last
+    result straight away
 
-    starttime = timeit.default_timer()
-    os.system("python training.py")
-    timing = timeit.default_timer() - starttime
-    execution_times_list.append(timing)
+    Returns:
+        dict with status, finished_at and the import and compute
+        seconds of each step, status is pending until the first run
+        has finished and disabled unless execution_timing.enabled is set
+    """
+
+    if not timing_enabled:
+        return {"status": "disabled"}
 
-    starttime = timeit.default_timer()
-    os.system("python ingestion.py")
-    timing = timeit.default_timer() - starttime
-    execution_times_list.append(timing)
+    timing_job.start()
+    latest = timing_job.latest()
+    if latest is None:
+        return {"status": "pending"}
 
-    return execution_times_list
+    return latest
 
 # Function to check dependencies
 
 
 def outdated_packages_list():
     """
-    to get the list of outdated packages
+    latest audit of the installed packages, served from the background
+    audit job without touching pip or the network
+
+    Returns:
+        dict with status, finished_at, stale and the status of each
+        pinned package
     """
 
-    outdated = subprocess.check_output(
-        ["pip", "list", "--outdated"]
-    )
+    outdated = latest_audit()
 
     return outdated
 
 
 if __name__ == '__main__':
-    # read test data
-    data = pd.read_csv(
-        os.path.join(output_folder_path, "finaldata.csv"),
-        dtype={
-            "corporation": str,
-            "lastmonth_activity": int,
-            "lastyear_activity": int,
-            "number_of_employees": int,
-            "exited": int
-        },
-        usecols=[
-            "lastmonth_activity",
-            "lastyear_activity",
-            "number_of_employees",
-            "exited"
-        ]
-    )
+    # read the final dataset
+    data = load_final_data(MODEL_COLUMNS)
     model_predictions(data)
     dataframe_summary()
     dataframe_missing_values()
@@ -0,0 +1,368 @@
+"""
+Module: drift.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Drift detection of the deployed model on newly ingested data
+    -- new_source_files:
+        source files missing from the deployed ingestedfiles.txt or whose
+        content hash differs from their record, so files replaced in place
+        are ingested again
+    -- save_reference:
+        histogram of each feature on the training data, written next to
+        the model at training time (driftreference.json)
+    -- build_reference_from_chunks:
+        the same histograms in one chunked pass, with the bin edges taken
+        from the quantile sketch of the dataset, used by streaming training
+    -- detect_drift:
+        - f1 score of the deployed model on the new rows only, compared
+          with the deployed score of latestscore.txt
+        - population stability index and Kolmogorov-Smirnov distance of
+          each feature, new rows against the reference histograms
+        - drift is reported when the score drops by more than the
+          tolerance or a feature distribution has shifted
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+
+from dataset import (FEATURE_COLUMNS, MODEL_COLUMNS, TARGET_COLUMN,
+                     read_final_data_from)
+from filehash import file_content_hash
+import instrumentation
+from model_io import load_model
+from settings import load_config
+
+
+# Load config.json and get path variables
+config = load_config()
+
+input_folder_path = config['input_folder_path']
+model_path = os.path.join(config['output_model_path'])
+prod_deployment_path = os.path.join(config['prod_deployment_path'])
+drift_config = config.get('drift', {})
+reference_bins = drift_config.get('bins', 20)
+f1_tolerance = drift_config.get('f1_tolerance', 0.05)
+psi_threshold = drift_config.get('psi_threshold', 0.2)
+ks_alpha = drift_config.get('ks_alpha', 0.05)
+psi_min_rows = drift_config.get('psi_min_rows', 100)
+DRIFT_REFERENCE_FILE = "driftreference.json"
+
+# proportion given to empty bins, keeps the psi finite
+EMPTY_BIN = 1e-4
+
+
+def ingested_file_hashes():
+    """
+    content hashes of the files ingested for the deployed model
+
+    Returns:
+        dict of file name listed in the deployed ingestedfiles.txt to its
+        content hash, empty for records written before content hashes
+    """
+
+    record_path = os.path.join(prod_deployment_path, "ingestedfiles.txt")
+    if not os.path.exists(record_path):
+        return {}
+    with open(record_path, "r") as record_file:
+        return {
+            fields[1]: fields[4] if len(fields) > 4 else ""
+            for fields in (
+                line.rstrip("\n").split(",") for line in record_file
+            )
+            if len(fields) > 1
+        }
+
+
+# file path to its (mtime, size, inode) and content hash
+_source_hashes = {}
+
+
+def _source_file_hash(path):
+    """
+    content hash of a source file, hashed again only when its mtime, size
+    or inode change
+    """
+
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    known = _source_hashes.get(path)
+    if known is None or known[0] != key:
+        known = _source_hashes[path] = (key, file_content_hash(path))
+    return known[1]
+
+
+def new_source_files():
+    """
+    csv files of the input directory that the deployed model has not
+    seen, new files and files whose content changed since they were
+    ingested (files of records without a content hash compare by name)
+    """
+
+    ingested = ingested_file_hashes()
+    files = [
+        file for file in os.listdir(input_folder_path) if file[-4:] == ".csv"
+    ]
+    # forget the hashes of removed files
+    for path in set(_source_hashes) - {
+            os.path.join(input_folder_path, file) for file in files}:
+        del _source_hashes[path]
+    return sorted(
+        file for file in files
+        if file not in ingested or (
+            ingested[file] and ingested[file] != _source_file_hash(
+                os.path.join(input_folder_path, file)
+            )
+        )
+    )
+
+
+def _bin_counts(values, edges):
+    """
+    number of values in each bin, the outer bins are open ended
+    """
+
+    values = values[~np.isnan(values)]
+    return np.bincount(
+        np.searchsorted(edges, values, side="right"),
+        minlength=len(edges) + 1
+    )
+
+
+def build_reference(data):
+    """
+    reference histograms of the feature columns
+
+    Arguments:
+        data: dataframe of the training features
+
+    Returns:
+        dict of feature name to its inner bin edges, bin proportions and
+        number of values
+    """
+
+    reference = {}
+    for col in FEATURE_COLUMNS:
+        values = data[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        values = values[~np.isnan(values)]
+        # quantile bins, ties collapse into fewer bins
+        edges = np.unique(np.quantile(
+            values, np.linspace(0, 1, reference_bins + 1)[1:-1]
+        )) if values.size else np.array([])
+        counts = _bin_counts(values, edges)
+        reference[col] = {
+            "edges": edges.tolist(),
+            "proportions": (counts / max(values.size, 1)).tolist(),
+            "count": int(values.size),
+        }
+    return reference
+
+
+def build_reference_from_chunks(chunks, sketch):
+    """
+    reference histograms of a dataset read in chunks, for training sets
+    that do not fit in memory
+
+    Arguments:
+        chunks: iterable of dataframes with the feature columns
+        sketch: DatasetSketch of the same rows, the bin edges are taken
+            from its quantiles
+
+    Returns:
+        dict in the form of build_reference
+    """
+
+    levels = np.linspace(0, 1, reference_bins + 1)[1:-1]
+    edges = {}
+    for col in FEATURE_COLUMNS:
+        column = sketch.columns[col]
+        edges[col] = np.unique(
+            [column.quantiles.quantile(q) for q in levels]
+        ) if column.count else np.array([])
+    counts = {col: np.zeros(len(edges[col]) + 1, dtype=np.int64)
+              for col in FEATURE_COLUMNS}
+
+    for chunk in chunks:
+        for col in FEATURE_COLUMNS:
+            counts[col] += _bin_counts(
+                chunk[col].to_numpy(dtype=np.float64, na_value=np.nan),
+                edges[col]
+            )
+
+    reference = {}
+    for col in FEATURE_COLUMNS:
+        total = int(counts[col].sum())
+        reference[col] = {
+            "edges": edges[col].tolist(),
+            "proportions": (counts[col] / max(total, 1)).tolist(),
+            "count": total,
+        }
+    return reference
+
+
+def write_reference(reference, path=None):
+    """
+    write reference histograms atomically
+
+    Arguments:
+        reference: dict of build_reference
+        path: output file, driftreference.json of the model directory
+            by default
+    """
+
+    path = path or os.path.join(model_path, DRIFT_REFERENCE_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(reference, f)
+    os.replace(tmp_path, path)
+
+
+def save_reference(data, path=None):
+    """
+    write the reference histograms of the training features
+
+    Arguments:
+        data: dataframe of the training features
+        path: output file, driftreference.json of the model directory
+            by default
+    """
+
+    write_reference(build_reference(data), path)
+
+
+def load_reference():
+    """
+    reference histograms of the deployed model, None if the deployment
+    has none
+    """
+
+    try:
+        with open(
+            os.path.join(prod_deployment_path, DRIFT_REFERENCE_FILE), "r"
+        ) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def feature_drift(values, reference):
+    """
+    distribution shift of a feature against its reference histogram
+
+    Arguments:
+        values: numpy array of the new values
+        reference: reference histogram of the feature
+
+    Returns:
+        dict with psi, ks distance, ks critical value and whether the
+        feature drifted
+    """
+
+    edges = np.asarray(reference["edges"])
+    expected = np.asarray(reference["proportions"])
+    counts = _bin_counts(values, edges)
+    total = counts.sum()
+    if total == 0 or reference["count"] == 0:
+        return {"psi": 0.0, "ks": 0.0, "ks_critical": None, "drift": False}
+    actual = counts / total
+
+    psi = float(np.sum(
+        (actual - expected)
+        * np.log(np.maximum(actual, EMPTY_BIN) / np.maximum(expected, EMPTY_BIN))
+    ))
+    # largest gap of the two cdfs at the bin edges
+    ks = float(np.max(np.abs(np.cumsum(actual) - np.cumsum(expected))))
+    ks_critical = math.sqrt(-math.log(ks_alpha / 2) / 2) * math.sqrt(
+        (total + reference["count"]) / (total * reference["count"])
+    )
+    return {
+        "psi": psi,
+        "ks": ks,
+        "ks_critical": ks_critical,
+        # the psi of a handful of rows is noise, the ks critical value
+        # already accounts for the sample size
+        "drift": bool(
+            (psi > psi_threshold and total >= psi_min_rows)
+            or ks > ks_critical
+        ),
+    }
+
+
+def last_deployed_score():
+    """
+    f1 score of the deployed model, None if it has not been scored
+    """
+
+    try:
+        with open(
+            os.path.join(prod_deployment_path, "latestscore.txt"), "r"
+        ) as scoring_file:
+            return float(scoring_file.read())
+    except (OSError, ValueError):
+        return None
+
+
+@instrumentation.timed("drift")
+def detect_drift(new_rows):
+    """
+    check the deployed model against the newly ingested rows
+
+    Arguments:
+        new_rows: dataframe of the rows added by ingestion, or a dict
+            with their number ("rows") and the size of finaldata.csv
+            before they were appended ("offset"), only those rows are
+            read
+
+    Returns:
+        dict with the new and deployed f1 scores, the per feature tests
+        and drift, True when the model should be retrained
+    """
+
+    if not isinstance(new_rows, dict):
+        rows = new_rows
+    elif new_rows["rows"]:
+        rows = read_final_data_from(new_rows["offset"], MODEL_COLUMNS)
+    else:
+        rows = None
+    report = {"rows": 0 if rows is None else len(rows.index)}
+    if not report["rows"]:
+        report["drift"] = False
+        return report
+
+    # sklearn is imported on first use, finding new files does not need
+    # it
+    from sklearn import metrics
+
+    # score of the deployed model on the new rows only
+    model = load_model(os.path.join(prod_deployment_path, 'trainedmodel.pkl'))
+    preds = model.predict(rows.loc[:, FEATURE_COLUMNS])
+    report["new_f1_score"] = float(
+        metrics.f1_score(rows[TARGET_COLUMN], preds)
+    )
+    report["last_f1_score"] = last_deployed_score()
+    score_drift = (
+        report["last_f1_score"] is None
+        or report["new_f1_score"] < report["last_f1_score"] - f1_tolerance
+    )
+
+    reference = load_reference()
+    report["features"] = {}
+    if reference is not None:
+        report["features"] = {
+            col: feature_drift(
+                rows[col].to_numpy(dtype=np.float64, na_value=np.nan),
+                reference[col]
+            )
+            for col in FEATURE_COLUMNS
+        }
+    feature_shift = any(test["drift"] for test in report["features"].values())
+
+    report["score_drift"] = score_drift
+    report["feature_drift"] = feature_shift
+    report["drift"] = score_drift or feature_shift
+    return report
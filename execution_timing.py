@@ -0,0 +1,185 @@
+"""
+Module: execution_timing.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Timing of the training and ingestion steps without touching the
+      live dataset and model
+    -- snapshot_workspace:
+        copies the source data and the ingested data to a temporary
+        directory, the steps write their outputs there, with a config.json
+        forced to a cheap configuration (no model selection, one joblib
+        worker)
+    -- measure_execution_time:
+        times train_model and merge_multiple_dataframe on a snapshot,
+        import time of each module is reported separately from the
+        compute time
+        - isolated: in a freshly spawned worker process, so the import
+          times are those of a cold interpreter, at a lower cpu priority
+          (nice) than the serving process
+        - in process: in the calling process, which changes its working
+          directory while it runs, meant for the command line only
+    -- timing_job:
+        background job that refreshes the timings every interval, the
+        diagnostics endpoint serves its latest result, only started when
+        execution_timing.enabled is set (off by default)
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import importlib
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+from background import BackgroundJob
+from settings import load_config
+
+
+# Load config.json and get path variables
+config = load_config()
+
+input_folder_path = config['input_folder_path']
+output_folder_path = config['output_folder_path']
+output_model_path = config['output_model_path']
+timing_config = config.get('execution_timing', {})
+timing_enabled = timing_config.get('enabled', False)
+TIMING_FILE = "executiontime.json"
+
+# settings of the snapshot, the timing must stay cheap next to serving
+SNAPSHOT_CONFIG = {
+    "model_selection": {"enabled": False, "n_jobs": 1},
+}
+
+# steps in the order they are timed: (name, module, function)
+TIMED_STEPS = [
+    ("training", "training", "train_model"),
+    ("ingestion", "ingestion", "merge_multiple_dataframe"),
+]
+
+
+def snapshot_workspace(workdir):
+    """
+    copy the data the timed steps read into workdir
+
+    Arguments:
+        workdir: empty directory of the snapshot
+    """
+
+    snapshot_config = dict(config)
+    for key, values in SNAPSHOT_CONFIG.items():
+        snapshot_config[key] = dict(config.get(key, {}), **values)
+    with open(os.path.join(workdir, "config.json"), "w") as f:
+        json.dump(snapshot_config, f, indent=4)
+    shutil.copytree(input_folder_path, os.path.join(workdir, input_folder_path))
+    if os.path.isdir(output_folder_path):
+        shutil.copytree(
+            output_folder_path, os.path.join(workdir, output_folder_path)
+        )
+    else:
+        os.makedirs(os.path.join(workdir, output_folder_path))
+    os.makedirs(os.path.join(workdir, output_model_path), exist_ok=True)
+
+
+def _lower_priority(increment):
+    """
+    initializer of the timing worker, lowers its cpu priority
+    """
+
+    try:
+        os.nice(increment)
+    except OSError:
+        pass
+
+
+def _time_steps(workdir, code_dir):
+    """
+    import and run every timed step in workdir
+
+    Returns:
+        dict of step name to its import and compute seconds
+    """
+
+    if code_dir not in sys.path:
+        sys.path.insert(0, code_dir)
+    os.chdir(workdir)
+
+    timings = {}
+    for name, module_name, function_name in TIMED_STEPS:
+        starttime = timeit.default_timer()
+        module = importlib.import_module(module_name)
+        import_seconds = timeit.default_timer() - starttime
+
+        starttime = timeit.default_timer()
+        getattr(module, function_name)()
+        compute_seconds = timeit.default_timer() - starttime
+
+        timings[name] = {
+            "import_seconds": import_seconds,
+            "compute_seconds": compute_seconds,
+        }
+    return timings
+
+
+def measure_execution_time(isolated=True):
+    """
+    time the training and ingestion steps on a snapshot of the data
+
+    Arguments:
+        isolated: run the steps in a spawned worker process instead of
+            the calling process
+
+    Returns:
+        dict with the import and compute seconds of each step, in
+        TIMED_STEPS order, the mode it was measured in and, when
+        isolated, the time spent starting the worker
+    """
+
+    code_dir = os.path.dirname(os.path.abspath(__file__))
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="timing-") as workdir:
+        snapshot_workspace(workdir)
+        result = {"isolated": isolated}
+
+        if isolated:
+            starttime = timeit.default_timer()
+            with ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_lower_priority,
+                initargs=(timing_config.get('nice', 10),)
+            ) as executor:
+                timings = executor.submit(
+                    _time_steps, workdir, code_dir
+                ).result()
+            # spawning the interpreter and shipping the result back
+            result["worker_overhead_seconds"] = (
+                timeit.default_timer() - starttime
+                - sum(sum(step.values()) for step in timings.values())
+            )
+        else:
+            try:
+                timings = _time_steps(workdir, code_dir)
+            finally:
+                os.chdir(cwd)
+
+    result["steps"] = timings
+    return result
+
+
+# refreshed in the background, never on a request thread
+timing_job = BackgroundJob(
+    "execution-timing",
+    lambda: measure_execution_time(timing_config.get('isolated', True)),
+    os.path.join(output_model_path, TIMING_FILE),
+    interval=timing_config.get('interval_seconds', 3600)
+)
+
+
+if __name__ == '__main__':
+    print(json.dumps(measure_execution_time(), indent=2))
@@ -0,0 +1,33 @@
+"""
+Module: filehash.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Content hash of files, standard library only so deployment, scoring
+      and reporting can version their files without importing the data
+      stack
+    -- file_content_hash:
+        sha256 of a file, read block by block
+"""
+
+import hashlib
+
+
+def file_content_hash(file_path):
+    """
+    sha256 of the file content, read block by block
+
+    Arguments:
+        file_path: path of the file
+
+    Returns:
+        hex digest of the file content
+    """
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -3,176 +3,275 @@
 Module: fullprocess.py
 Author: Amandeep Singh
 Date Written: 24-Jan-2023
-Date Modified: 24-Jan-2023
+Date Modified: 18-Oct-2026
 
 Description:
     - Module peforms following actions
         - check if there are any new files in source dir
-            - if there are new files perform data ingestion
+            - if there are new files perform incremental data ingestion
         - if there are new files, then retrain the model
-            - if new model score is different then the old score
+            - if the deployed model scores worse on the new rows, or the
+              feature distributions of the new rows have drifted
         - then redploy and perform the diagnosis
+    - the actions are steps of a pipeline (pipeline.py)
+        - a step whose input files are unchanged since its last run is
+          skipped, so a rerun resumes at the first stale step
+        - api calls and reporting run concurrently after deployment
+        - timings of each run are kept in pipelinemanifest.json
+        - the modules of the steps are imported when the pipeline is
+          built or the step runs, importing fullprocess does not load
+          pandas and a run without new files does not load sklearn or
+          matplotlib
+        - ingestion passes the number of new rows and where they start
+          in finaldata.csv to the drift step, which reads only those rows
+        - steps listed in profiling.stages are profiled (profiling.py)
 """
 
 import os
 import json
-import pickle
 import logging
-import pandas as pd
-from sklearn import metrics
+import sys
 
-import ingestion
-import training
-import scoring
-import deployment
-import apicalls
-import reporting
-
-RETRAIN_FLAG = False
+from linear_scorer import LINEAR_MODEL_FILE
+from model_selection import LEADERBOARD_FILE
+from pipeline import Pipeline, Step
+import profiling
+from settings import load_config
 
 # Load config.json and correct path variable
-with open('config.json', 'r') as f:
-    config = json.load(f)
+config = load_config()
 
 input_folder_path = os.path.join(config['input_folder_path'])
 model_path = os.path.join(config['output_model_path'])
 prod_deployment_path = os.path.join(config['prod_deployment_path'])
 output_folder_path = config['output_folder_path']
 test_data_path = os.path.join(config['test_data_path'])
+pipeline_workers = config.get('pipeline_workers', 2)
+PIPELINE_MANIFEST_FILE = "pipelinemanifest.json"
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(levelname)s: %(asctime)s %(process)d %(message)s',
-    filename=os.path.join(os.getcwd(), 'logs/process.log'),
-    filemode='w')
-
-# Check and read new data
-# first, read ingestedfiles.txt
-
-logging.info("Read ingested files record!")
-ingestion_records_df = pd.read_csv(
-    os.path.join(
-        prod_deployment_path,
-        'ingestedfiles.txt'
-    ),
-    names=[
-        'source_dir',
-        'filename',
-        'records',
-        'date',
-        'undef'
-    ]
-)
 
-# second, determine whether the source data folder has files that aren't
-# listed in ingestedfiles.txt
+def ingest_new_data(results):
+    """
+    perform incremental data ingestion
 
-new_files = []
+    Returns:
+        dict with the number of rows added to the final dataset ("rows")
+        and the size of finaldata.csv before they were appended
+        ("offset")
+    """
 
-for file in os.listdir(os.path.join(
-        os.getcwd(), input_folder_path)):
-    if ((file not in ingestion_records_df.filename.tolist())
-            & (file[-4:] == ".csv")):
-        new_files.append(file)
+    from dataset import final_data_path
+    import ingestion
 
-if len(new_files) > 0:
-    logging.info(f"{len(new_files)} new files!")
-    RETRAIN_FLAG = True
-else:
-    logging.info("No new files, stoping the process!")
+    logging.info("Ingesting new data!")
+    # incremental ingestion appends, the new rows start at the current
+    # end of finaldata.csv
+    offset = (
+        os.path.getsize(final_data_path())
+        if os.path.exists(final_data_path()) else 0
+    )
+    added = ingestion.merge_multiple_dataframe(incremental=True)
+    return {
+        "rows": added if isinstance(added, int) else len(added.index),
+        "offset": offset,
+    }
 
 
-# Deciding whether to proceed, part 1
-# if you found new data, you should proceed. otherwise, do end the process here
+def new_files_arrived(results):
+    """
+    whether there are source files that are not yet ingested
+    """
 
-if RETRAIN_FLAG:
-    logging.info("Ingesting new data!")
-    ingestion.merge_multiple_dataframe()
-
-# Checking for model drift
-# check whether the score from the deployed model is different from the
-# score from the model that uses the newest ingested data
-
-# read the f1 score for last model training
-with open(
-    os.path.join(prod_deployment_path, "latestscore.txt"), "r"
-) as scoring_file:
-    last_f1_score = scoring_file.read()
-if RETRAIN_FLAG:
-    logging.info("Validate the model scores!")
+    import drift
+
+    return len(drift.new_source_files()) > 0
 
-    # read test data
-    new_data = pd.read_csv(
-        os.path.join(output_folder_path, "finaldata.csv"),
-        dtype={
-            "corporation": str,
-            "lastmonth_activity": int,
-            "lastyear_activity": int,
-            "number_of_employees": int,
-            "exited": int
-        },
-        usecols=[
-            "lastmonth_activity",
-            "lastyear_activity",
-            "number_of_employees",
-            "exited"
-        ]
-    )
-    # load model
-    model = pickle.load(
-        open(
-            os.path.join(model_path, 'trainedmodel.pkl'),
-            'rb'
-        )
-    )
-    # predict and calculate the f1 metric
-    preds = model.predict(
-        new_data.loc[:,
-                     ["lastmonth_activity",
-                      "lastyear_activity",
-                      "number_of_employees"]
-                     ]
-    )
-    new_f1_score = metrics.f1_score(
-        new_data["exited"],
-        preds
-    )
+
+def check_drift(results):
+    """
+    score the deployed model on the new rows only and compare the feature
+    distributions of the new rows with the training reference
+
+    Returns:
+        drift report, see drift.detect_drift
+    """
+
+    import drift
+
+    logging.info("Validate the model scores!")
+    drift_report = drift.detect_drift(results["ingestion"])
+    logging.info(f"Drift report: {json.dumps(drift_report)}")
 
     # check model drift
-    if last_f1_score == new_f1_score:
+    if not drift_report["drift"]:
         logging.info("No change in model scores!")
-        RETRAIN_FLAG = False
     else:
         logging.info("Change in model scores!")
+    return drift_report
+
 
-# Deciding whether to proceed, part 2
-# if you found model drift, you should proceed. otherwise, do end the
-# process here
+def train(results):
+    import training
 
-if RETRAIN_FLAG:
-    logging.info("Retrain and score the model!")
-    training.train_model()
-    scoring.score_model()
+    logging.info("Retrain the model!")
+    training.train_model(new_rows=results["drift"]["rows"])
 
-# Re-deployment
-# if you found evidence for model drift, re-run the deployment.py script
 
+def score(results):
+    import scoring
+
+    logging.info("Score the model!")
+    return scoring.score_model()
+
+
+def deploy(results):
+    import deployment
 
-if RETRAIN_FLAG:
     logging.info("Redployment of the model!")
-    model = pickle.load(
-        open(
-            os.path.join(model_path, 'trainedmodel.pkl'),
-            'rb'
-        )
-    )
-    deployment.store_model_into_pickle(model)
+    return deployment.deploy_release()
+
 
-# Diagnostics and reporting
-# run diagnostics.py and reporting.py for the re-deployed model
+def call_apis(results):
+    import apicalls
 
-if RETRAIN_FLAG:
-    logging.info("Perform model diagnosis and reporting!")
+    logging.info("Perform model diagnosis!")
     apicalls.api_calls()
+
+
+def report(results):
+    import reporting
+
+    logging.info("Perform model reporting!")
     reporting.score_model()
+
+
+def model_file(name, folder=model_path):
+    return os.path.join(folder, name)
+
+
+def build_pipeline():
+    """
+    steps of the full process
+
+    Returns:
+        Pipeline
+    """
+
+    from dataset import TEST_DATA_FILE, final_data_path
+    from drift import DRIFT_REFERENCE_FILE
+    from scoring import SCORE_FILE
+
+    records_file = os.path.join(output_folder_path, "ingestedfiles.txt")
+    test_file = os.path.join(test_data_path, TEST_DATA_FILE)
+    model_artifacts = [
+        model_file('trainedmodel.pkl'),
+        model_file(LINEAR_MODEL_FILE),
+        model_file(DRIFT_REFERENCE_FILE),
+        model_file(LEADERBOARD_FILE),
+    ]
+
+    steps = [
+        # if you found new data, you should proceed. otherwise, do end
+        # the process here
+        Step(
+            "ingestion", ingest_new_data,
+            inputs=['config.json', input_folder_path],
+            outputs=[final_data_path(), records_file],
+            condition=new_files_arrived
+        ),
+        Step(
+            "drift", check_drift,
+            inputs=[
+                final_data_path(),
+                model_file('trainedmodel.pkl', prod_deployment_path),
+                model_file(DRIFT_REFERENCE_FILE, prod_deployment_path),
+                model_file('latestscore.txt', prod_deployment_path),
+            ],
+            after=["ingestion"]
+        ),
+        # if you found model drift, you should proceed. otherwise, do end
+        # the process here
+        Step(
+            "training", train,
+            inputs=[final_data_path()],
+            outputs=model_artifacts,
+            after=["drift"],
+            condition=lambda results: results["drift"]["drift"]
+        ),
+        Step(
+            "scoring", score,
+            inputs=[model_file('trainedmodel.pkl'), test_file],
+            outputs=[
+                model_file('latestscore.txt'),
+                model_file(SCORE_FILE),
+            ],
+            after=["training"]
+        ),
+        Step(
+            "deployment", deploy,
+            inputs=model_artifacts + [
+                model_file('latestscore.txt'), records_file
+            ],
+            outputs=[
+                model_file(name, prod_deployment_path) for name in (
+                    'trainedmodel.pkl', LINEAR_MODEL_FILE,
+                    DRIFT_REFERENCE_FILE, LEADERBOARD_FILE, 'latestscore.txt',
+                    'ingestedfiles.txt'
+                )
+            ],
+            after=["scoring"]
+        ),
+        # diagnostics and reporting of the re-deployed model, independent
+        # of each other
+        Step(
+            "apicalls", call_apis,
+            inputs=[
+                model_file('trainedmodel.pkl', prod_deployment_path),
+                test_file,
+            ],
+            outputs=[model_file('apireturns.txt')],
+            after=["deployment"]
+        ),
+        Step(
+            "reporting", report,
+            inputs=[
+                model_file('trainedmodel.pkl', prod_deployment_path),
+                test_file,
+            ],
+            outputs=[model_file('confusion_matrix.png')],
+            after=["deployment"]
+        ),
+    ]
+    for step in steps:
+        step.func = profiling.profile_stage(step.name, step.func)
+    return Pipeline(
+        steps,
+        os.path.join(model_path, PIPELINE_MANIFEST_FILE),
+        max_workers=pipeline_workers
+    )
+
+
+def main():
+    """
+    run the full process, steps that are up to date are skipped
+
+    Returns:
+        dict of step name to its status, see Pipeline.run
+    """
+
+    # Setup logging, runs append to the log of the previous runs
+    os.makedirs('logs', exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(levelname)s: %(asctime)s %(process)d %(message)s',
+        filename=os.path.join(os.getcwd(), 'logs/process.log'),
+        filemode='a')
+
+    statuses = build_pipeline().run()
+    logging.info(f"Pipeline steps: {json.dumps(statuses)}")
+    return statuses
+
+
+if __name__ == "__main__":
+    statuses = main()
+    sys.exit(1 if "failed" in statuses.values() else 0)
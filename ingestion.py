@@ -2,86 +2,531 @@
 Module: ingestion.py
 Author: Amandeep Singh
 Date Written: 22-Jan-2023
-Date Modified: 22-Jan-2023
+Date Modified: 18-Oct-2026
 
 Description:
     Module is to read the raw data from specified directory and performs the processing
     - look for the csv files in input directory
     - read the files and create a single dataset
     - drop the duplicates
-    - write the final dataset to output directory
+    - write the final dataset to output directory (csv and parquet)
     - keep the processing record in ingestedfiles.txt
 
+    Incremental mode
+    - only parse the files that are not listed in ingestedfiles.txt or
+      whose content hash has changed since they were ingested
+    - drop the rows already in the final dataset using the persisted
+      row hash index
+    - append the new rows to the final dataset
+    - the row hash index is built in a staging copy and saved with the
+      fingerprint of the final dataset once the rows are written, an index
+      that does not match the dataset (a crash in between) is rebuilt from
+      the dataset, so the rows of a rerun are never duplicated
+
+    Source files are parsed in parallel by a thread or process pool, the
+    results are merged in file name order so the output is reproducible
+
+    Streaming mode
+    - read each file in chunks sized from the configured memory budget
+    - dedupe with the row hash index, which spills sorted runs to disk
+      when it outgrows its share of the budget, into a staging copy that
+      only replaces the index once the output is complete
+    - write the output chunk by chunk, peak memory does not depend on the
+      total input size
+
+    Every ingested file is summarized in a column sketch (moments, null
+    counts, quantiles) of its new rows, the file sketches are merged into
+    the dataset sketch and the summary statistics cache is filled for the
+    new version of the dataset
+
 """
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+import hashlib
+import io
 import os
-import json
+import shutil
+import timeit
+import numpy as np
 import pandas as pd
 
+import instrumentation
+from dataset import (DTYPES, FinalDataWriter, append_final_data,
+                     final_data_path, iter_final_data, write_final_data)
+from filehash import file_content_hash
+from row_index import RowHashIndex
+from settings import load_config
+import stats_cache
+
 
 # Load config.json and get input and output paths
-with open('config.json', 'r') as f:
-    config = json.load(f)
+config = load_config()
 
 input_folder_path = config['input_folder_path']
 output_folder_path = config['output_folder_path']
 record_datasource_path = config['record_datasource_path']
+ingestion_workers = config.get('ingestion_workers', 4)
+ingestion_executor = config.get('ingestion_executor', 'thread')
+ingestion_streaming = config.get('ingestion_streaming', False)
+memory_budget = int(config.get('ingestion_memory_budget_mb', 256) * (1 << 20))
 RECORD_DATASORUCE_FILE = "ingestedfiles.txt"
+ROW_INDEX_DIR = "rowhashes"
+
+
+def parse_source_file(file_path, known_hash=None):
+    """
+    read a source csv with the ingestion dtypes, runs in the worker pool
+
+    Arguments:
+        file_path: path of the csv file
+        known_hash: content hash of the ingested version of the file,
+            the file is not parsed when its content is unchanged
+
+    Returns:
+        tuple of dataframe (None if unchanged), content hash and
+        parse time in seconds
+    """
+
+    starttime = timeit.default_timer()
+
+    # the file is read once for both the content hash and the parser
+    with open(file_path, "rb") as f:
+        content = f.read()
+    file_hash = hashlib.sha256(content).hexdigest()
+    if file_hash == known_hash:
+        return None, file_hash, 0.0
+
+    data = pd.read_csv(io.BytesIO(content), dtype=DTYPES)
+    return data, file_hash, timeit.default_timer() - starttime
+
+
+def parse_source_files(files, known_hashes=None):
+    """
+    parse the source files in parallel
+
+    Arguments:
+        files: csv file names in the input directory
+        known_hashes: dict of file name to the content hash it was
+            ingested with, unchanged files are skipped
+
+    Returns:
+        list of parse_source_file results, in the order of files
+    """
+
+    known_hashes = known_hashes or {}
+    paths = [os.path.join(input_folder_path, file) for file in files]
+    hashes = [known_hashes.get(file) for file in files]
+
+    if ingestion_workers <= 1 or len(files) <= 1:
+        return list(map(parse_source_file, paths, hashes))
+
+    executor_class = (
+        ProcessPoolExecutor if ingestion_executor == "process"
+        else ThreadPoolExecutor
+    )
+    with executor_class(max_workers=ingestion_workers) as executor:
+        # map keeps the input order whatever order the files finish in
+        return list(executor.map(parse_source_file, paths, hashes))
+
+
+def row_hashes(data):
+    """
+    64 bit hash of every row, used to find the duplicate rows
+
+    Arguments:
+        data: dataframe read with the ingestion dtypes
+
+    Returns:
+        numpy array of uint64 hashes, one per row
+    """
+
+    # fixed column order so the hashes do not depend on the file layout
+    return pd.util.hash_pandas_object(
+        data.loc[:, list(DTYPES)], index=False
+    ).to_numpy()
+
+
+def read_ingestion_records():
+    """
+    read the records of the already ingested files
+
+    Returns:
+        dict of file name to its record
+        [source dir, file name, rows, date, content hash, parse seconds]
+    """
+
+    records = {}
+    record_path = os.path.join(output_folder_path, RECORD_DATASORUCE_FILE)
+    if not os.path.exists(record_path):
+        return records
+
+    with open(record_path, "r") as record_file:
+        for line in record_file:
+            fields = line.rstrip("\n").split(",")
+            if len(fields) < 4:
+                continue
+            # older records have no content hash or parse time
+            fields = (fields + ["", ""])[:6]
+            records[fields[1]] = fields
+    return records
+
+
+def write_ingestion_records(records_list):
+    """
+    write the ingested file records to ingestedfiles.txt
+    """
+
+    # replaced atomically, deployed releases may hard link the old file
+    record_path = os.path.join(output_folder_path, RECORD_DATASORUCE_FILE)
+    with open(record_path + ".tmp", "w") as record_file:
+        for record in records_list:
+            for element in record:
+                record_file.write(str(element) + ",")
+            record_file.write('\n')
+    os.replace(record_path + ".tmp", record_path)
+
+
+def ingestion_record(file, rows, file_hash, parse_seconds):
+    """
+    record of an ingested file, also counted in the ingest_file metrics
+    """
+
+    # every ingestion mode builds its records here, also when the files
+    # were parsed in worker processes
+    instrumentation.observe_stage("ingest_file", parse_seconds)
+    instrumentation.record_rows("ingest_file", rows)
+    instrumentation.record_bytes(
+        "ingest_file", os.path.getsize(os.path.join(input_folder_path, file))
+    )
+
+    date_time_obj = datetime.now()
+    thetimenow = (
+        str(date_time_obj.year)
+        + str(date_time_obj.month)
+        + str(date_time_obj.day)
+    )
+    return [
+        input_folder_path,
+        file,
+        rows,
+        thetimenow,
+        file_hash,
+        f"{parse_seconds:.6f}"
+    ]
+
+
+def row_index_path():
+    """
+    directory of the row hash index of the final dataset
+    """
+
+    return os.path.join(output_folder_path, ROW_INDEX_DIR)
+
+
+def final_data_version():
+    """
+    version of the final dataset the row hash index is saved with, None
+    when there is no final dataset
+    """
+
+    if not os.path.exists(final_data_path()):
+        return None
+    return stats_cache.dataset_fingerprint()
+
+
+def load_row_index(index_budget=None):
+    """
+    row hash index of the final dataset, rebuilt chunk by chunk from the
+    final dataset when it is missing or saved for another version of it
+
+    Arguments:
+        index_budget: bytes of hashes kept in memory, half of the
+            ingestion memory budget by default
+
+    Returns:
+        RowHashIndex
+    """
+
+    index_budget = index_budget or memory_budget // 2
+    index = RowHashIndex(row_index_path(), index_budget)
+    version = final_data_version()
+    if index.version != version:
+        index = new_row_index(index_budget)
+        if version is not None:
+            for chunk in iter_final_data():
+                hashes = np.unique(row_hashes(chunk))
+                index.add(hashes[~index.contains(hashes)])
+        index = RowHashIndex.replace(row_index_path(), index, version)
+    return index
+
+
+def staged_row_index(index_budget=None):
+    """
+    copy of the row hash index of the final dataset that new rows are
+    added to, swapped in with RowHashIndex.replace once the rows are
+    written
+    """
+
+    index = load_row_index(index_budget)
+    return RowHashIndex.staged(
+        index.path, row_index_path() + ".new", index.memory_budget
+    )
+
+
+def new_row_index(index_budget=None):
+    """
+    empty row hash index, built next to the current one and swapped in
+    with RowHashIndex.replace
+    """
+
+    path = row_index_path() + ".new"
+    shutil.rmtree(path, ignore_errors=True)
+    return RowHashIndex(path, index_budget or memory_budget // 2)
+
+
+def source_files():
+    """
+    csv files of the input directory, in a stable order
+    """
+
+    return sorted(
+        file for file in os.listdir(input_folder_path)
+        if file[-4:] == ".csv"
+    )
+
+
+def sketch_by_file(data):
+    """
+    sketch the rows of each ingested file and merge the file sketches
+
+    Arguments:
+        data: dataframe with the file number as first index level
+
+    Returns:
+        DatasetSketch of all rows
+    """
+
+    sketch = stats_cache.new_sketch()
+    for _, file_rows in data.groupby(level=0, sort=False):
+        sketch.merge(stats_cache.sketch_frame(file_rows))
+    return sketch
+
+
+def drop_duplicate_rows(data, hashes):
+    """
+    keep the first occurrence of each row
+
+    Returns:
+        deduplicated dataframe and the hashes of its rows
+    """
+
+    _, first = np.unique(hashes, return_index=True)
+    first.sort()
+    return data.iloc[first], hashes[first]
 
 
 # Function for data ingestion
-def merge_multiple_dataframe():
+@instrumentation.timed("ingestion")
+def merge_multiple_dataframe(incremental=False, streaming=None):
     """
     check for datasets, compile them together, and write to an output file
+
+    Arguments:
+        incremental: only ingest new or modified files and append their
+            new rows to the existing final dataset
+        streaming: read and write in chunks within the memory budget,
+            defaults to ingestion_streaming of config.json
+
+    Returns:
+        dataframe of the rows added to the final dataset, in streaming
+        mode only the number of rows added
+    """
+
+    if streaming is None:
+        streaming = ingestion_streaming
+    if streaming:
+        added = merge_streaming(incremental)
+    elif incremental:
+        added = merge_new_dataframes()
+    else:
+        added = merge_all_dataframes()
+
+    instrumentation.record_rows(
+        "ingestion", added if isinstance(added, int) else len(added.index)
+    )
+
+    # fill the summary statistics cache for the new dataset version
+    if os.path.exists(final_data_path()):
+        stats_cache.get_stats()
+
+    return added
+
+
+def merge_all_dataframes():
+    """
+    ingest all source files and replace the final dataset
+
+    Returns:
+        dataframe of the final dataset
     """
 
     # look for the csv files in sepecified path location
     # read each file and then combine them to single dataset
     dfs = []
     records_list = []
-    for file in os.listdir(input_folder_path):
-        if file[-4:] == ".csv":
-            data = pd.read_csv(
-                os.path.join(input_folder_path, file)
-            )
-
-            # add to dataframes list
-            dfs.append(data)
+    files = source_files()
+    for file, (data, file_hash, parse_seconds) in zip(
+            files, parse_source_files(files)):
+        # add to dataframes list
+        dfs.append(data)
 
-            # record the details of ingested file
-            date_time_obj = datetime.now()
-            thetimenow = (
-                str(date_time_obj.year)
-                + str(date_time_obj.month)
-                + str(date_time_obj.day)
-            )
-            records = [
-                input_folder_path,
-                file,
-                len(data.index),
-                thetimenow
-            ]
-            records_list.append(records)
-
-    with open(
-        os.path.join(output_folder_path, RECORD_DATASORUCE_FILE), "w"
-    ) as record_file:
-        for record in records_list:
-            for element in record:
-                record_file.write(str(element) + ",")
-            record_file.write('\n')
+        # record the details of ingested file
+        records_list.append(
+            ingestion_record(file, len(data.index), file_hash, parse_seconds)
+        )
 
-    # combine all the imported dataframes
-    final_df = pd.concat(dfs)
+    # combine all the imported dataframes, keyed by file number
+    final_df = pd.concat(dfs, keys=range(len(dfs)))
 
     # deduplication of the data
-    final_df.drop_duplicates(keep="first", inplace=True)
+    final_df, hashes = drop_duplicate_rows(final_df, row_hashes(final_df))
 
     # write the processed data for further processing
-    final_df.to_csv(
-        os.path.join(output_folder_path, "finaldata.csv"), index=False
+    write_final_data(final_df)
+    index = new_row_index()
+    index.add(hashes)
+    RowHashIndex.replace(row_index_path(), index, final_data_version())
+    stats_cache.save_sketch(sketch_by_file(final_df))
+    write_ingestion_records(records_list)
+
+    return final_df.reset_index(drop=True)
+
+
+def merge_new_dataframes():
+    """
+    ingest the new and modified files and append their new rows to the
+    final dataset
+
+    Returns:
+        dataframe of the rows appended to the final dataset
+    """
+
+    records = read_ingestion_records()
+
+    dfs = []
+    files = source_files()
+    known_hashes = {file: record[4] for file, record in records.items()}
+    for file, (data, file_hash, parse_seconds) in zip(
+            files, parse_source_files(files, known_hashes)):
+        if data is None:
+            continue
+        dfs.append(data)
+        records[file] = ingestion_record(
+            file, len(data.index), file_hash, parse_seconds
+        )
+
+    if not dfs:
+        return pd.DataFrame(columns=list(DTYPES))
+
+    # dedupe the new rows among themselves and against the final dataset
+    new_df = pd.concat(dfs, keys=range(len(dfs)))
+    new_df, hashes = drop_duplicate_rows(new_df, row_hashes(new_df))
+    index = staged_row_index()
+    is_new = ~index.contains(hashes)
+    new_df, hashes = new_df[is_new], hashes[is_new]
+    index.add(hashes)
+
+    # append the new rows to the final dataset, then swap in the index
+    # saved with the new version of the dataset
+    sketch = stats_cache.current_sketch()
+    append_final_data(new_df)
+    RowHashIndex.replace(row_index_path(), index, final_data_version())
+
+    sketch.merge(sketch_by_file(new_df))
+    stats_cache.save_sketch(sketch)
+    write_ingestion_records(records.values())
+
+    return new_df.reset_index(drop=True)
+
+
+def chunk_rows_for_budget(file_path, budget):
+    """
+    number of csv rows per chunk that fit in the memory budget
+
+    Arguments:
+        file_path: csv file used to estimate the size of a row
+        budget: bytes available for a chunk
+
+    Returns:
+        rows per chunk
+    """
+
+    sample = pd.read_csv(file_path, dtype=DTYPES, nrows=1000)
+    row_bytes = sample.memory_usage(index=False, deep=True).sum() / max(
+        len(sample.index), 1
     )
+    # the parsed chunk, its row hashes and the deduplicated copy
+    return max(1000, int(budget / (3 * (row_bytes + 8))))
+
+
+def merge_streaming(incremental=False):
+    """
+    ingest the source files chunk by chunk with bounded memory, half of
+    the budget is used for the chunks and half for the row hash index
+
+    Arguments:
+        incremental: only ingest new or modified files and append their
+            new rows to the existing final dataset
+
+    Returns:
+        number of rows added to the final dataset
+    """
+
+    files = source_files()
+    if not files:
+        return 0
+    records = read_ingestion_records() if incremental else {}
+    # spilled runs stay in the staging directory until the writer has
+    # committed the rows, a failed file leaves the index unchanged
+    index = staged_row_index() if incremental else new_row_index()
+    sketch = (
+        stats_cache.current_sketch() if incremental
+        else stats_cache.new_sketch()
+    )
+    chunk_rows = chunk_rows_for_budget(
+        os.path.join(input_folder_path, files[0]), memory_budget // 2
+    )
+
+    with FinalDataWriter(append=incremental) as writer:
+        for file in files:
+            file_path = os.path.join(input_folder_path, file)
+            file_hash = file_content_hash(file_path)
+            if file in records and records[file][4] == file_hash:
+                continue
+
+            starttime = timeit.default_timer()
+            rows = 0
+            file_sketch = stats_cache.new_sketch()
+            for chunk in pd.read_csv(
+                    file_path, dtype=DTYPES, chunksize=chunk_rows):
+                rows += len(chunk.index)
+                chunk, hashes = drop_duplicate_rows(chunk, row_hashes(chunk))
+                is_new = ~index.contains(hashes)
+                index.add(hashes[is_new])
+                writer.write(chunk[is_new])
+                file_sketch.update(chunk[is_new])
+            sketch.merge(file_sketch)
+
+            records[file] = ingestion_record(
+                file, rows, file_hash, timeit.default_timer() - starttime
+            )
+
+    RowHashIndex.replace(row_index_path(), index, final_data_version())
+    stats_cache.save_sketch(sketch)
+    write_ingestion_records(records.values())
+
+    return writer.rows
 
 
 if __name__ == '__main__':
@@ -0,0 +1,515 @@
+"""
+Module: instrumentation.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Counters, gauges and histograms of the process stages, exposed in
+      the Prometheus text format by the /metrics endpoint of app.py
+    -- counter / gauge / histogram:
+        metric of the process wide registry, created on first use
+    -- timed:
+        context manager and decorator, observes the duration of a stage
+        in stage_duration_seconds and counts it in stage_runs_total with
+        its outcome, observe_stage does the same for a duration measured
+        by the caller
+    -- record_rows / record_bytes:
+        rows processed and bytes read by a stage
+    -- render:
+        Prometheus text of the metrics of all processes
+    - multi process: every process (gunicorn worker, pipeline run) writes
+      its values to its own file in the metrics directory, at most every
+      flush_interval_seconds and at exit; render adds up the files of all
+      processes, counters and histogram buckets are sums so the totals are
+      exact whatever worker served a request
+    - files of processes that have exited are folded into one archive file
+      under a lock, so totals survive worker restarts; gauges are current
+      values, those of live processes are added up and those of exited
+      processes are dropped
+    - a forked child starts from empty values, the parent keeps reporting
+      what it recorded before the fork
+"""
+
+import atexit
+from contextlib import ContextDecorator
+import fcntl
+import glob
+import json
+import math
+import os
+import threading
+import time
+
+from settings import load_config
+
+
+# Load config.json and get the metrics directory
+config = load_config()
+
+metrics_config = config.get('metrics', {})
+metrics_path = metrics_config.get('directory', os.path.join('logs', 'metrics'))
+flush_interval = metrics_config.get('flush_interval_seconds', 5.0)
+ARCHIVE_FILE = "metrics-archive.json"
+LOCK_FILE = ".metrics.lock"
+
+# Prometheus default buckets with longer ones for training and ingestion
+DEFAULT_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    30.0, 60.0, 300.0, 1800.0,
+)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Counter:
+    """
+    monotonically increasing value per label set
+
+    Arguments:
+        name: metric name
+        help: description of the metric
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.values = {}
+
+    def inc(self, amount=1.0, **labels):
+        key = _label_key(labels)
+        with _registry.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+        _registry.maybe_flush()
+
+    def state(self):
+        return [[dict(key), value] for key, value in self.values.items()]
+
+    def merge(self, state):
+        for labels, value in state:
+            key = _label_key(labels)
+            self.values[key] = self.values.get(key, 0.0) + value
+
+    def lines(self):
+        for key, value in sorted(self.values.items()):
+            yield f"{self.name}{_format_labels(key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """
+    current value per label set, such as a queue depth
+
+    Arguments:
+        name: metric name
+        help: description of the metric
+    """
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with _registry.lock:
+            self.values[_label_key(labels)] = float(value)
+        _registry.maybe_flush()
+
+
+class Histogram:
+    """
+    distribution of observed values per label set, in cumulative buckets
+
+    Arguments:
+        name: metric name
+        help: description of the metric
+        buckets: upper bounds of the buckets, +Inf is added
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # label key to [bucket counts (not cumulative), sum, count]
+        self.values = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = next(
+            (i for i, bound in enumerate(self.buckets) if value <= bound),
+            len(self.buckets)
+        )
+        with _registry.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [
+                    [0] * (len(self.buckets) + 1), 0.0, 0
+                ]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+        _registry.maybe_flush()
+
+    def state(self):
+        return {
+            "buckets": list(self.buckets),
+            "values": [
+                [dict(key), list(counts), total, count]
+                for key, (counts, total, count) in self.values.items()
+            ],
+        }
+
+    def merge(self, state):
+        # values of a process with other bucket bounds can not be added
+        if tuple(state["buckets"]) != self.buckets:
+            return
+        for labels, counts, total, count in state["values"]:
+            key = _label_key(labels)
+            entry = self.values.get(key)
+            if entry is None:
+                self.values[key] = [list(counts), total, count]
+            else:
+                entry[0] = [a + b for a, b in zip(entry[0], counts)]
+                entry[1] += total
+                entry[2] += count
+
+    def lines(self):
+        for key, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(
+                    self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == math.inf else _format_value(bound)
+                yield (f"{self.name}_bucket"
+                       f"{_format_labels(key + (('le', le),))} {cumulative}")
+            yield f"{self.name}_sum{_format_labels(key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(key)} {count}"
+
+
+def _format_value(value):
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(key):
+    if not key:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"')
+         .replace("\n", "\\n"))
+        for name, value in key
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class _Registry:
+    """
+    metrics of this process and their file in the metrics directory
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.metrics = {}
+        self._reset()
+
+    def _reset(self):
+        for metric in self.metrics.values():
+            metric.values = {}
+        self.pid = os.getpid()
+        self.file = os.path.join(
+            metrics_path, f"metrics-{self.pid}-{time.time_ns()}.json"
+        )
+        self.last_flush = 0.0
+
+    def after_fork(self):
+        self.lock = threading.RLock()
+        self._reset()
+
+    def get(self, cls, name, help, **options):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, **options)
+            return metric
+
+    def state(self):
+        with self.lock:
+            return {
+                name: {
+                    "kind": metric.kind,
+                    "help": metric.help,
+                    "state": metric.state(),
+                }
+                for name, metric in self.metrics.items()
+                if metric.values
+            }
+
+    def flush(self):
+        """
+        write the values of this process to its file
+        """
+
+        with self.lock:
+            self.last_flush = time.monotonic()
+            state = self.state()
+            if not state:
+                return
+            os.makedirs(metrics_path, exist_ok=True)
+            _write_json(self.file, {"pid": self.pid, "metrics": state})
+
+    def maybe_flush(self):
+        if time.monotonic() - self.last_flush >= flush_interval:
+            try:
+                self.flush()
+            except OSError:
+                # metrics must never break the stage being measured
+                pass
+
+
+def _write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_registry = _Registry()
+os.register_at_fork(after_in_child=_registry.after_fork)
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        _registry.flush()
+    except OSError:
+        pass
+
+
+def counter(name, help):
+    """
+    counter of the process wide registry
+
+    Arguments:
+        name: metric name, ending in _total by convention
+        help: description of the metric
+
+    Returns:
+        Counter
+    """
+
+    return _registry.get(Counter, name, help)
+
+
+def gauge(name, help):
+    """
+    gauge of the process wide registry
+
+    Arguments:
+        name: metric name
+        help: description of the metric
+
+    Returns:
+        Gauge
+    """
+
+    return _registry.get(Gauge, name, help)
+
+
+def histogram(name, help, buckets=DEFAULT_BUCKETS):
+    """
+    histogram of the process wide registry
+
+    Arguments:
+        name: metric name
+        help: description of the metric
+        buckets: upper bounds of the buckets
+
+    Returns:
+        Histogram
+    """
+
+    return _registry.get(Histogram, name, help, buckets=buckets)
+
+
+STAGE_SECONDS = histogram(
+    "stage_duration_seconds", "Duration of a process stage"
+)
+STAGE_RUNS = counter(
+    "stage_runs_total", "Runs of a process stage by outcome"
+)
+ROWS = counter(
+    "rows_processed_total", "Rows processed by a process stage"
+)
+BYTES = counter(
+    "bytes_read_total", "Bytes read from disk by a process stage"
+)
+
+
+def observe_stage(stage, seconds, outcome="ok"):
+    """
+    record one run of a stage measured by the caller
+
+    Arguments:
+        stage: name of the stage
+        seconds: duration of the run
+        outcome: ok or error
+    """
+
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    STAGE_RUNS.inc(stage=stage, outcome=outcome)
+
+
+class timed(ContextDecorator):
+    """
+    measure a stage, as a context manager or a decorator
+
+    Arguments:
+        stage: name of the stage, the stage label of the metrics
+    """
+
+    def __init__(self, stage):
+        self.stage = stage
+        # start times per thread, the same object is used by nested and
+        # concurrent calls of a decorated function
+        self._starts = threading.local()
+
+    def __enter__(self):
+        self._starts.__dict__.setdefault("stack", []).append(
+            time.perf_counter()
+        )
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe_stage(
+            self.stage,
+            time.perf_counter() - self._starts.stack.pop(),
+            "ok" if exc_type is None else "error"
+        )
+        return False
+
+
+def record_rows(stage, rows):
+    """
+    count rows processed by a stage
+    """
+
+    ROWS.inc(rows, stage=stage)
+
+
+def record_bytes(stage, size):
+    """
+    count bytes read by a stage
+    """
+
+    BYTES.inc(size, stage=stage)
+
+
+def _merge_files(paths):
+    """
+    sum of the metrics of the given files
+
+    Returns:
+        dict of metric name to Counter, Gauge or Histogram
+    """
+
+    merged = {}
+    for path in paths:
+        data = _read_json(path)
+        if not data:
+            continue
+        for name, metric in data["metrics"].items():
+            target = merged.get(name)
+            if target is None:
+                if metric["kind"] == "histogram":
+                    target = Histogram(
+                        name, metric["help"], metric["state"]["buckets"]
+                    )
+                elif metric["kind"] == "gauge":
+                    target = Gauge(name, metric["help"])
+                else:
+                    target = Counter(name, metric["help"])
+                merged[name] = target
+            target.merge(metric["state"])
+    return merged
+
+
+def _archive_exited():
+    """
+    fold the files of exited processes into the archive file
+    """
+
+    os.makedirs(metrics_path, exist_ok=True)
+    with open(os.path.join(metrics_path, LOCK_FILE), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        exited = [
+            path for path in glob.glob(
+                os.path.join(metrics_path, "metrics-*-*.json")
+            )
+            if not _pid_alive(int(os.path.basename(path).split("-")[1]))
+        ]
+        if not exited:
+            return
+        archive_path = os.path.join(metrics_path, ARCHIVE_FILE)
+        archive = _merge_files([archive_path] + exited)
+        _write_json(archive_path, {
+            "pid": None,
+            "metrics": {
+                name: {"kind": metric.kind, "help": metric.help,
+                       "state": metric.state()}
+                for name, metric in archive.items()
+                # the value of a gauge ends with its process
+                if metric.kind != "gauge"
+            },
+        })
+        for path in exited:
+            os.remove(path)
+
+
+def collect():
+    """
+    metrics of all processes, added up
+
+    Returns:
+        dict of metric name to Counter, Gauge or Histogram
+    """
+
+    _registry.flush()
+    try:
+        _archive_exited()
+    except OSError:
+        pass
+    return _merge_files(glob.glob(os.path.join(metrics_path, "metrics-*.json")))
+
+
+def render():
+    """
+    metrics of all processes in the Prometheus text format
+    """
+
+    lines = []
+    for name, metric in sorted(collect().items()):
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        lines.extend(metric.lines())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,164 @@
+"""
+Module: linear_scorer.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Fast path scoring of the deployed logistic regression
+    -- export_linear_model:
+        compiles a fitted binary linear classifier into a small JSON
+        artifact with its coefficients, intercept and classes
+    -- LinearScorer:
+        runs the linear decision function directly on a contiguous float
+        matrix, the labels are bit identical to model.predict
+    - module only depends on numpy so serving does not import sklearn,
+      pandas, matplotlib or seaborn
+"""
+
+import json
+import os
+
+import numpy as np
+
+
+LINEAR_MODEL_FILE = "trainedmodel_linear.json"
+LINEAR_MODEL_FORMAT = "linear-v1"
+
+
+class LinearScorer:
+    """
+    binary linear classifier scored with numpy only
+
+    Arguments:
+        coef: coefficients of shape (1, features)
+        intercept: intercept of shape (1,)
+        classes: class labels, negative class first
+        feature_names: names of the feature columns, in order
+    """
+
+    def __init__(self, coef, intercept, classes, feature_names):
+        self.coef = np.asarray(coef, dtype=np.float64).reshape(1, -1)
+        self.intercept = np.asarray(intercept, dtype=np.float64).reshape(1)
+        self.classes = np.asarray(classes)
+        self.feature_names = list(feature_names)
+
+    def decision_function(self, features):
+        """
+        signed distance of each row to the decision boundary
+
+        Arguments:
+            features: matrix of feature rows or a dataframe
+
+        Returns:
+            numpy array of scores, one per row
+        """
+
+        if hasattr(features, "loc"):
+            features = features.loc[:, self.feature_names].to_numpy()
+        features = np.ascontiguousarray(features, dtype=np.float64)
+
+        # same operations and operand layout as sklearn, so the floating
+        # point results and therefore the labels are identical
+        scores = features @ self.coef.T + self.intercept
+        return scores.ravel()
+
+    def predict(self, features):
+        """
+        predict the class label of each row
+
+        Arguments:
+            features: matrix of feature rows or a dataframe
+
+        Returns:
+            numpy array of predicted labels
+        """
+
+        indices = (self.decision_function(features) > 0).astype(np.intp)
+        return self.classes[indices]
+
+    def to_dict(self):
+        """
+        JSON serializable form of the scorer
+        """
+
+        return {
+            "format": LINEAR_MODEL_FORMAT,
+            "feature_names": self.feature_names,
+            "coef": self.coef.ravel().tolist(),
+            "intercept": self.intercept.tolist(),
+            "classes": self.classes.tolist(),
+        }
+
+    def save(self, path):
+        """
+        write the artifact atomically to the given path
+        """
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        read an artifact written by save
+
+        Arguments:
+            path: path of the JSON artifact
+
+        Returns:
+            LinearScorer
+        """
+
+        with open(path, "r") as f:
+            artifact = json.load(f)
+        if artifact.get("format") != LINEAR_MODEL_FORMAT:
+            raise ValueError(
+                f"unsupported linear model format {artifact.get('format')}"
+            )
+        return cls(
+            artifact["coef"],
+            artifact["intercept"],
+            artifact["classes"],
+            artifact["feature_names"],
+        )
+
+
+def export_linear_model(model, path, features=None):
+    """
+    compile a fitted binary linear classifier into a coefficient artifact
+
+    Arguments:
+        model: fitted classifier with coef_, intercept_ and classes_
+        path: path of the JSON artifact to write
+        features: optional dataframe used to check that the exported
+            scorer predicts the same labels as the model
+
+    Returns:
+        LinearScorer written to path
+    """
+
+    coef = getattr(model, "coef_", None)
+    if coef is None or coef.shape[0] != 1 or len(model.classes_) != 2:
+        raise TypeError(
+            f"{type(model).__name__} is not a binary linear classifier"
+        )
+
+    feature_names = getattr(model, "feature_names_in_", None)
+    if feature_names is None:
+        if features is None:
+            raise ValueError("features are needed to name the coefficients")
+        feature_names = list(features.columns)
+    scorer = LinearScorer(
+        coef, model.intercept_, model.classes_, feature_names
+    )
+
+    if features is not None:
+        expected = model.predict(features)
+        if not np.array_equal(scorer.predict(features), expected):
+            raise ValueError("exported linear model does not match model")
+
+    scorer.save(path)
+    return scorer
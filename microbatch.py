@@ -0,0 +1,304 @@
+"""
+Module: microbatch.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Dynamic batching of concurrent prediction requests
+    -- MicroBatcher:
+        - request threads submit their feature rows and wait for the result
+        - a worker thread coalesces the queued rows into one matrix, up to
+          max_batch_size rows or max_wait_us microseconds after the oldest
+          request arrived
+        - one vectorized predict is run and the predictions are handed
+          back to each waiting request
+        - queue depth, batch size and added latency are kept as metrics,
+          they are also exported to /metrics (instrumentation.py) with
+          the failures (timeouts, stopped worker, predict errors)
+        - a request waits at most timeout_seconds for its batch, requests
+          still queued when the worker thread is replaced fail at once,
+          both raise BatchingError
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import numpy as np
+
+import instrumentation
+
+
+# upper bounds of the batch size histogram
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+
+# number of recent requests used for the latency percentiles
+LATENCY_WINDOW = 1024
+
+BATCH_ROWS = instrumentation.histogram(
+    "microbatch_batch_rows", "Rows scored per micro-batch",
+    buckets=BATCH_SIZE_BUCKETS
+)
+ADDED_LATENCY = instrumentation.histogram(
+    "microbatch_added_latency_seconds",
+    "Time a request waited for its micro-batch to be scored",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+             0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+QUEUE_DEPTH = instrumentation.gauge(
+    "microbatch_queue_depth", "Requests waiting for a micro-batch"
+)
+FAILURES = instrumentation.counter(
+    "microbatch_failures_total",
+    "Requests that got no micro-batch result by reason"
+)
+
+
+class BatchingError(RuntimeError):
+    """
+    the request was not scored by the batching worker in time
+    """
+
+
+class _Request:
+    """
+    feature rows of a single request waiting to be scored
+    """
+
+    __slots__ = ("features", "future", "enqueued_at")
+
+    def __init__(self, features):
+        self.features = features
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    coalesces concurrent predict calls into vectorized batches
+
+    Arguments:
+        predict_fn: function that predicts a matrix of feature rows
+        max_batch_size: maximum number of rows scored in one batch
+        max_wait_us: maximum microseconds a request waits for a batch
+        timeout_seconds: maximum seconds a request waits for its result
+    """
+
+    def __init__(self, predict_fn, max_batch_size=256, max_wait_us=500,
+                 timeout_seconds=5.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_us / 1e6
+        self.timeout = timeout_seconds
+        self._queue = queue.Queue()
+        self._carry = None
+        self._worker = None
+        self._worker_pid = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._rows = 0
+        self._largest_batch = 0
+        self._batch_size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def _ensure_worker(self):
+        """
+        start the worker thread, once per process so it also runs in
+        workers forked by gunicorn after the app was imported, or again
+        if it died; the requests it left queued are failed
+        """
+
+        if self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker_pid == os.getpid() and self._worker.is_alive():
+                return
+            stranded = [self._carry] if self._carry is not None else []
+            while True:
+                try:
+                    stranded.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._fail(
+                stranded, BatchingError("batching worker stopped"),
+                "worker_stopped"
+            )
+            self._queue = queue.Queue()
+            self._carry = None
+            QUEUE_DEPTH.set(0)
+            self._worker = threading.Thread(
+                target=self._run, name="microbatcher", daemon=True
+            )
+            self._worker.start()
+            self._worker_pid = os.getpid()
+
+    def submit(self, features):
+        """
+        predict the given rows as part of the next batch
+
+        Arguments:
+            features: matrix of feature rows
+
+        Returns:
+            numpy array of predictions for the given rows
+        """
+
+        # large requests are already a batch on their own
+        if features.shape[0] >= self.max_batch_size:
+            return self.predict_fn(features)
+
+        self._ensure_worker()
+        request = _Request(features)
+        self._queue.put(request)
+        QUEUE_DEPTH.set(self._queue_depth())
+        try:
+            return request.future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # a request not yet in a batch is dropped by the worker
+            request.future.cancel()
+            FAILURES.inc(reason="timeout")
+            raise BatchingError(
+                f"no batch result within {self.timeout} seconds"
+            ) from None
+
+    def _queue_depth(self):
+        """
+        requests waiting for a batch, the carried one included
+        """
+
+        return self._queue.qsize() + (self._carry is not None)
+
+    @staticmethod
+    def _fail(requests, err, reason):
+        """
+        fail the futures of requests that will not get a result
+        """
+
+        for request in requests:
+            if not request.future.done():
+                request.future.set_exception(err)
+                FAILURES.inc(reason=reason)
+
+    def _next_request(self, timeout):
+        """
+        next queued request, the request that did not fit in the previous
+        batch comes first
+        """
+
+        if self._carry is not None:
+            request, self._carry = self._carry, None
+            return request
+        while True:
+            request = self._queue.get(timeout=timeout)
+            # skips requests whose caller gave up waiting
+            if request.future.set_running_or_notify_cancel():
+                return request
+
+    def _collect(self):
+        """
+        block until a request arrives and gather a batch around it
+        """
+
+        first = self._next_request(timeout=None)
+        batch = [first]
+        rows = first.features.shape[0]
+        deadline = first.enqueued_at + self.max_wait
+
+        while rows < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                request = self._next_request(timeout=timeout)
+            except queue.Empty:
+                break
+            if rows + request.features.shape[0] > self.max_batch_size:
+                self._carry = request
+                break
+            batch.append(request)
+            rows += request.features.shape[0]
+
+        QUEUE_DEPTH.set(self._queue_depth())
+        return batch, rows
+
+    def _run(self):
+        """
+        worker loop: collect a batch, predict it and fan the results out
+        """
+
+        while True:
+            batch, rows = self._collect()
+            try:
+                features = np.vstack([request.features for request in batch])
+                preds = self.predict_fn(features)
+            except Exception as err:
+                self._fail(batch, err, "predict_error")
+                continue
+
+            self._record(batch, rows, time.perf_counter())
+            start = 0
+            for request in batch:
+                end = start + request.features.shape[0]
+                request.future.set_result(preds[start:end])
+                start = end
+
+    def _record(self, batch, rows, done_at):
+        """
+        update the batch size and latency metrics
+        """
+
+        bucket = np.searchsorted(BATCH_SIZE_BUCKETS, rows)
+        BATCH_ROWS.observe(rows)
+        for request in batch:
+            ADDED_LATENCY.observe(done_at - request.enqueued_at)
+        with self._stats_lock:
+            self._batches += 1
+            self._rows += rows
+            self._largest_batch = max(self._largest_batch, rows)
+            self._batch_size_counts[bucket] += 1
+            self._latencies.extend(
+                done_at - request.enqueued_at for request in batch
+            )
+
+    def stats(self):
+        """
+        current metrics of the batcher
+
+        Returns:
+            dict with queue depth, batch sizes and added latency
+        """
+
+        with self._stats_lock:
+            latencies = np.array(self._latencies) * 1e6
+            histogram = {
+                f"le_{bound}": count for bound, count in zip(
+                    BATCH_SIZE_BUCKETS + ["inf"], self._batch_size_counts
+                )
+            }
+            stats = {
+                "queue_depth": self._queue_depth(),
+                "batches": self._batches,
+                "rows": self._rows,
+                "mean_batch_size": (
+                    self._rows / self._batches if self._batches else 0.0
+                ),
+                "max_batch_size": self._largest_batch,
+                "batch_size_histogram": histogram,
+            }
+
+        if latencies.size:
+            stats["added_latency_us"] = {
+                "mean": float(latencies.mean()),
+                "p50": float(np.percentile(latencies, 50)),
+                "p99": float(np.percentile(latencies, 99)),
+                "max": float(latencies.max()),
+            }
+        else:
+            stats["added_latency_us"] = {}
+
+        return stats
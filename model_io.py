@@ -0,0 +1,280 @@
+"""
+Module: model_io.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Single place where the trained models are written and read
+    -- save_model:
+        writes a model atomically in one of the formats, model_format of
+        config.json by default
+        - pickle (default): a standard pickle.dump file, readable by any
+          pickle.load
+        - pickle5_mmap: pickle protocol 5, the numpy arrays are stored as
+          out of band buffers aligned after the pickle stream, in a
+          container only load_model reads (plain pickle.load can not), for
+          large models loaded by the serving workers
+        - joblib: joblib.dump, numpy arrays stored raw
+        - coefficients: numpy .npz of the fitted arrays with a JSON header
+          of the parameters, for linear models and scalers only
+    -- load_model:
+        recognizes the format from the first bytes of the file, the
+        arrays of pickle5_mmap and joblib files are memory mapped instead
+        of copied, coefficients files are read without unpickling anything so
+        they are safe to load from untrusted sources, plain pickles of
+        older deployments still load
+    -- dumps_model:
+        the bytes save_model would write, for benchmarks
+"""
+
+import importlib
+import io
+import json
+import mmap
+import os
+import pickle
+import struct
+import time
+
+import numpy as np
+
+import instrumentation
+from settings import load_config
+
+
+# Load config.json and get the model format
+config = load_config()
+
+model_format = config.get('model_format', 'pickle')
+
+PICKLE5_MAGIC = b"MDLPKL5\n"
+NPZ_MAGIC = b"PK\x03\x04"
+HEADER_LENGTH = struct.Struct("<Q")
+# alignment of the out of band buffers in the file
+BUFFER_ALIGNMENT = 64
+
+MODEL_LOAD_SECONDS = instrumentation.histogram(
+    "model_load_seconds", "Time to load a model file by format"
+)
+
+# estimators the coefficients format can rebuild, class name to module
+COEFFICIENT_ESTIMATORS = {
+    "LogisticRegression": "sklearn.linear_model",
+    "SGDClassifier": "sklearn.linear_model",
+    "RidgeClassifier": "sklearn.linear_model",
+    "LinearSVC": "sklearn.svm",
+    "StandardScaler": "sklearn.preprocessing",
+}
+
+
+def _align(offset):
+    return -(-offset // BUFFER_ALIGNMENT) * BUFFER_ALIGNMENT
+
+
+def _write_pickle5(model, f):
+    """
+    pickle stream followed by the aligned out of band buffers, the header
+    gives the offset and length of each part
+    """
+
+    buffers = []
+    stream = pickle.dumps(model, protocol=5, buffer_callback=buffers.append)
+    raw_buffers = [buffer.raw() for buffer in buffers]
+
+    # offsets are relative to the end of the header
+    parts = [[0, len(stream)]]
+    offset = len(stream)
+    for raw in raw_buffers:
+        offset = _align(offset)
+        parts.append([offset, raw.nbytes])
+        offset += raw.nbytes
+    header = json.dumps({"parts": parts}).encode()
+
+    f.write(PICKLE5_MAGIC)
+    f.write(HEADER_LENGTH.pack(len(header)))
+    f.write(header)
+    start = f.tell()
+    # data starts aligned so the buffer offsets are aligned in the file
+    f.write(b"\0" * (_align(start) - start))
+    start = _align(start)
+    f.write(stream)
+    for (offset, _), raw in zip(parts[1:], raw_buffers):
+        f.write(b"\0" * (start + offset - f.tell()))
+        f.write(raw)
+
+
+def _read_pickle5(path):
+    """
+    load a pickle protocol 5 file, the buffers stay in the memory map
+    """
+
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(data)
+    position = len(PICKLE5_MAGIC)
+    (header_length,) = HEADER_LENGTH.unpack_from(view, position)
+    position += HEADER_LENGTH.size
+    header = json.loads(bytes(view[position:position + header_length]))
+    start = _align(position + header_length)
+
+    parts = [view[start + offset:start + offset + length]
+             for offset, length in header["parts"]]
+    return pickle.loads(parts[0], buffers=parts[1:])
+
+
+def _write_coefficients(model, f):
+    """
+    fitted arrays and parameters of a supported estimator as .npz
+    """
+
+    name = type(model).__name__
+    if name not in COEFFICIENT_ESTIMATORS:
+        raise ValueError(f"{name} can not be saved in the coefficients format")
+
+    arrays = {}
+    attributes = {}
+    for key, value in vars(model).items():
+        if not key.endswith("_") or key.startswith("_"):
+            continue
+        if isinstance(value, np.ndarray):
+            if value.dtype == object:
+                value = value.astype(str)
+            arrays[key] = value
+        elif value is None or isinstance(value, (bool, int, float, str)):
+            attributes[key] = value
+        elif isinstance(value, np.generic):
+            attributes[key] = value.item()
+        else:
+            raise ValueError(
+                f"attribute {key} of {name} is not supported in the "
+                "coefficients format"
+            )
+
+    header = {
+        "estimator": name,
+        "params": model.get_params(deep=False),
+        "attributes": attributes,
+    }
+    arrays["__header__"] = np.frombuffer(json.dumps(header).encode(), np.uint8)
+    np.savez(f, **arrays)
+
+
+def _read_coefficients(path):
+    """
+    rebuild an estimator saved in the coefficients format, nothing is
+    unpickled
+    """
+
+    with np.load(path, allow_pickle=False) as data:
+        header = json.loads(data["__header__"].tobytes())
+        arrays = {key: data[key] for key in data.files if key != "__header__"}
+
+    name = header["estimator"]
+    if name not in COEFFICIENT_ESTIMATORS:
+        raise ValueError(f"unknown estimator {name}")
+    module = importlib.import_module(COEFFICIENT_ESTIMATORS[name])
+    model = getattr(module, name)(**header["params"])
+    for key, value in header["attributes"].items():
+        setattr(model, key, value)
+    for key, value in arrays.items():
+        if key == "feature_names_in_":
+            value = value.astype(object)
+        setattr(model, key, value)
+    return model
+
+
+def _write_model(model, f, fmt):
+    if fmt == "pickle":
+        pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    elif fmt == "pickle5_mmap":
+        _write_pickle5(model, f)
+    elif fmt == "coefficients":
+        _write_coefficients(model, f)
+    elif fmt == "joblib":
+        import joblib
+        joblib.dump(model, f)
+    else:
+        raise ValueError(f"unknown model format {fmt}")
+
+
+def save_model(model, path, fmt=None):
+    """
+    save a model, the file is replaced atomically
+
+    Arguments:
+        model: fitted model
+        path: output file
+        fmt: pickle, pickle5_mmap, joblib or coefficients, model_format
+            of config.json by default
+    """
+
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            _write_model(model, f, fmt or model_format)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+
+def dumps_model(model, fmt=None):
+    """
+    bytes of a model as save_model writes them
+
+    Arguments:
+        model: fitted model
+        fmt: pickle, pickle5_mmap, joblib or coefficients, model_format
+            of config.json by default
+
+    Returns:
+        bytes
+    """
+
+    f = io.BytesIO()
+    _write_model(model, f, fmt or model_format)
+    return f.getvalue()
+
+
+def model_file_format(path):
+    """
+    format of a model file from its first bytes, pickle stands for plain
+    pickle and joblib files, which load the same way
+    """
+
+    with open(path, "rb") as f:
+        start = f.read(len(PICKLE5_MAGIC))
+    if start == PICKLE5_MAGIC:
+        return "pickle5_mmap"
+    if start.startswith(NPZ_MAGIC):
+        return "coefficients"
+    return "pickle"
+
+
+def load_model(path):
+    """
+    load a model written by save_model, or a plain pickle
+
+    Arguments:
+        path: model file
+
+    Returns:
+        fitted model
+    """
+
+    starttime = time.perf_counter()
+    fmt = model_file_format(path)
+    if fmt == "pickle5_mmap":
+        model = _read_pickle5(path)
+    elif fmt == "coefficients":
+        model = _read_coefficients(path)
+    else:
+        # joblib reads plain pickles too, and maps the arrays of its own
+        # files
+        import joblib
+        model = joblib.load(path, mmap_mode="r")
+
+    MODEL_LOAD_SECONDS.observe(time.perf_counter() - starttime, format=fmt)
+    instrumentation.record_bytes("model_load", os.path.getsize(path))
+    return model
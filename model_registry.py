@@ -0,0 +1,156 @@
+"""
+Module: model_registry.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Process wide registry of the deployed model
+    -- ModelRegistry:
+        loads a model file once per worker and keeps it in memory
+        - the file is checked with os.stat (mtime, size, inode) and
+          reloaded only when a new artifact has been published
+        - the in memory model is swapped with a single reference
+          assignment, requests that already hold a model keep using it
+
+    -- get_registry:
+        returns the shared registry of a model file
+    - models are read with model_io.load_model unless another loader is
+      given
+"""
+
+import os
+import logging
+import threading
+import time
+
+from model_io import load_model
+
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    keeps the latest version of a model file in memory
+
+    Arguments:
+        model_file: path of the model artifact
+        loader: function that loads the artifact from a path
+        check_interval: minimum seconds between two checks of the file
+    """
+
+    def __init__(self, model_file, loader=load_model, check_interval=1.0):
+        self.model_file = model_file
+        self.loader = loader
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._model = None
+        self._version = None
+        self._checked_at = 0.0
+
+    @staticmethod
+    def _file_version(model_file):
+        """
+        version of the artifact on disk, changes on every publish
+        """
+
+        stat = os.stat(model_file)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    @property
+    def version(self):
+        """
+        version of the model currently held in memory
+        """
+
+        return self._version
+
+    def get(self):
+        """
+        return the in memory model, reloading it if the file has changed
+
+        Returns:
+            loaded model
+        """
+
+        model = self._model
+        now = time.monotonic()
+        if model is not None and now - self._checked_at < self.check_interval:
+            return model
+
+        with self._lock:
+            # another thread may have reloaded while we waited on the lock
+            if self._model is not None and \
+                    now - self._checked_at < self.check_interval:
+                return self._model
+            self._reload_if_changed()
+            self._checked_at = time.monotonic()
+            return self._model
+
+    def _reload_if_changed(self):
+        """
+        load the artifact if its version differs from the one in memory,
+        the previous model is kept if the new artifact can not be read
+        """
+
+        try:
+            version = self._file_version(self.model_file)
+        except OSError:
+            if self._model is None:
+                raise
+            logger.warning(
+                "Model file %s is not available, serving version %s",
+                self.model_file, self._version)
+            return
+
+        if version == self._version:
+            return
+
+        try:
+            model = self.loader(self.model_file)
+        except Exception:
+            if self._model is None:
+                raise
+            logger.exception(
+                "Failed to reload %s, serving version %s",
+                self.model_file, self._version)
+            return
+
+        # single reference assignment, readers see either model as a whole
+        self._model = model
+        self._version = version
+        logger.info("Loaded model %s version %s", self.model_file, version)
+
+    def reload(self):
+        """
+        force a version check on the next call of get
+        """
+
+        self._checked_at = 0.0
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(model_file, loader=load_model, check_interval=1.0):
+    """
+    return the registry of a model file, creating it on first use
+
+    Arguments:
+        model_file: path of the model artifact
+        loader: function that loads the artifact from a path
+        check_interval: minimum seconds between two checks of the file
+
+    Returns:
+        ModelRegistry shared by the whole process
+    """
+
+    key = os.path.abspath(model_file)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = ModelRegistry(model_file, loader, check_interval)
+            _registries[key] = registry
+        return registry
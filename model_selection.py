@@ -0,0 +1,265 @@
+"""
+Module: model_selection.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Model selection stage of the training
+    - candidates are binary linear classifiers, so the winner can still
+      be exported for the fast path scorer
+        - LogisticRegression over C, penalty and solver
+        - SGDClassifier, RidgeClassifier and LinearSVC as alternatives
+    -- select_model:
+        evaluates every candidate with stratified k fold cross validation,
+        as an exhaustive grid search or a successive halving search, and
+        refits the best one on all rows
+        - the folds of all candidates run in parallel in joblib worker
+          processes, the training arrays are passed as numpy arrays that
+          joblib memory maps into the workers instead of copying them
+    -- fixed_leaderboard:
+        leaderboard of the default model when selection is disabled or
+        the dataset is too small to cross validate
+    -- save_leaderboard:
+        writes leaderboard.json with the cross validation score and fit
+        time of every candidate, published with each release
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from settings import load_config
+
+
+# Load config.json and get path variables
+config = load_config()
+
+model_path = os.path.join(config['output_model_path'])
+selection_config = config.get('model_selection', {})
+LEADERBOARD_FILE = "leaderboard.json"
+
+# step name of the estimator in the search pipeline
+ESTIMATOR_STEP = "model"
+
+
+def _candidates():
+    """
+    parameter grids of the search, the estimator itself is a parameter so
+    one search covers all estimators
+    """
+
+    from sklearn.linear_model import (LogisticRegression, RidgeClassifier,
+                                      SGDClassifier)
+    from sklearn.svm import LinearSVC
+
+    C = [0.01, 0.1, 1.0, 10.0, 100.0]
+    return [
+        {
+            "model": [LogisticRegression(random_state=0, max_iter=1000)],
+            "model__solver": ["liblinear"],
+            "model__penalty": ["l1", "l2"],
+            "model__C": C,
+        },
+        {
+            "model": [LogisticRegression(random_state=0, max_iter=1000)],
+            "model__solver": ["lbfgs"],
+            "model__penalty": ["l2"],
+            "model__C": C,
+        },
+        {
+            "model": [SGDClassifier(random_state=0)],
+            "model__loss": ["hinge", "modified_huber"],
+            "model__alpha": [1e-4, 1e-3, 1e-2],
+        },
+        {
+            "model": [RidgeClassifier()],
+            "model__alpha": [0.1, 1.0, 10.0],
+        },
+        {
+            "model": [LinearSVC(random_state=0, max_iter=10000)],
+            "model__C": C,
+        },
+    ]
+
+
+def _describe(params):
+    """
+    JSON serializable form of the parameters of a candidate
+    """
+
+    params = dict(params)
+    estimator = params.pop(ESTIMATOR_STEP)
+    return {
+        "estimator": type(estimator).__name__,
+        "params": {
+            name[len(ESTIMATOR_STEP) + 2:]: value
+            for name, value in params.items()
+        },
+    }
+
+
+def _build(params):
+    """
+    unfitted estimator of a candidate
+    """
+
+    from sklearn.base import clone
+
+    described = _describe(params)
+    return clone(params[ESTIMATOR_STEP]).set_params(**described["params"])
+
+
+def _search(folds):
+    """
+    search object configured from model_selection of config.json
+    """
+
+    from sklearn.model_selection import GridSearchCV, StratifiedKFold
+    from sklearn.pipeline import Pipeline
+
+    options = dict(
+        scoring=selection_config.get('scoring', 'f1'),
+        cv=StratifiedKFold(folds, shuffle=True, random_state=0),
+        n_jobs=selection_config.get('n_jobs', 2),
+        refit=False,
+        error_score=np.nan,
+    )
+    pipeline = Pipeline([(ESTIMATOR_STEP, _candidates()[0]["model"][0])])
+
+    if selection_config.get('search', 'grid') == 'halving':
+        # enables the experimental successive halving search of sklearn
+        from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+        from sklearn.model_selection import HalvingGridSearchCV
+
+        return HalvingGridSearchCV(
+            pipeline, _candidates(),
+            factor=selection_config.get('halving_factor', 3),
+            random_state=0, **options
+        )
+    return GridSearchCV(pipeline, _candidates(), **options)
+
+
+def select_model(X_train, y_train):
+    """
+    cross validate the candidates and fit the best one on all rows
+
+    Arguments:
+        X_train: dataframe of the features
+        y_train: series of the labels
+
+    Returns:
+        fitted winner and the leaderboard, both None when there are too
+        few rows of a class for cross validation
+    """
+
+    # every class needs a row in each fold
+    folds = min(
+        selection_config.get('cv_folds', 5), int(y_train.value_counts().min())
+    )
+    if folds < 2:
+        logging.info("Too few rows of a class for model selection")
+        return None, None
+
+    # contiguous arrays, joblib memory maps them into the workers
+    X = np.ascontiguousarray(X_train.to_numpy(dtype=np.float64))
+    y = np.ascontiguousarray(y_train.to_numpy())
+
+    search = _search(folds)
+    start = time.perf_counter()
+    search.fit(X, y)
+    search_seconds = time.perf_counter() - start
+
+    results = search.cv_results_
+    # the halving search reports every iteration, the candidates of the
+    # last iteration saw the most rows
+    iterations = results.get("iter", np.zeros(len(results["params"]), int))
+    candidates = []
+    for index, params in enumerate(results["params"]):
+        score = results["mean_test_score"][index]
+        candidates.append(dict(
+            _describe(params),
+            iteration=int(iterations[index]),
+            mean_score=None if np.isnan(score) else float(score),
+            std_score=None if np.isnan(score)
+            else float(results["std_test_score"][index]),
+            mean_fit_seconds=float(results["mean_fit_time"][index]),
+            mean_score_seconds=float(results["mean_score_time"][index]),
+        ))
+    order = sorted(
+        range(len(candidates)),
+        key=lambda i: (
+            -candidates[i]["iteration"],
+            candidates[i]["mean_score"] is None,
+            -(candidates[i]["mean_score"] or 0.0),
+        )
+    )
+    for rank, index in enumerate(order, 1):
+        candidates[index]["rank"] = rank
+    candidates = [candidates[index] for index in order]
+
+    # refit on the dataframe so the model keeps the feature names
+    model = _build(results["params"][order[0]])
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+
+    leaderboard = {
+        "search": type(search).__name__,
+        "scoring": search.scoring,
+        "cv_folds": folds,
+        "rows": int(len(y)),
+        "search_seconds": search_seconds,
+        "refit_seconds": time.perf_counter() - start,
+        "selected_at": datetime.now().isoformat(),
+        "winner": candidates[0],
+        "candidates": candidates,
+    }
+    logging.info(
+        f"Selected {candidates[0]['estimator']} {candidates[0]['params']} "
+        f"with {search.scoring} {candidates[0]['mean_score']}"
+    )
+    return model, leaderboard
+
+
+def fixed_leaderboard(model, reason):
+    """
+    leaderboard of a model that was trained without a search
+
+    Arguments:
+        model: the trained model
+        reason: why no search was run
+
+    Returns:
+        dict in the form of the select_model leaderboard
+    """
+
+    winner = {
+        "estimator": type(model).__name__,
+        "params": model.get_params(),
+        "rank": 1,
+    }
+    return {
+        "search": None,
+        "reason": reason,
+        "selected_at": datetime.now().isoformat(),
+        "winner": winner,
+        "candidates": [winner],
+    }
+
+
+def save_leaderboard(leaderboard):
+    """
+    write leaderboard.json atomically
+
+    Arguments:
+        leaderboard: leaderboard of select_model
+    """
+
+    path = os.path.join(model_path, LEADERBOARD_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(leaderboard, f, indent=2)
+    os.replace(path + ".tmp", path)
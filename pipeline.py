@@ -0,0 +1,325 @@
+"""
+Module: pipeline.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Small pipeline engine for the steps of the full process
+    -- Step:
+        a function with the files it reads (inputs), the files it writes
+        (outputs), the steps it runs after and an optional condition on
+        the results of those steps
+    -- Pipeline:
+        - runs the steps in dependency order, steps whose dependencies
+          are done run concurrently in a thread pool
+        - a step is skipped when the content hash of its inputs and of
+          its outputs are those of its last successful run, its stored
+          result is reused
+        - a step whose condition is false is not run, neither are the
+          steps depending on it
+        - every step outcome is written to the run manifest as soon as
+          it is known, with its timings, so a rerun after a failure
+          resumes at the first step that is stale or did not finish
+        - steps that failed, were blocked or were interrupted in the last
+          run are resumed whatever the conditions say, with the steps they
+          depend on (skipped when up to date)
+        - the manifest also keeps the content hash of every file read,
+          files are only hashed again when their mtime, size or inode
+          change
+        - every step outcome is counted in the pipeline_steps_total
+          metric, the stages they call are timed by instrumentation.py
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+import timeit
+
+import instrumentation
+
+
+logger = logging.getLogger(__name__)
+
+STEP_RUNS = instrumentation.counter(
+    "pipeline_steps_total", "Outcomes of the pipeline steps"
+)
+
+
+class Step:
+    """
+    step of a pipeline
+
+    Arguments:
+        name: unique name of the step
+        func: function of the dict of results of the steps it runs
+            after, its result must be JSON serializable, it is stored in
+            the manifest
+        inputs: files or directories the step reads
+        outputs: files or directories the step writes
+        after: names of the steps it runs after
+        condition: function of the dict of results of the previous
+            steps, the step only runs when it returns True
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), after=(),
+                 condition=None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.after = list(after)
+        self.condition = condition
+
+
+class Pipeline:
+    """
+    runs steps in dependency order, skipping the ones that are up to date
+
+    Arguments:
+        steps: list of Step
+        manifest_path: JSON file of the run manifest
+        max_workers: number of steps run at the same time
+    """
+
+    def __init__(self, steps, manifest_path, max_workers=2):
+        self.steps = {step.name: step for step in steps}
+        self.manifest_path = manifest_path
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        for step in steps:
+            unknown = set(step.after) - set(self.steps)
+            if unknown:
+                raise ValueError(
+                    f"step {step.name} runs after unknown steps {sorted(unknown)}"
+                )
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"steps": {}, "cache": {}, "files": {}}
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _file_hash(self, path):
+        """
+        sha256 of a file, reused from the manifest while its mtime, size
+        and inode are unchanged
+        """
+
+        stat = os.stat(path)
+        key = [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+        with self._lock:
+            known = self.manifest["files"].get(path)
+        if known is not None and known[:3] == key:
+            return known[3]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        with self._lock:
+            self.manifest["files"][path] = key + [digest.hexdigest()]
+        return digest.hexdigest()
+
+    def paths_hash(self, paths):
+        """
+        hash of the names and content of files and directories, missing
+        paths hash as missing
+        """
+
+        digest = hashlib.sha256()
+        for path in paths:
+            digest.update(path.encode())
+            if os.path.isdir(path):
+                for root, dirs, files in os.walk(path):
+                    dirs.sort()
+                    for name in sorted(files):
+                        file_path = os.path.join(root, name)
+                        digest.update(file_path.encode())
+                        digest.update(self._file_hash(file_path).encode())
+            elif os.path.exists(path):
+                digest.update(self._file_hash(path).encode())
+            else:
+                digest.update(b"missing")
+        return digest.hexdigest()
+
+    def _up_to_date(self, step, input_hash):
+        """
+        whether the last successful run of the step had the same inputs
+        and its outputs are unchanged since
+        """
+
+        record = self.manifest["cache"].get(step.name)
+        return (
+            record is not None
+            and record["input_hash"] == input_hash
+            and all(os.path.exists(path) for path in step.outputs)
+            and record["output_hash"] == self.paths_hash(step.outputs)
+        )
+
+    def _record(self, name, cache=None, **fields):
+        """
+        store the status of a step in this run and, after a successful
+        run, what is needed to skip it next time
+        """
+
+        STEP_RUNS.inc(step=name, status=fields["status"])
+        with self._lock:
+            self.manifest["steps"][name] = fields
+            if cache is not None:
+                self.manifest["cache"][name] = cache
+            self._save_manifest()
+
+    def _run_step(self, step, results):
+        """
+        run a step unless it is up to date
+
+        Returns:
+            result of the step
+        """
+
+        started_at = datetime.now().isoformat()
+        starttime = timeit.default_timer()
+        input_hash = self.paths_hash(step.inputs)
+        if self._up_to_date(step, input_hash):
+            cached = self.manifest["cache"][step.name]
+            self._record(
+                step.name,
+                status="skipped",
+                started_at=started_at,
+                seconds=timeit.default_timer() - starttime,
+            )
+            logger.info("Step %s is up to date", step.name)
+            return cached["result"]
+
+        logger.info("Running step %s", step.name)
+        # left as running in the manifest if the process dies
+        self._record(step.name, status="running", started_at=started_at)
+        try:
+            result = step.func({name: results[name] for name in step.after})
+        except Exception as err:
+            self._record(
+                step.name,
+                status="failed",
+                error=repr(err),
+                started_at=started_at,
+                seconds=timeit.default_timer() - starttime,
+            )
+            raise
+        seconds = timeit.default_timer() - starttime
+        self._record(
+            step.name,
+            cache={
+                "input_hash": input_hash,
+                "output_hash": self.paths_hash(step.outputs),
+                "result": result,
+                "finished_at": datetime.now().isoformat(),
+                "run_seconds": seconds,
+            },
+            status="done",
+            started_at=started_at,
+            seconds=seconds,
+        )
+        return result
+
+    def _unfinished_steps(self):
+        """
+        steps that failed, were blocked or were interrupted in the last
+        run, and the steps they depend on
+
+        Returns:
+            set of step names
+        """
+
+        unfinished = [
+            name for name, record in self.manifest["steps"].items()
+            if name in self.steps
+            and record.get("status") in ("failed", "blocked", "running")
+        ]
+        resume = set()
+        while unfinished:
+            name = unfinished.pop()
+            if name not in resume:
+                resume.add(name)
+                unfinished.extend(self.steps[name].after)
+        return resume
+
+    def run(self):
+        """
+        run the pipeline
+
+        Returns:
+            dict of step name to its status: done, skipped (up to date),
+            not_needed (condition false or a dependency not needed),
+            failed or blocked (a dependency failed)
+        """
+
+        self.manifest = self._load_manifest()
+        resume = self._unfinished_steps()
+        if resume:
+            logger.info("Resuming unfinished steps %s", sorted(resume))
+        self.manifest["steps"] = {}
+        self.manifest["started_at"] = datetime.now().isoformat()
+        statuses = {}
+        results = {}
+        starttime = timeit.default_timer()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {}
+            while len(statuses) < len(self.steps):
+                resolved = len(statuses)
+                for step in self.steps.values():
+                    if step.name in statuses or step.name in running.values():
+                        continue
+                    after = [statuses.get(name) for name in step.after]
+                    if any(status is None for status in after):
+                        continue
+                    if any(status in ("failed", "blocked") for status in after):
+                        statuses[step.name] = "blocked"
+                        self._record(step.name, status="blocked")
+                    elif step.name not in resume and (
+                        "not_needed" in after or (
+                            step.condition is not None
+                            and not step.condition(results)
+                        )
+                    ):
+                        statuses[step.name] = "not_needed"
+                        self._record(step.name, status="not_needed")
+                        logger.info("Step %s is not needed", step.name)
+                    else:
+                        running[executor.submit(
+                            self._run_step, step, results
+                        )] = step.name
+
+                if not running:
+                    if len(statuses) == resolved:
+                        raise ValueError(
+                            "steps depend on each other in a cycle"
+                        )
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                        statuses[name] = self.manifest["steps"][name]["status"]
+                    except Exception:
+                        logger.exception("Step %s failed", name)
+                        statuses[name] = "failed"
+
+        with self._lock:
+            self.manifest["finished_at"] = datetime.now().isoformat()
+            self.manifest["seconds"] = timeit.default_timer() - starttime
+            self._save_manifest()
+        return statuses
@@ -0,0 +1,165 @@
+"""
+Module: prediction_payload.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Parse the body of a /prediction request into a feature matrix
+    -- JSON records:
+        [{"lastmonth_activity": 1, "lastyear_activity": 2,
+          "number_of_employees": 3}, ...]
+    -- JSON columnar arrays:
+        {"lastmonth_activity": [...], "lastyear_activity": [...],
+         "number_of_employees": [...]}
+        optionally wrapped as {"records": [...]} or {"columns": {...}}
+    -- CSV upload:
+        multipart file field "file" (extra columns are ignored)
+    - features are validated with a single vectorized check
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+
+from dataset import FEATURE_COLUMNS
+
+
+# number of invalid rows reported back in an error message
+MAX_REPORTED_ROWS = 10
+
+
+class PayloadError(ValueError):
+    """
+    raised when a prediction payload can not be scored
+
+    Arguments:
+        message: description of the problem
+        status_code: http status code to answer with
+    """
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _columns_to_matrix(columns):
+    """
+    stack the feature columns into a contiguous float matrix
+
+    Arguments:
+        columns: mapping of feature name to a sequence of values
+
+    Returns:
+        numpy array of shape (rows, features)
+    """
+
+    missing = [col for col in FEATURE_COLUMNS if col not in columns]
+    if missing:
+        raise PayloadError(f"missing feature columns: {missing}")
+    if not all(
+        isinstance(columns[col], (list, pd.Series)) for col in FEATURE_COLUMNS
+    ):
+        raise PayloadError("feature columns must be arrays")
+
+    lengths = {len(columns[col]) for col in FEATURE_COLUMNS}
+    if len(lengths) > 1:
+        raise PayloadError("feature columns have different lengths")
+
+    matrix = np.empty(
+        (lengths.pop(), len(FEATURE_COLUMNS)), dtype=np.float64
+    )
+    for i, col in enumerate(FEATURE_COLUMNS):
+        # non numeric values become nan and are rejected by validation
+        matrix[:, i] = pd.to_numeric(
+            pd.Series(columns[col]), errors="coerce"
+        )
+    return matrix
+
+
+def _records_to_matrix(records):
+    """
+    convert a list of JSON records into the feature matrix
+    """
+
+    if not all(isinstance(record, dict) for record in records):
+        raise PayloadError("records must be JSON objects")
+    frame = pd.DataFrame.from_records(records, columns=FEATURE_COLUMNS)
+    return _columns_to_matrix({col: frame[col] for col in FEATURE_COLUMNS})
+
+
+def _csv_to_matrix(stream):
+    """
+    read the feature columns of an uploaded CSV into the feature matrix
+    """
+
+    try:
+        frame = pd.read_csv(stream, usecols=FEATURE_COLUMNS)
+    except ValueError as err:
+        raise PayloadError(f"invalid csv upload: {err}") from err
+    return _columns_to_matrix({col: frame[col] for col in FEATURE_COLUMNS})
+
+
+def validate_features(matrix):
+    """
+    vectorized check that every feature is a finite, non negative number
+
+    Arguments:
+        matrix: feature matrix of shape (rows, features)
+
+    Returns:
+        the validated matrix
+    """
+
+    invalid = ~np.isfinite(matrix) | (matrix < 0)
+    bad_rows = np.flatnonzero(invalid.any(axis=1))
+    if bad_rows.size:
+        raise PayloadError(
+            f"{bad_rows.size} rows have invalid features, "
+            f"first rows: {bad_rows[:MAX_REPORTED_ROWS].tolist()}"
+        )
+    return matrix
+
+
+def parse_prediction_request(request, max_batch_size):
+    """
+    build the feature matrix of a flask prediction request
+
+    Arguments:
+        request: flask request object
+        max_batch_size: maximum number of rows scored in one call
+
+    Returns:
+        numpy array of shape (rows, features)
+    """
+
+    upload = request.files.get("file")
+    if upload is not None:
+        matrix = _csv_to_matrix(io.BytesIO(upload.read()))
+    else:
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict) and "records" in payload:
+            payload = payload["records"]
+        elif isinstance(payload, dict) and "columns" in payload:
+            payload = payload["columns"]
+
+        if isinstance(payload, list):
+            matrix = _records_to_matrix(payload)
+        elif isinstance(payload, dict):
+            matrix = _columns_to_matrix(payload)
+        else:
+            raise PayloadError(
+                "expected JSON records, columnar arrays or a csv upload"
+            )
+
+    if matrix.shape[0] == 0:
+        raise PayloadError("no rows to score")
+    if matrix.shape[0] > max_batch_size:
+        raise PayloadError(
+            f"batch of {matrix.shape[0]} rows exceeds the maximum of "
+            f"{max_batch_size} rows",
+            status_code=413
+        )
+
+    return validate_features(matrix)
@@ -0,0 +1,368 @@
+"""
+Module: profiling.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Opt-in profiling of single api calls and full process stages, off
+      unless profiling.enabled is set in config.json; when it is off no
+      hook is registered and no stage is wrapped, so there is no overhead
+    -- capture:
+        context manager profiling the code of the calling thread
+        - cprofile: deterministic cProfile of every function call, stored
+          as the pstats report sorted by cumulative time
+        - sampling: a thread samples the stack of the profiled thread every
+          sample_interval_ms, stored as collapsed stacks
+          ("frame;frame;frame count" lines) for flamegraph.pl or speedscope
+    -- init_app:
+        - profiles a request when it has the X-Profile header (cprofile or
+          sampling, any other value uses profiling.mode) or when its
+          endpoint is listed in profiling.endpoints; the id of the profile
+          is returned in the X-Profile-Id response header
+        - /profiles lists the stored profiles, /profiles/<id> returns one,
+          /profiles/<id>/collapsed its collapsed stacks
+        - the header and the routes require X-Admin-Token when admin_token
+          is set
+    -- profile_stage:
+        wraps the function of a pipeline step listed in profiling.stages
+    - profiles are files in profiling.directory, a ring buffer of the
+      ring_size most recent profiles shared by all gunicorn workers and
+      pipeline runs
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+import functools
+import glob
+import io
+import json
+import os
+import sys
+import threading
+import time
+
+from settings import load_config
+
+
+# Load config.json and get the profiling settings
+config = load_config()
+
+profiling_config = config.get('profiling', {})
+enabled = profiling_config.get('enabled', False)
+default_mode = profiling_config.get('mode', 'sampling')
+sample_interval = profiling_config.get('sample_interval_ms', 5) / 1000
+ring_size = profiling_config.get('ring_size', 20)
+profiles_path = profiling_config.get(
+    'directory', os.path.join('logs', 'profiles')
+)
+profiled_endpoints = set(profiling_config.get('endpoints', []))
+profiled_stages = set(profiling_config.get('stages', []))
+PROFILE_HEADER = "X-Profile"
+MODES = ("cprofile", "sampling")
+# functions of the pstats report
+PSTATS_LINES = 60
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return (f"{code.co_name} "
+            f"({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+
+
+class _Sampler(threading.Thread):
+    """
+    samples the stack of a thread at a fixed interval
+
+    Arguments:
+        thread_id: ident of the sampled thread
+        interval: seconds between samples
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True, name="profiling-sampler")
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                stack = ";".join(reversed(labels))
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return self.stacks
+
+
+def new_profile_id(name):
+    """
+    id of a new profile, sorts by start time
+    """
+
+    safe_name = "".join(c if c.isalnum() else "_" for c in name).strip("_")
+    return f"{time.time_ns()}-{os.getpid()}-{safe_name or 'root'}"
+
+
+@contextmanager
+def capture(kind, name, mode=None, profile_id=None):
+    """
+    profile the code run in the with block by the calling thread and
+    store the profile
+
+    Arguments:
+        kind: request or stage
+        name: endpoint or step name
+        mode: cprofile or sampling, profiling.mode when None
+        profile_id: id of the stored profile, a new one when None
+
+    Yields:
+        id of the profile
+    """
+
+    mode = mode if mode in MODES else default_mode
+    profile_id = profile_id or new_profile_id(name)
+    started_at = datetime.now().isoformat()
+
+    profiler = sampler = None
+    if mode == "cprofile":
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # another profiler is active (python 3.12+ allows only one)
+            profiler = None
+            mode = "sampling"
+    if mode == "sampling":
+        sampler = _Sampler(threading.get_ident(), sample_interval)
+        sampler.start()
+
+    starttime = time.perf_counter()
+    try:
+        yield profile_id
+    finally:
+        seconds = time.perf_counter() - starttime
+        record = dict(
+            id=profile_id, kind=kind, name=name, mode=mode,
+            started_at=started_at, seconds=seconds,
+        )
+        if profiler is not None:
+            profiler.disable()
+            record["stats"] = _pstats_report(profiler)
+        else:
+            record["sample_interval_ms"] = sample_interval * 1000
+            record["stacks"] = sampler.stop()
+        try:
+            save_profile(record)
+        except OSError:
+            # profiling must never break the profiled call
+            pass
+
+
+def _pstats_report(profiler):
+    import pstats
+
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats("cumulative").print_stats(PSTATS_LINES)
+    return stream.getvalue()
+
+
+def _profile_file(profile_id):
+    return os.path.join(profiles_path, f"{profile_id}.json")
+
+
+def save_profile(record):
+    """
+    store a profile and drop the oldest ones beyond ring_size
+    """
+
+    os.makedirs(profiles_path, exist_ok=True)
+    path = _profile_file(record["id"])
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(record, f)
+    os.replace(tmp_path, path)
+
+    for old_path in sorted(glob.glob(_profile_file("*")))[:-ring_size]:
+        try:
+            os.remove(old_path)
+        except FileNotFoundError:
+            # removed by another worker
+            pass
+
+
+def list_profiles():
+    """
+    stored profiles, most recent first
+
+    Returns:
+        list of dicts with id, kind, name, mode, started_at and seconds
+    """
+
+    profiles = []
+    for path in sorted(glob.glob(_profile_file("*")), reverse=True):
+        record = load_profile(os.path.basename(path)[:-len(".json")])
+        if record is not None:
+            profiles.append({
+                key: record[key] for key in
+                ("id", "kind", "name", "mode", "started_at", "seconds")
+            })
+    return profiles
+
+
+def load_profile(profile_id):
+    """
+    stored profile, None when it is not in the ring buffer
+    """
+
+    # ids are file names, never paths
+    if os.path.basename(profile_id) != profile_id:
+        return None
+    try:
+        with open(_profile_file(profile_id), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def collapsed_stacks(record):
+    """
+    collapsed stacks of a sampling profile, one "stack count" line per
+    distinct stack, the input format of flamegraph.pl and speedscope
+    """
+
+    return "".join(
+        f"{stack} {count}\n"
+        for stack, count in sorted(record["stacks"].items())
+    )
+
+
+def profile_stage(name, func):
+    """
+    profile a pipeline step function when its name is in profiling.stages
+
+    Arguments:
+        name: name of the step
+        func: function of the step
+
+    Returns:
+        func itself when the step is not profiled
+    """
+
+    if not enabled or name not in profiled_stages:
+        return func
+
+    @functools.wraps(func)
+    def profiled(*args, **kwargs):
+        with capture("stage", name):
+            return func(*args, **kwargs)
+    return profiled
+
+
+def init_app(app, admin_token=None):
+    """
+    register the request hooks and the /profiles routes on a flask app,
+    only called when profiling is enabled
+
+    Arguments:
+        app: flask app
+        admin_token: token required in X-Admin-Token, if set
+    """
+
+    from flask import g, jsonify, request
+
+    def is_admin():
+        return not admin_token \
+            or request.headers.get('X-Admin-Token') == admin_token
+
+    @app.before_request
+    def start_profile():
+        mode = request.headers.get(PROFILE_HEADER)
+        endpoint = request.url_rule.rule if request.url_rule else None
+        if mode is None and endpoint not in profiled_endpoints:
+            return
+        if mode is not None and not is_admin():
+            return
+        g.profile = capture(
+            "request", f"{request.method} {endpoint or request.path}",
+            mode.lower() if mode else None
+        )
+        g.profile_id = g.profile.__enter__()
+
+    @app.after_request
+    def add_profile_id(response):
+        profile_id = g.get('profile_id')
+        if profile_id is not None:
+            response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def stop_profile(exc):
+        profile = g.pop('profile', None)
+        if profile is not None:
+            if exc is None:
+                profile.__exit__(None, None, None)
+            else:
+                profile.__exit__(type(exc), exc, exc.__traceback__)
+
+    def profiles():
+        """
+        Profiles endpoint that lists the stored profiles, most recent first
+        """
+
+        if not is_admin():
+            return jsonify({'error': 'forbidden'}), 403
+        return jsonify(list_profiles())
+
+    def profile(profile_id):
+        """
+        Profile endpoint that returns a stored profile, with the pstats
+        report of a cprofile profile or the stack samples of a sampling one
+        """
+
+        if not is_admin():
+            return jsonify({'error': 'forbidden'}), 403
+        record = load_profile(profile_id)
+        if record is None:
+            return jsonify({'error': 'profile not found'}), 404
+        return jsonify(record)
+
+    def profile_collapsed(profile_id):
+        """
+        Collapsed stacks endpoint, flamegraph-ready text of a sampling
+        profile
+        """
+
+        if not is_admin():
+            return jsonify({'error': 'forbidden'}), 403
+        record = load_profile(profile_id)
+        if record is None:
+            return jsonify({'error': 'profile not found'}), 404
+        if "stacks" not in record:
+            return jsonify({
+                'error': 'cprofile profiles have no stacks, use '
+                         f'{PROFILE_HEADER}: sampling'
+            }), 404
+        return app.response_class(
+            collapsed_stacks(record), mimetype='text/plain'
+        )
+
+    app.add_url_rule("/profiles", "profiles", profiles, methods=['GET'])
+    app.add_url_rule(
+        "/profiles/<profile_id>", "profile", profile, methods=['GET']
+    )
+    app.add_url_rule(
+        "/profiles/<profile_id>/collapsed", "profile_collapsed",
+        profile_collapsed, methods=['GET']
+    )
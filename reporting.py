@@ -2,94 +2,201 @@
 Module: reporting.py
 Author: Amandeep Singh
 Date Written: 23-Jan-2023
-Date Modified: 23-Jan-2023
+Date Modified: 18-Oct-2026
 
 Description:
     - Module to calculate the predictions, generate confusion matrix and
      save it to directory
+    - rendered with the Agg backend on an explicit Figure, no pyplot
+      global state, the figure is freed after each report
+    - output formats of config.json reporting.formats
+        - png: small raster image, reporting.png_dpi
+        - svg: vector image
+        - json: confusion matrix and labels for machines
+    - reports are rendered by a single background worker, a report is
+      skipped when the deployed model and the test data are those of the
+      last report
 """
 
-import pickle
+from concurrent.futures import ThreadPoolExecutor
 import json
 import os
 
-from sklearn.model_selection import train_test_split
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from sklearn import metrics
 from diagnostics import model_predictions
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
-import numpy as np
+from dataset import MODEL_COLUMNS, TARGET_COLUMN, TEST_DATA_FILE, load_test_data
+from filehash import file_content_hash
+import instrumentation
+from model_io import load_model
+from settings import load_config
 
 
 # Load config.json and get path variables
-with open('config.json', 'r') as f:
-    config = json.load(f)
+config = load_config()
 
 dataset_csv_path = os.path.join(config['output_folder_path'])
 test_data_path = os.path.join(config['test_data_path'])
 model_path = os.path.join(config['output_model_path'])
+prod_deployment_path = os.path.join(config['prod_deployment_path'])
+reporting_config = config.get('reporting', {})
+report_formats = reporting_config.get('formats', ['png', 'svg', 'json'])
+png_dpi = reporting_config.get('png_dpi', 100)
+figure_size = reporting_config.get('figure_size', [5.0, 4.5])
+REPORT_NAME = "confusion_matrix"
 
+# one worker, reports are rendered one at a time off the caller's thread
+_report_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report")
 
-# Function for reporting
-def score_model():
+
+def report_file(fmt):
+    return os.path.join(model_path, f"{REPORT_NAME}.{fmt}")
+
+
+def _write_atomic(path, write):
     """
-    calculate a confusion matrix using the test data and the deployed model
-    write the confusion matrix to the workspace
+    write a file through a temporary file, readers never see a partial
+    report
     """
 
-    # read test data
-    data = pd.read_csv(
-        os.path.join(test_data_path, "testdata.csv"),
-        dtype={
-            "corporation": str,
-            "lastmonth_activity": int,
-            "lastyear_activity": int,
-            "number_of_employees": int,
-            "exited": int
-        },
-        usecols=[
-            "lastmonth_activity",
-            "lastyear_activity",
-            "number_of_employees",
-            "exited"
-        ]
-    )
-    # load model
-    model = pickle.load(
-        open(
-            os.path.join(model_path, 'trainedmodel.pkl'),
-            'rb'
-        )
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def report_versions():
+    """
+    versions of the inputs of the report
+
+    Returns:
+        dict with the sha256 of the deployed model and of the test data
+    """
+
+    return {
+        "model_version": file_content_hash(
+            os.path.join(prod_deployment_path, 'trainedmodel.pkl')
+        ),
+        "test_data_version": file_content_hash(
+            os.path.join(test_data_path, TEST_DATA_FILE)
+        ),
+    }
+
+
+def _report_is_current(versions):
+    """
+    whether every configured format was rendered for these versions
+    """
+
+    try:
+        with open(report_file("versions.json"), "r") as f:
+            rendered = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (
+        rendered.get("versions") == versions
+        and set(report_formats) <= set(rendered.get("formats", []))
+        and all(os.path.exists(report_file(fmt)) for fmt in report_formats)
     )
 
-    preds = model_predictions(data)
-    cm = metrics.confusion_matrix(data.exited, preds)
 
-    # Setting default size of the plot
-    # Setting default fontsize used in the plot
-    plt.rcParams['figure.figsize'] = (10.0, 9.0)
-    plt.rcParams['font.size'] = 20
+def render_confusion_matrix(cm, labels, fmt, path):
+    """
+    draw the confusion matrix on a new figure and save it
+
+    Arguments:
+        cm: confusion matrix
+        labels: class labels of the rows and columns
+        fmt: png or svg
+        path: output file
+    """
+
+    fig = Figure(figsize=figure_size)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
 
     # Implementing visualization of Confusion Matrix
-    display_c_m = metrics.ConfusionMatrixDisplay(cm)
+    display_c_m = metrics.ConfusionMatrixDisplay(cm, display_labels=labels)
 
     # Plotting Confusion Matrix
     # Setting colour map to be used
-    display_c_m.plot(cmap='OrRd', xticks_rotation=25)
+    display_c_m.plot(ax=ax, cmap='OrRd', xticks_rotation=25, colorbar=False)
     # Setting fontsize for xticks and yticks
-    plt.xticks(fontsize=15)
-    plt.yticks(fontsize=15)
+    ax.tick_params(labelsize=9)
 
     # Giving name to the plot
-    plt.title('Confusion Matrix', fontsize=24)
+    ax.set_title('Confusion Matrix', fontsize=12)
+    fig.tight_layout()
 
     # Saving plot
-    plt.savefig(
-        os.path.join(model_path, 'confusion_matrix.png'),
-        transparent=True,
-        dpi=500
-    )
+    _write_atomic(path, lambda f: fig.savefig(
+        f, format=fmt, transparent=True, dpi=png_dpi
+    ))
+
+
+@instrumentation.timed("report")
+def generate_report(force=False):
+    """
+    calculate a confusion matrix using the test data and the deployed model
+    write the confusion matrix to the workspace in the configured formats
+
+    Arguments:
+        force: render even if the model and test data are unchanged
+
+    Returns:
+        dict with the versions, formats and whether it was rendered
+    """
+
+    versions = report_versions()
+    if not force and _report_is_current(versions):
+        return dict(versions=versions, formats=report_formats, rendered=False)
+
+    # read test data and the deployed model, loaded once
+    data = load_test_data(MODEL_COLUMNS)
+    model = load_model(os.path.join(prod_deployment_path, 'trainedmodel.pkl'))
+
+    preds = model_predictions(data, model)
+    instrumentation.record_rows("report", len(data.index))
+    labels = model.classes_.tolist()
+    cm = metrics.confusion_matrix(data[TARGET_COLUMN], preds, labels=labels)
+
+    for fmt in report_formats:
+        if fmt == "json":
+            contents = json.dumps(
+                dict(versions, labels=labels, matrix=cm.tolist())
+            ).encode()
+            _write_atomic(report_file(fmt), lambda f: f.write(contents))
+        else:
+            with instrumentation.timed("report_render"):
+                render_confusion_matrix(cm, labels, fmt, report_file(fmt))
+
+    record = dict(versions=versions, formats=report_formats)
+    contents = json.dumps(record).encode()
+    _write_atomic(report_file("versions.json"), lambda f: f.write(contents))
+    return dict(record, rendered=True)
+
+
+def submit_report(force=False):
+    """
+    render the report in the background worker
+
+    Returns:
+        future of the generate_report result
+    """
+
+    return _report_worker.submit(generate_report, force)
+
+
+# Function for reporting
+def score_model():
+    """
+    calculate a confusion matrix using the test data and the deployed model
+    write the confusion matrix to the workspace, waits for the background
+    worker
+    """
+
+    return submit_report().result()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,249 @@
+"""
+Module: row_index.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Compact set of 64 bit row fingerprints used for deduplication
+    -- RowHashIndex:
+        - new fingerprints are kept in memory as a few sorted arrays,
+          merged together when there are too many of them
+        - when they grow beyond the memory budget they are spilled to
+          disk as a sorted run, lookups search the runs memory mapped
+        - when there are too many runs they are merged into one with a
+          block wise k-way merge, so memory stays bounded
+        - the runs directory is also the persisted index of the final
+          dataset used by incremental ingestion, saved with the version
+          of the dataset it indexes
+        - staged: copy of an index (runs hard linked) that new
+          fingerprints are added to, the index itself only changes when
+          the copy is swapped in with replace
+"""
+
+import glob
+import json
+import os
+import shutil
+
+import numpy as np
+
+
+# runs are merged into one when there are more of them
+MAX_RUNS = 8
+
+# smallest number of fingerprints read from each run per step of a merge
+MIN_MERGE_BLOCK = 1024
+
+# version of the indexed dataset
+VERSION_FILE = "version.json"
+
+
+class RowHashIndex:
+    """
+    set of uint64 row fingerprints with a bounded memory footprint
+
+    Arguments:
+        path: directory of the sorted runs
+        memory_budget: bytes of fingerprints kept in memory before a
+            spill to disk
+    """
+
+    def __init__(self, path, memory_budget=64 << 20):
+        self.path = path
+        self.memory_budget = memory_budget
+        self._buffers = []
+        self._runs = []
+        os.makedirs(path, exist_ok=True)
+        try:
+            with open(os.path.join(path, VERSION_FILE), "r") as f:
+                self.version = json.load(f)
+        except (OSError, ValueError):
+            self.version = None
+        for run_file in sorted(glob.glob(os.path.join(path, "run-*.npy"))):
+            self._runs.append(np.load(run_file, mmap_mode="r"))
+
+    def __len__(self):
+        return sum(len(run) for run in self._buffers + self._runs)
+
+    @staticmethod
+    def _in_sorted(sorted_hashes, hashes):
+        """
+        membership of hashes in a sorted array
+        """
+
+        if len(sorted_hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+        pos = np.searchsorted(sorted_hashes, hashes)
+        pos[pos == len(sorted_hashes)] = 0
+        return np.asarray(sorted_hashes[pos]) == hashes
+
+    def contains(self, hashes):
+        """
+        check which fingerprints are already in the set
+
+        Arguments:
+            hashes: numpy array of uint64 fingerprints
+
+        Returns:
+            boolean numpy array, True for known fingerprints
+        """
+
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self._buffers + self._runs:
+            found |= self._in_sorted(run, hashes)
+        return found
+
+    def add(self, hashes):
+        """
+        add fingerprints that are not yet in the set
+
+        Arguments:
+            hashes: numpy array of uint64 fingerprints
+        """
+
+        if len(hashes) == 0:
+            return
+        self._buffers.append(np.unique(hashes))
+        if sum(buffer.nbytes for buffer in self._buffers) > self.memory_budget:
+            self.flush()
+        elif len(self._buffers) > MAX_RUNS:
+            self._buffers = [np.sort(np.concatenate(self._buffers))]
+
+    def flush(self):
+        """
+        write the in memory buffer to disk as a sorted run
+        """
+
+        if not self._buffers:
+            return
+        self._runs.append(
+            self._write_run(np.sort(np.concatenate(self._buffers)))
+        )
+        self._buffers = []
+        if len(self._runs) > MAX_RUNS:
+            self._compact()
+
+    def _run_file(self, number):
+        return os.path.join(self.path, f"run-{number:05d}.npy")
+
+    def _next_run_number(self):
+        files = glob.glob(os.path.join(self.path, "run-*.npy"))
+        numbers = [int(os.path.basename(f)[4:9]) for f in files]
+        return max(numbers, default=-1) + 1
+
+    def _write_run(self, hashes):
+        """
+        persist a sorted array as the next run, hidden until complete
+        """
+
+        run_file = self._run_file(self._next_run_number())
+        tmp_file = os.path.join(self.path, ".run.tmp")
+        with open(tmp_file, "wb") as f:
+            np.save(f, hashes)
+        os.replace(tmp_file, run_file)
+        return np.load(run_file, mmap_mode="r")
+
+    def _compact(self):
+        """
+        merge all runs into a single run, reading each run block by block
+        """
+
+        total = sum(len(run) for run in self._runs)
+        run_file = self._run_file(self._next_run_number())
+        tmp_file = os.path.join(self.path, ".run.tmp")
+        merged = np.lib.format.open_memmap(
+            tmp_file, mode="w+", dtype=np.uint64, shape=(total,)
+        )
+
+        # blocks of all runs, their merge and its sort fit in the budget
+        block_size = max(
+            MIN_MERGE_BLOCK, self.memory_budget // (8 * 3 * len(self._runs))
+        )
+        positions = [0] * len(self._runs)
+        written = 0
+        while written < total:
+            # everything up to the smallest block end is final
+            blocks = [
+                run[pos:pos + block_size]
+                for run, pos in zip(self._runs, positions)
+            ]
+            cutoff = min(block[-1] for block in blocks if len(block))
+            taken = []
+            for i, block in enumerate(blocks):
+                count = np.searchsorted(block, cutoff, side="right")
+                taken.append(np.asarray(block[:count]))
+                positions[i] += count
+            step = np.sort(np.concatenate(taken))
+            merged[written:written + len(step)] = step
+            written += len(step)
+
+        merged.flush()
+        del merged
+        old_files = sorted(glob.glob(os.path.join(self.path, "run-*.npy")))
+        os.replace(tmp_file, run_file)
+        self._runs = [np.load(run_file, mmap_mode="r")]
+        for old_file in old_files:
+            os.remove(old_file)
+
+    def save(self, version=None):
+        """
+        persist the whole set to its directory
+
+        Arguments:
+            version: JSON value identifying the indexed dataset
+        """
+
+        self.flush()
+        if version is not None:
+            version_file = os.path.join(self.path, VERSION_FILE)
+            with open(version_file + ".tmp", "w") as f:
+                json.dump(version, f)
+            os.replace(version_file + ".tmp", version_file)
+            self.version = version
+
+    @classmethod
+    def staged(cls, path, staging_path, memory_budget=64 << 20):
+        """
+        copy of the index at path to add fingerprints to, spilled and
+        compacted runs stay in staging_path until it is swapped in with
+        replace, so an aborted ingestion leaves the index unchanged
+
+        Arguments:
+            path: directory of the index
+            staging_path: directory of the copy, emptied first
+            memory_budget: bytes of fingerprints kept in memory
+
+        Returns:
+            RowHashIndex opened at staging_path
+        """
+
+        shutil.rmtree(staging_path, ignore_errors=True)
+        os.makedirs(staging_path)
+        # runs are never modified in place, compaction writes a new run
+        for run_file in glob.glob(os.path.join(path, "run-*.npy")):
+            target = os.path.join(staging_path, os.path.basename(run_file))
+            try:
+                os.link(run_file, target)
+            except OSError:
+                shutil.copyfile(run_file, target)
+        return cls(staging_path, memory_budget)
+
+    @classmethod
+    def replace(cls, path, index, version=None):
+        """
+        move a fully built index over the index at path
+
+        Arguments:
+            path: directory of the index to replace
+            index: RowHashIndex built in another directory
+            version: JSON value identifying the indexed dataset
+
+        Returns:
+            RowHashIndex opened at path
+        """
+
+        index.save(version)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(index.path, path)
+        return cls(path, index.memory_budget)
@@ -2,7 +2,7 @@
 Module: scoring.py
 Author: Amandeep Singh
 Date Written: 22-Jan-2023
-Date Modified: 22-Jan-2023
+Date Modified: 18-Oct-2026
 
 Description:
     Module is for testing the model on test data and record the
@@ -10,80 +10,209 @@ Description:
     - module imports the model and test data
     - predict the values using model
     - calculates the f1 metric and save it to file "latestscore.txt"
+
+    Score cache
+    - the score is computed once per (model, test data) version, the
+      versions are the sha256 of the model file and of testdata.csv
+    - the score and its metadata are kept in memory and in
+      latestscore.json, get_score serves them until either file changes
+    - get_score never writes, a score it has to compute (no stored score
+      for the current versions) is only kept in memory
+    - compute_score and refresh_score write latestscore.txt and
+      latestscore.json
 """
 
-import pickle
 import os
 import json
-from flask import Flask, session, jsonify, request
-from sklearn import metrics
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
-import pandas as pd
-import numpy as np
+import threading
+from datetime import datetime
 
+from dataset import (FEATURE_COLUMNS, MODEL_COLUMNS, TARGET_COLUMN,
+                     TEST_DATA_FILE, load_test_data)
+from filehash import file_content_hash
+import instrumentation
+from model_io import load_model
+from settings import load_config
 
 # Load config.json and get path variables
-with open('config.json', 'r') as f:
-    config = json.load(f)
+config = load_config()
 
 test_data_path = os.path.join(config['test_data_path'])
 model_path = os.path.join(config['output_model_path'])
+SCORE_FILE = "latestscore.json"
+
+_score_lock = threading.Lock()
+_cached_score = {}
+# file path to its (mtime, size, inode) and sha256
+_file_hashes = {}
 
 # Function for model scoring
 
 
-def score_model():
+def _write_atomic(path, contents):
     """
-    this function should take a trained model, load test data, and calculate an
-    F1 score for the model relative to the test data.
-    write the result to the latestscore.txt file
+    replace a file with new contents, readers never see a partial file
+    """
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(contents)
+    os.replace(tmp_path, path)
+
+
+def _cached_file_hash(path):
+    """
+    sha256 of a file, rehashed only when its mtime, size or inode change
+    """
+
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    known = _file_hashes.get(path)
+    if known is None or known[0] != key:
+        # only the current version of each file is kept
+        known = _file_hashes[path] = (key, file_content_hash(path))
+    return known[1]
+
+
+def score_versions():
     """
+    versions of the inputs of the score
+
+    Returns:
+        dict with the sha256 of the model file and of the test data
+    """
+
+    return {
+        "model_version": _cached_file_hash(
+            os.path.join(model_path, 'trainedmodel.pkl')
+        ),
+        "test_data_version": _cached_file_hash(
+            os.path.join(test_data_path, TEST_DATA_FILE)
+        ),
+    }
+
+
+@instrumentation.timed("scoring")
+def score_record():
+    """
+    score the model on the test data, nothing is written
+
+    Returns:
+        dict with f1_score, model_version, test_data_version, samples and
+        scored_at
+    """
+
+    # sklearn is imported on first use, reading the cached score does
+    # not need it
+    from sklearn import metrics
+
+    versions = score_versions()
 
     # load model
-    model = pickle.load(
-        open(
-            os.path.join(model_path, 'trainedmodel.pkl'),
-            'rb'
-        )
-    )
+    model = load_model(os.path.join(model_path, 'trainedmodel.pkl'))
 
     # read test data
-    test_data = pd.read_csv(
-        os.path.join(test_data_path, "testdata.csv"),
-        dtype={
-            "corporation": str,
-            "lastmonth_activity": int,
-            "lastyear_activity": int,
-            "number_of_employees": int,
-            "exited": int
-        },
-        usecols=[
-            "lastmonth_activity",
-            "lastyear_activity",
-            "number_of_employees",
-            "exited"
-        ]
-    )
+    test_data = load_test_data(MODEL_COLUMNS)
 
     # predict and calculate the f1 metric
-    preds = model.predict(
-        test_data.loc[:,
-                      ["lastmonth_activity",
-                       "lastyear_activity",
-                       "number_of_employees"]
-                      ]
-    )
+    preds = model.predict(test_data.loc[:, FEATURE_COLUMNS])
+    instrumentation.record_rows("scoring", len(test_data.index))
     f1_score = metrics.f1_score(
-        test_data["exited"],
+        test_data[TARGET_COLUMN],
         preds
     )
 
+    record = dict(
+        versions,
+        f1_score=float(f1_score),
+        samples=len(test_data.index),
+        scored_at=datetime.now().isoformat()
+    )
+    return record
+
+
+def compute_score():
+    """
+    score the model on the test data and store the score with its
+    metadata in latestscore.txt and latestscore.json
+
+    Returns:
+        dict of the score and its metadata, see score_record
+    """
+
+    record = score_record()
+    f1_score = record["f1_score"]
+
     # write the latest f1 score to the file
-    with open(
-        os.path.join(model_path, "latestscore.txt"), "w"
-    ) as scoring_file:
-        scoring_file.write(str(f1_score))
+    _write_atomic(os.path.join(model_path, "latestscore.txt"), str(f1_score))
+    _write_atomic(os.path.join(model_path, SCORE_FILE), json.dumps(record))
+
+    return record
+
+
+def _read_score_file():
+    try:
+        with open(os.path.join(model_path, SCORE_FILE), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def get_score():
+    """
+    score of the current model on the current test data, computed only
+    when one of them has changed since the last scoring, read only: a
+    computed score is kept in memory, not written
+
+    Returns:
+        dict of the score and its metadata, see score_record
+    """
+
+    versions = score_versions()
+    key = tuple(versions.values())
+    record = _cached_score.get(key)
+    if record is not None:
+        return record
+
+    with _score_lock:
+        record = _cached_score.get(key)
+        if record is None:
+            record = _read_score_file()
+            if record is None or any(
+                record.get(name) != version
+                for name, version in versions.items()
+            ):
+                record = score_record()
+            _cached_score.clear()
+            _cached_score[key] = record
+        return record
+
+
+def refresh_score():
+    """
+    recompute the score even if the model and test data are unchanged
+
+    Returns:
+        dict of the score and its metadata, see compute_score
+    """
+
+    with _score_lock:
+        record = compute_score()
+        _cached_score.clear()
+        _cached_score[
+            (record["model_version"], record["test_data_version"])
+        ] = record
+        return record
+
+
+def score_model():
+    """
+    this function should take a trained model, load test data, and calculate an
+    F1 score for the model relative to the test data.
+    write the result to the latestscore.txt file
+    """
+
+    f1_score = refresh_score()["f1_score"]
 
     return f1_score
 
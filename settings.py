@@ -0,0 +1,36 @@
+"""
+Module: settings.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Shared access to config.json
+    -- load_config:
+        parses config.json of the working directory once per process,
+        every module reads its settings from the same cached dict
+"""
+
+import functools
+import json
+import os
+
+
+CONFIG_FILE = "config.json"
+
+
+@functools.lru_cache(maxsize=None)
+def _read_config(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def load_config():
+    """
+    settings of config.json in the working directory
+
+    Returns:
+        dict of the settings, shared by all callers, must not be changed
+    """
+
+    return _read_config(os.path.abspath(CONFIG_FILE))
@@ -0,0 +1,328 @@
+"""
+Module: sketches.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - One pass, mergeable statistics of the dataset columns
+    -- KLLSketch:
+        quantile sketch, keeps a few hundred weighted samples whatever
+        the number of values, rank error about 1.7 / k, exact while
+        nothing has been compacted
+    -- ColumnSketch:
+        count, null count, Welford mean and variance, min, max and a
+        KLLSketch of a numeric column
+    -- DatasetSketch:
+        ColumnSketch of every column, updated per chunk of rows and
+        merged across files and workers
+    - every sketch can be serialized to and from plain dicts
+"""
+
+import math
+
+import numpy as np
+
+
+class KLLSketch:
+    """
+    mergeable quantile sketch
+
+    Arguments:
+        k: size of the top level, a larger k gives smaller errors
+        seed: seed of the random compaction offsets
+    """
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.levels = [np.array([], dtype=np.float64)]
+        self._rng = np.random.default_rng(seed)
+
+    @staticmethod
+    def k_for_error(error):
+        """
+        k that gives the requested normalized rank error
+        """
+
+        return max(8, math.ceil(1.7 / error))
+
+    def _capacity(self, level):
+        """
+        number of items a level holds before it is compacted, the
+        capacities shrink by 2/3 per level below the top
+        """
+
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _compress(self):
+        """
+        compact every level over its capacity, half of its items move to
+        the next level with twice the weight
+        """
+
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.array([], dtype=np.float64))
+                items = np.sort(items)
+                # an odd item out stays on its level
+                keep = items[:len(items) % 2]
+                pairs = items[len(items) % 2:]
+                offset = int(self._rng.integers(2))
+                self.levels[level + 1] = np.concatenate(
+                    [self.levels[level + 1], pairs[offset::2]]
+                )
+                self.levels[level] = keep
+                # capacities depend on the number of levels, start over
+                level = 0
+                continue
+            level += 1
+
+    def update(self, values):
+        """
+        add a batch of values, nan values are ignored
+        """
+
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if values.size:
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+
+    def merge(self, other):
+        """
+        add the values summarized by another sketch
+        """
+
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.array([], dtype=np.float64))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+
+    def quantile(self, q):
+        """
+        approximate q quantile, exact while the sketch is not compacted
+
+        Arguments:
+            q: quantile between 0 and 1
+
+        Returns:
+            float, nan when the sketch is empty
+        """
+
+        if len(self.levels) == 1:
+            if not self.levels[0].size:
+                return float("nan")
+            return float(np.quantile(self.levels[0], q))
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(level_items), 2.0 ** level)
+            for level, level_items in enumerate(self.levels)
+        ])
+        order = np.argsort(items, kind="stable")
+        cumulative = np.cumsum(weights[order])
+        position = np.searchsorted(cumulative, q * cumulative[-1])
+        return float(items[order][min(position, len(items) - 1)])
+
+    def to_dict(self):
+        return {"k": self.k, "levels": [items.tolist() for items in self.levels]}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["k"])
+        sketch.levels = [
+            np.array(items, dtype=np.float64) for items in data["levels"]
+        ]
+        return sketch
+
+
+class ColumnSketch:
+    """
+    one pass statistics of a column
+
+    Arguments:
+        numeric: whether moments and quantiles are tracked
+        k: size of the quantile sketch
+    """
+
+    def __init__(self, numeric=True, k=200):
+        self.numeric = numeric
+        self.count = 0
+        self.nulls = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.quantiles = KLLSketch(k) if numeric else None
+
+    def _merge_moments(self, count, mean, m2):
+        """
+        combine the moments of another set of values (Chan et al.)
+        """
+
+        total = self.count + count
+        if total == 0:
+            return
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def update(self, values):
+        """
+        add a batch of values
+
+        Arguments:
+            values: pandas series of the column
+        """
+
+        nulls = int(values.isna().sum())
+        self.nulls += nulls
+        if not self.numeric:
+            self.count += len(values) - nulls
+            return
+
+        values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return
+        mean = float(values.mean())
+        self._merge_moments(
+            values.size, mean, float(((values - mean) ** 2).sum())
+        )
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.quantiles.update(values)
+
+    def merge(self, other):
+        """
+        add the values summarized by another column sketch
+        """
+
+        self.nulls += other.nulls
+        if not self.numeric:
+            self.count += other.count
+            return
+        self._merge_moments(other.count, other.mean, other.m2)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.quantiles.merge(other.quantiles)
+
+    @property
+    def std(self):
+        """
+        sample standard deviation, like pandas std
+        """
+
+        if self.count < 2:
+            return float("nan")
+        return math.sqrt(self.m2 / (self.count - 1))
+
+    def to_dict(self):
+        data = {"numeric": self.numeric, "count": self.count, "nulls": self.nulls}
+        if self.numeric:
+            data.update({
+                "mean": self.mean,
+                "m2": self.m2,
+                "min": self.min,
+                "max": self.max,
+                "quantiles": self.quantiles.to_dict(),
+            })
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(numeric=data["numeric"])
+        sketch.count = data["count"]
+        sketch.nulls = data["nulls"]
+        if sketch.numeric:
+            sketch.mean = data["mean"]
+            sketch.m2 = data["m2"]
+            sketch.min = data["min"]
+            sketch.max = data["max"]
+            sketch.quantiles = KLLSketch.from_dict(data["quantiles"])
+        return sketch
+
+
+class DatasetSketch:
+    """
+    column sketches of a dataset
+
+    Arguments:
+        columns: dict of column name to whether it is numeric
+        k: size of the quantile sketches
+    """
+
+    def __init__(self, columns, k=200):
+        self.rows = 0
+        self.columns = {
+            name: ColumnSketch(numeric, k) for name, numeric in columns.items()
+        }
+
+    def update(self, data):
+        """
+        add a chunk of rows
+
+        Arguments:
+            data: dataframe with the sketched columns
+        """
+
+        self.rows += len(data.index)
+        for name, sketch in self.columns.items():
+            sketch.update(data[name])
+
+    def merge(self, other):
+        """
+        add the rows summarized by another dataset sketch
+        """
+
+        self.rows += other.rows
+        for name, sketch in self.columns.items():
+            sketch.merge(other.columns[name])
+
+    def summary(self, columns):
+        """
+        [mean, median, std] of each given column
+        """
+
+        return [
+            [
+                self.columns[name].mean,
+                self.columns[name].quantiles.quantile(0.5),
+                self.columns[name].std
+            ]
+            for name in columns
+        ]
+
+    def missing(self):
+        """
+        missing value rate of each column
+        """
+
+        return [
+            sketch.nulls / self.rows if self.rows else 0.0
+            for sketch in self.columns.values()
+        ]
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "columns": {
+                name: sketch.to_dict() for name, sketch in self.columns.items()
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls({})
+        sketch.rows = data["rows"]
+        sketch.columns = {
+            name: ColumnSketch.from_dict(column)
+            for name, column in data["columns"].items()
+        }
+        return sketch
@@ -0,0 +1,215 @@
+"""
+Module: stats_cache.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Cache of the summary statistics and missing value rates of the
+      final dataset, keyed on a fingerprint of the dataset
+    -- dataset_fingerprint:
+        mtime, size and inode of finaldata.csv, changes whenever
+        ingestion writes or appends to the dataset
+    -- refresh:
+        computes the statistics and stores them in memory and in
+        summarystats.json, called by ingestion after every run
+    -- load_sketch / save_sketch:
+        one pass column sketches of the dataset (statsketch.json), kept
+        up to date by ingestion with the sketches of the ingested files,
+        the statistics are read from the sketch instead of the rows
+    -- get_stats:
+        returns the statistics of the current dataset, from memory, then
+        from disk, computing them only when the fingerprint has changed
+"""
+
+import os
+import json
+import threading
+
+from dataset import DTYPES, FEATURE_COLUMNS, final_data_path, iter_final_data
+from settings import load_config
+from sketches import DatasetSketch, KLLSketch
+
+
+# Load config.json and get path variables
+config = load_config()
+
+output_folder_path = os.path.join(config['output_folder_path'])
+quantile_error = config.get('stats_quantile_error', 0.01)
+STATS_FILE = "summarystats.json"
+SKETCH_FILE = "statsketch.json"
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def dataset_fingerprint():
+    """
+    fingerprint of the final dataset on disk
+
+    Returns:
+        list of mtime in ns, size and inode of finaldata.csv
+    """
+
+    stat = os.stat(final_data_path())
+    return [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+
+
+def new_sketch():
+    """
+    empty sketch of the dataset columns, quantiles within the configured
+    rank error
+    """
+
+    return DatasetSketch(
+        {col: dtype is not str for col, dtype in DTYPES.items()},
+        k=KLLSketch.k_for_error(quantile_error)
+    )
+
+
+def sketch_frame(data):
+    """
+    sketch of the rows of a dataframe
+    """
+
+    sketch = new_sketch()
+    sketch.update(data)
+    return sketch
+
+
+def _sketch_path():
+    return os.path.join(output_folder_path, SKETCH_FILE)
+
+
+def load_sketch():
+    """
+    sketch of the current dataset, None if there is no sketch for this
+    version of the dataset
+    """
+
+    try:
+        with open(_sketch_path(), "r") as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if stored.get("fingerprint") != dataset_fingerprint():
+        return None
+    return DatasetSketch.from_dict(stored["sketch"])
+
+
+def save_sketch(sketch):
+    """
+    store the sketch for the current version of the dataset
+    """
+
+    tmp_path = _sketch_path() + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(
+            {"fingerprint": dataset_fingerprint(), "sketch": sketch.to_dict()},
+            f
+        )
+    os.replace(tmp_path, _sketch_path())
+
+
+def rebuild_sketch():
+    """
+    sketch the whole dataset in one chunked pass and store it
+    """
+
+    sketch = new_sketch()
+    for chunk in iter_final_data():
+        sketch.update(chunk)
+    save_sketch(sketch)
+    return sketch
+
+
+def current_sketch():
+    """
+    sketch of the dataset as it is on disk, rebuilt when missing or stale
+    """
+
+    if not os.path.exists(final_data_path()):
+        return new_sketch()
+    return load_sketch() or rebuild_sketch()
+
+
+def compute_stats():
+    """
+    summary statistics and missing value rates from the dataset sketch
+
+    Returns:
+        dict with "summary", a [mean, median, std] list per feature
+        column, and "missing", the missing value rate per column
+    """
+
+    sketch = current_sketch()
+    return {
+        "summary": sketch.summary(FEATURE_COLUMNS),
+        "missing": sketch.missing()
+    }
+
+
+def _stats_path():
+    return os.path.join(output_folder_path, STATS_FILE)
+
+
+def _read_stats_file(fingerprint):
+    """
+    statistics stored on disk for the given fingerprint, None if the
+    file is missing or belongs to another version of the dataset
+    """
+
+    try:
+        with open(_stats_path(), "r") as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if stored.get("fingerprint") != fingerprint:
+        return None
+    return stored["stats"]
+
+
+def refresh():
+    """
+    compute the statistics of the current dataset and cache them
+
+    Returns:
+        dict of statistics, see compute_stats
+    """
+
+    with _lock:
+        fingerprint = dataset_fingerprint()
+        stats = compute_stats()
+
+        tmp_path = _stats_path() + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"fingerprint": fingerprint, "stats": stats}, f)
+        os.replace(tmp_path, _stats_path())
+
+        _cache.clear()
+        _cache[tuple(fingerprint)] = stats
+        return stats
+
+
+def get_stats():
+    """
+    statistics of the current dataset, recomputed only when the dataset
+    has changed since they were cached
+
+    Returns:
+        dict of statistics, see compute_stats
+    """
+
+    fingerprint = dataset_fingerprint()
+    stats = _cache.get(tuple(fingerprint))
+    if stats is not None:
+        return stats
+
+    stats = _read_stats_file(fingerprint)
+    if stats is None:
+        return refresh()
+
+    with _lock:
+        _cache.clear()
+        _cache[tuple(fingerprint)] = stats
+    return stats
@@ -0,0 +1,223 @@
+"""
+Module: streaming_training.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Out of core training of a logistic regression with SGDClassifier
+      (log loss), for final datasets larger than memory, used by
+      training.py when training_mode is "streaming"
+    -- feature_scaling:
+        mean and standard deviation of each feature from the one pass
+        dataset sketch kept by ingestion (stats_cache), no extra pass
+    -- fit_streaming:
+        partial_fit over the chunks of the dataset for a number of epochs,
+        each chunk standardized and shuffled in memory, only one chunk is
+        held at a time
+        - the fitted coefficients are folded back to the raw feature
+          scale, the model predicts on unscaled features like the batch
+          model and exports to the fast path scorer unchanged
+        - warm start: starts from the coefficients of another linear
+          model and only trains on the last rows of the dataset
+    -- deployed_coefficients:
+        coefficients of the deployed model, when it is a binary linear
+        classifier of the current features
+    -- train_streaming:
+        trains on the final dataset, warm started from the deployed model
+        when only new rows were added, and builds the drift reference in
+        the same bounded memory
+"""
+
+import logging
+import os
+import time
+
+import numpy as np
+
+from dataset import FEATURE_COLUMNS, MODEL_COLUMNS, TARGET_COLUMN, iter_final_data
+from drift import build_reference_from_chunks
+from model_io import load_model
+from settings import load_config
+import stats_cache
+
+
+# Load config.json and get path variables
+config = load_config()
+
+prod_deployment_path = os.path.join(config['prod_deployment_path'])
+streaming_config = config.get('streaming_training', {})
+chunksize = streaming_config.get('chunksize', 100000)
+
+CLASSES = np.array([0, 1])
+
+
+def log_loss_name():
+    """
+    name of the log loss of SGDClassifier, renamed in scikit-learn 1.1
+    """
+
+    import sklearn
+
+    version = tuple(int(part) for part in sklearn.__version__.split(".")[:2])
+    return "log_loss" if version >= (1, 1) else "log"
+
+
+def feature_scaling(sketch):
+    """
+    mean and scale of the features for standardization
+
+    Arguments:
+        sketch: DatasetSketch of the training rows
+
+    Returns:
+        numpy arrays of the mean and standard deviation of each feature,
+        a constant feature gets a scale of 1
+    """
+
+    mean = np.array([sketch.columns[col].mean for col in FEATURE_COLUMNS])
+    scale = np.array([sketch.columns[col].std for col in FEATURE_COLUMNS])
+    scale[~np.isfinite(scale) | (scale == 0)] = 1.0
+    return mean, scale
+
+
+def deployed_coefficients():
+    """
+    coefficients of the deployed model
+
+    Returns:
+        coef of shape (1, features) and intercept of shape (1,), None when
+        there is no deployed binary linear model of the current features
+    """
+
+    path = os.path.join(prod_deployment_path, 'trainedmodel.pkl')
+    if not os.path.exists(path):
+        return None
+    model = load_model(path)
+    coef = getattr(model, "coef_", None)
+    names = getattr(model, "feature_names_in_", FEATURE_COLUMNS)
+    if coef is None or coef.shape != (1, len(FEATURE_COLUMNS)) \
+            or list(model.classes_) != list(CLASSES) \
+            or list(names) != FEATURE_COLUMNS:
+        return None
+    return np.array(coef, dtype=np.float64), \
+        np.array(model.intercept_, dtype=np.float64)
+
+
+def fit_streaming(chunks, mean, scale, epochs=5, skip_rows=0, warm=None,
+                  alpha=0.0001, seed=0):
+    """
+    train a SGDClassifier with log loss on chunks of rows
+
+    Arguments:
+        chunks: function returning a fresh iterable of dataframes with the
+            feature and target columns, called once per epoch
+        mean: mean of each feature
+        scale: standard deviation of each feature
+        epochs: passes over the rows
+        skip_rows: number of leading rows that are not trained on
+        warm: coef and intercept to start from, on the raw feature scale
+        alpha: regularization of the SGDClassifier
+        seed: seed of the shuffling and of the SGDClassifier
+
+    Returns:
+        fitted SGDClassifier on the raw feature scale, the number of rows
+        trained on and the features of the last chunk
+    """
+
+    from sklearn.linear_model import SGDClassifier
+
+    rng = np.random.default_rng(seed)
+    model = SGDClassifier(loss=log_loss_name(), alpha=alpha, random_state=seed)
+
+    if warm is not None:
+        # the same decision function on the standardized features, partial
+        # fit continues from it because classes_ and coef_ are set
+        coef, intercept = warm
+        model.classes_ = CLASSES
+        model.n_features_in_ = len(FEATURE_COLUMNS)
+        model.coef_ = coef * scale
+        model.intercept_ = intercept + coef @ mean
+        # the learning rate continues as if the skipped rows had been
+        # trained on for the same number of epochs
+        model.t_ = 1.0 + skip_rows * epochs
+
+    rows = 0
+    sample = None
+    for epoch in range(epochs):
+        rows = 0
+        offset = 0
+        for chunk in chunks():
+            start = max(skip_rows - offset, 0)
+            offset += len(chunk.index)
+            if start >= len(chunk.index):
+                continue
+            chunk = chunk.iloc[start:]
+            order = rng.permutation(len(chunk.index))
+            X = (chunk.loc[:, FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+                 - mean) / scale
+            y = chunk[TARGET_COLUMN].to_numpy()
+            model.partial_fit(X[order], y[order], classes=CLASSES)
+            rows += len(chunk.index)
+            sample = chunk.loc[:, FEATURE_COLUMNS]
+
+    # fold the standardization into the coefficients
+    coef = model.coef_ / scale
+    model.coef_ = coef
+    model.intercept_ = model.intercept_ - coef @ mean
+    model.feature_names_in_ = np.array(FEATURE_COLUMNS, dtype=object)
+    return model, rows, sample
+
+
+def train_streaming(new_rows=None):
+    """
+    train on the final dataset chunk by chunk
+
+    Arguments:
+        new_rows: number of rows the last ingestion added, with
+            streaming_training.warm_start only those rows are trained on,
+            starting from the deployed model
+
+    Returns:
+        fitted model, dict describing the run, the drift reference of the
+        training rows and the features of the last trained chunk
+    """
+
+    start_time = time.perf_counter()
+    sketch = stats_cache.current_sketch()
+    mean, scale = feature_scaling(sketch)
+
+    warm = None
+    skip_rows = 0
+    if streaming_config.get('warm_start', True) and new_rows \
+            and new_rows < sketch.rows:
+        warm = deployed_coefficients()
+        if warm is not None:
+            skip_rows = sketch.rows - new_rows
+    logging.info(
+        f"Streaming training on {sketch.rows - skip_rows} of {sketch.rows} "
+        f"rows, warm start {warm is not None}"
+    )
+
+    model, rows, sample = fit_streaming(
+        lambda: iter_final_data(MODEL_COLUMNS, chunksize),
+        mean, scale,
+        epochs=streaming_config.get('epochs', 5),
+        skip_rows=skip_rows,
+        warm=warm,
+        alpha=streaming_config.get('alpha', 0.0001),
+        seed=streaming_config.get('seed', 0),
+    )
+    reference = build_reference_from_chunks(
+        iter_final_data(FEATURE_COLUMNS, chunksize), sketch
+    )
+
+    info = {
+        "rows": sketch.rows,
+        "trained_rows": rows,
+        "epochs": streaming_config.get('epochs', 5),
+        "chunksize": chunksize,
+        "warm_start": warm is not None,
+        "seconds": time.perf_counter() - start_time,
+    }
+    return model, info, reference, sample
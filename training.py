@@ -2,43 +2,53 @@
 Module: training.py
 Author: Amandeep Singh
 Date Written: 22-Jan-2023
-Date Modified: 22-Jan-2023
+Date Modified: 18-Oct-2026
 
 Description:
-    Module is for training the logistic regression model
+    Module is for training the model, a logistic regression by default
     - module imports the data from specified source
     - process it
-    - fit the logistic regression
+    - fits the default logistic regression, or with model_selection
+      enabled (off by default) selects the model with a cross validated
+      search over linear estimators (model_selection.py), the winner may
+      be another linear classifier such as RidgeClassifier or LinearSVC
+    - saves the leaderboard of the search
+    - with training_mode "streaming" trains out of core instead, chunk by
+      chunk with SGDClassifier (streaming_training.py), warm started
+      from the deployed model when only new rows were added
     - saves the trained model to specified location
+    - exports the coefficients for the numpy fast path scorer
+    - saves the feature histograms used as drift reference
 """
 
-import pickle
 import os
-import json
-from flask import Flask, session, jsonify, request
-from sklearn import metrics
-from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LogisticRegression
-import pandas as pd
-import numpy as np
 
+from dataset import (FEATURE_COLUMNS, MODEL_COLUMNS, TARGET_COLUMN,
+                     load_final_data)
+from drift import save_reference, write_reference
+import instrumentation
+from linear_scorer import LINEAR_MODEL_FILE, export_linear_model
+from model_io import save_model
+from model_selection import (fixed_leaderboard, save_leaderboard,
+                             select_model, selection_config)
+from settings import load_config
 
 # Load config.json and get path variables
-with open('config.json', 'r') as f:
-    config = json.load(f)
+config = load_config()
 
 dataset_csv_path = os.path.join(config['output_folder_path'])
 model_path = os.path.join(config['output_model_path'])
+training_mode = config.get('training_mode', 'batch')
 
 # Function for training the model
 
-def train_model():
+def default_model():
     """
-    load the data, train logistic regression and save the model
+    logistic regression used when no model selection is run
     """
 
-    # use this logistic regression for training
-    model = LogisticRegression(
+    return LogisticRegression(
         C=1.0,
         class_weight=None,
         dual=False,
@@ -55,40 +65,82 @@ def train_model():
         verbose=0,
         warm_start=False)
 
-    # fit the logistic regression to your data
-    model_dataset = pd.read_csv(
-        os.path.join(dataset_csv_path, "finaldata.csv"),
-        dtype={
-            "corporation": str,
-            "lastmonth_activity": int,
-            "lastyear_activity": int,
-            "number_of_employees": int,
-            "exited": int
-        },
-        usecols=[
-            "lastmonth_activity",
-            "lastyear_activity",
-            "number_of_employees",
-            "exited"
-        ]
-    )
-    X_train = model_dataset.loc[:, 
-        ["lastmonth_activity",
-        "lastyear_activity",
-        "number_of_employees"]
-    ]
-    y_train = model_dataset["exited"]
-    model.fit(X_train, y_train)
+
+@instrumentation.timed("training")
+def train_model(new_rows=None):
+    """
+    load the data, select and train the model and save it
+
+    Arguments:
+        new_rows: number of rows added by the last ingestion, the
+            streaming mode trains on them only, starting from the
+            deployed model
+    """
+
+    if training_mode == "streaming":
+        train_model_streaming(new_rows)
+        return
+
+    model_dataset = load_final_data(MODEL_COLUMNS)
+    X_train = model_dataset.loc[:, FEATURE_COLUMNS]
+    y_train = model_dataset[TARGET_COLUMN]
+    instrumentation.record_rows("training", len(model_dataset.index))
+
+    # cross validated search over the candidate estimators, the winner
+    # is refitted on all rows
+    model, leaderboard = None, None
+    if selection_config.get('enabled', False):
+        model, leaderboard = select_model(X_train, y_train)
+        reason = "too few rows of a class for cross validation"
+    else:
+        reason = "model selection disabled"
+
+    # fit the default logistic regression to your data
+    if model is None:
+        model = default_model().fit(X_train, y_train)
+        leaderboard = fixed_leaderboard(model, reason)
+    save_leaderboard(leaderboard)
 
     # write the trained model to your workspace in a file called
-    # trainedmodel.pkl
-    pickle.dump(
+    # trainedmodel.pkl, replaced atomically as deployed releases may hard
+    # link the previous file, the format is model_format of config.json
+    save_model(model, os.path.join(model_path, 'trainedmodel.pkl'))
+
+    # compile the coefficients for the fast path scorer, export checks
+    # that the scorer predicts the same labels as the model
+    export_linear_model(
+        model,
+        os.path.join(model_path, LINEAR_MODEL_FILE),
+        X_train
+    )
+
+    # distribution of the training features, new data is compared with
+    # it to detect drift
+    save_reference(X_train)
+
+
+def train_model_streaming(new_rows=None):
+    """
+    train chunk by chunk and save the model and its artifacts, memory use
+    does not grow with the dataset
+    """
+
+    # imported here, batch training does not need it
+    from streaming_training import train_streaming
+
+    model, info, reference, sample = train_streaming(new_rows)
+    instrumentation.record_rows("training", info["trained_rows"])
+    leaderboard = fixed_leaderboard(model, "streaming training")
+    leaderboard["streaming"] = info
+    save_leaderboard(leaderboard)
+
+    save_model(model, os.path.join(model_path, 'trainedmodel.pkl'))
+    export_linear_model(
         model,
-        open(
-            os.path.join(model_path, 'trainedmodel.pkl'),
-            'wb'
-        )
+        os.path.join(model_path, LINEAR_MODEL_FILE),
+        sample
     )
+    write_reference(reference)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,245 @@
+"""
+Module: watcher.py
+Author: Amandeep Singh
+Date Written: 18-Oct-2026
+Date Modified: 18-Oct-2026
+
+Description:
+    - Long running daemon that runs the full process when csv files
+      arrive in the input directory, replaces the hourly cron job
+    -- InotifyWatcher:
+        waits for files closed after writing or moved into the directory
+        through the linux inotify api (ctypes, no extra dependency)
+    -- PollingWatcher:
+        fallback where inotify is not available, compares the mtime and
+        size of the csv files every poll interval
+    -- watch:
+        - the modules of the pipeline steps (pandas, sklearn,
+          matplotlib) are imported once at start and stay warm
+        - a changed file is only handed over once it has not changed for
+          the debounce period, so partially written files are not
+          ingested
+        - runs fullprocess.main once at start, then after every batch of
+          settled files with content the deployed model has not seen (new
+          files or a changed content hash), a file touched without a
+          change does not trigger a run
+        - a failed run is logged and the watcher keeps watching
+"""
+
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import select
+import struct
+import time
+
+from settings import load_config
+
+
+# Load config.json and get path variables
+config = load_config()
+
+input_folder_path = config['input_folder_path']
+watcher_config = config.get('watcher', {})
+debounce_seconds = watcher_config.get('debounce_seconds', 2.0)
+poll_interval = watcher_config.get('poll_interval_seconds', 5.0)
+use_inotify = watcher_config.get('use_inotify', True)
+
+# inotify constants of linux/inotify.h
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_source_file(name):
+    return name[-4:] == ".csv" and not name.startswith(".")
+
+
+class InotifyWatcher:
+    """
+    changed csv files of a directory from inotify events
+
+    Arguments:
+        path: directory to watch
+    """
+
+    def __init__(self, path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+        if libc.inotify_add_watch(self._fd, os.fsencode(path), mask) < 0:
+            os.close(self._fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+
+    def changes(self, timeout):
+        """
+        names of the csv files changed within timeout seconds, empty when
+        nothing happened
+        """
+
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        names = set()
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode()
+            offset += length
+            if is_source_file(name):
+                names.add(name)
+        return names
+
+
+class PollingWatcher:
+    """
+    changed csv files of a directory from its listing
+
+    Arguments:
+        path: directory to watch
+        interval: seconds between two listings
+    """
+
+    def __init__(self, path, interval):
+        self.path = path
+        self.interval = interval
+        self._seen = self._listing()
+
+    def _listing(self):
+        listing = {}
+        for entry in os.scandir(self.path):
+            if is_source_file(entry.name):
+                stat = entry.stat()
+                listing[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return listing
+
+    def changes(self, timeout):
+        """
+        names of the csv files changed since the last listing
+        """
+
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        listing = self._listing()
+        names = {
+            name for name, version in listing.items()
+            if self._seen.get(name) != version
+        }
+        self._seen = listing
+        return names
+
+
+def new_watcher(path):
+    """
+    inotify watcher of the directory, polling when inotify is off or
+    not supported
+    """
+
+    if use_inotify:
+        try:
+            return InotifyWatcher(path)
+        except (OSError, AttributeError) as err:
+            logging.warning(f"inotify not available, polling: {err}")
+    return PollingWatcher(path, poll_interval)
+
+
+def _file_version(name):
+    try:
+        stat = os.stat(os.path.join(input_folder_path, name))
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def watch(run, watcher=None):
+    """
+    call run whenever csv files have arrived and settled
+
+    Arguments:
+        run: function called with the sorted names of the settled files
+        watcher: source of changed file names, new_watcher by default
+    """
+
+    watcher = watcher or new_watcher(input_folder_path)
+    # file name to (version, time it was last seen changing)
+    pending = {}
+    # file name to the version last handed over to run
+    handed_over = {}
+    while True:
+        for name in watcher.changes(debounce_seconds if pending else None):
+            version = _file_version(name)
+            if version is not None and version != handed_over.get(name):
+                pending[name] = (version, time.monotonic())
+
+        now = time.monotonic()
+        settled = []
+        for name, (version, changed_at) in list(pending.items()):
+            if now - changed_at < debounce_seconds:
+                continue
+            current = _file_version(name)
+            if current is None:
+                # removed or renamed before it settled
+                del pending[name]
+            elif current != version:
+                pending[name] = (current, now)
+            else:
+                settled.append(name)
+                handed_over[name] = version
+                del pending[name]
+
+        if settled:
+            run(sorted(settled))
+
+
+def main():
+    # the modules of the steps are imported once, fullprocess imports
+    # them lazily and every run reuses them
+    import apicalls  # noqa: F401
+    import deployment  # noqa: F401
+    import drift
+    import fullprocess
+    import ingestion  # noqa: F401
+    import reporting  # noqa: F401
+    import scoring  # noqa: F401
+    import training  # noqa: F401
+
+    def run(names):
+        # a file removed while it is hashed or a failing step must not
+        # stop the daemon, nothing restarts it before the next boot
+        try:
+            unseen = set(drift.new_source_files())
+            changed = [name for name in names if name in unseen]
+            if not changed:
+                logging.info(
+                    f"Source files unchanged since ingestion: {names}"
+                )
+                return
+            logging.info(f"Source files arrived: {changed}")
+            statuses = fullprocess.main()
+            logging.info(f"Pipeline finished: {json.dumps(statuses)}")
+        except Exception:
+            logging.exception(f"Run for {names} failed")
+
+    # files that arrived while the watcher was down
+    try:
+        fullprocess.main()
+    except Exception:
+        logging.exception("Run at start failed")
+    watch(run)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
 from app import app
 
+# with "microbatching" enabled in config.json run gunicorn with threads so
+# concurrent requests of a worker can be coalesced, for example
+#   gunicorn --workers 2 --threads 32 wsgi:app
+
 
 if __name__ == "__main__":
     app.run()